@@ -0,0 +1,336 @@
+"""
+Anki .apkg / .colpkg import.
+
+A package is a zip around an SQLite collection: collection.anki2 (oldest),
+collection.anki21, or collection.anki21b (zstd-compressed, written by
+recent Anki). The collection member is streamed out of the zip into a
+temporary file. Recent packages also contain a placeholder collection.anki2,
+which is ignored. Notes are then read through an SQLite cursor in note id
+order, IMPORT_BATCH_SIZE at a time, so memory stays flat however large the
+collection is.
+
+Fields map to cards by name: the first of WORD_FIELDS present becomes the
+word, and so on for the definition and the example sentence and its
+translation; the word is marked as a cloze in the example where it
+appears. Unnamed notes fall back to the first two fields. A cloze note
+({{c1::...}}) becomes a card for its first cloze. The whole text becomes an
+example sentence, with every cloze turned into this app's *marker*. With
+include_scheduling, each note's first card carries its Anki interval, ease
+and due date over into SM-2 fields. Otherwise cards start new.
+
+Each batch of notes is committed as a chunk of an import (see
+import_stream), so a retry with the same import id skips the batches that
+already landed.
+
+.anki21b collections need the optional zstandard package
+(`pip install zstandard`). Without it, export from Anki with "Support older
+Anki versions" checked.
+"""
+import html
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+from bulk_import import IMPORT_BATCH_SIZE, insert_cards
+from database import SessionLocal
+from import_stream import claim_chunk, finish_chunk
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_MEMBERS = ("collection.anki21b", "collection.anki21", "collection.anki2")
+EXTRACT_CHUNK_SIZE = 1024 * 1024
+WORD_MAX_LENGTH = 200  # cards.word is String(200)
+
+WORD_FIELDS = ("word", "front", "expression", "vocab", "vocabulary", "term", "text")
+DEFINITION_FIELDS = ("definition", "meaning", "back", "translation", "glossary", "back extra", "extra")
+EXAMPLE_FIELDS = ("example", "sentence", "example sentence", "context")
+EXAMPLE_TRANSLATION_FIELDS = ("example translation", "sentence translation", "sentence meaning", "example meaning")
+
+_CLOZE_RE = re.compile(r"\{\{c\d+::(.*?)(?:::(.*?))?\}\}", re.DOTALL)
+_LINE_BREAK_RE = re.compile(r"<br\s*/?>|</div>|</p>|</li>", re.IGNORECASE)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SOUND_RE = re.compile(r"\[sound:[^\]]*\]")
+_SPACES_RE = re.compile(r"[ \t\xa0]+")
+
+# Anki card types and queues
+CARD_TYPE_NEW, CARD_TYPE_LEARNING, CARD_TYPE_REVIEW, CARD_TYPE_RELEARNING = 0, 1, 2, 3
+QUEUE_LEARNING = 1
+
+
+class AnkiImportError(ValueError):
+    """The upload isn't a package this importer can read."""
+
+
+@dataclass
+class FieldMapping:
+    """Field names (any case) to read; None picks from the default name lists."""
+    word: Optional[str] = None
+    definition: Optional[str] = None
+    example: Optional[str] = None
+    translation: Optional[str] = None
+
+
+def extract_collection(package, workdir: str) -> str:
+    """Copy the collection database out of an opened package file into workdir; returns its path."""
+    try:
+        archive = zipfile.ZipFile(package)
+    except zipfile.BadZipFile:
+        raise AnkiImportError("Not an Anki package (.apkg or .colpkg)")
+
+    with archive:
+        names = set(archive.namelist())
+        member = next((name for name in COLLECTION_MEMBERS if name in names), None)
+        if member is None:
+            raise AnkiImportError("No Anki collection found in the package")
+        if member.endswith(".anki21b") and zstandard is None:
+            raise AnkiImportError(
+                "This package uses Anki's newest format. Export it with "
+                "'Support older Anki versions' checked and import again"
+            )
+
+        path = os.path.join(workdir, "collection.sqlite")
+        with archive.open(member) as source, open(path, "wb") as target:
+            if member.endswith(".anki21b"):
+                zstandard.ZstdDecompressor().copy_stream(source, target, read_size=EXTRACT_CHUNK_SIZE)
+            else:
+                shutil.copyfileobj(source, target, EXTRACT_CHUNK_SIZE)
+    return path
+
+
+def clean_field(value: str) -> str:
+    """Field HTML to plain text: line breaks kept, tags and sound references dropped."""
+    text = _SOUND_RE.sub("", _TAG_RE.sub("", _LINE_BREAK_RE.sub("\n", value or "")))
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in html.unescape(text).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _pick(field_names: List[str], wanted: Optional[str], defaults: tuple) -> Optional[int]:
+    """Index of the named field, or of the first default name present."""
+    lowered = [name.strip().lower() for name in field_names]
+    for name in ((wanted,) if wanted else defaults):
+        if name.strip().lower() in lowered:
+            return lowered.index(name.strip().lower())
+    return None
+
+
+@dataclass
+class NoteLayout:
+    word: Optional[int]
+    definition: Optional[int]
+    example: Optional[int]
+    translation: Optional[int]
+
+    @classmethod
+    def for_fields(cls, field_names: List[str], mapping: FieldMapping) -> "NoteLayout":
+        layout = cls(
+            word=_pick(field_names, mapping.word, WORD_FIELDS),
+            definition=_pick(field_names, mapping.definition, DEFINITION_FIELDS),
+            example=_pick(field_names, mapping.example, EXAMPLE_FIELDS),
+            translation=_pick(field_names, mapping.translation, EXAMPLE_TRANSLATION_FIELDS),
+        )
+        # Basic note types with unusual names: front and back by position
+        if layout.word is None and not mapping.word:
+            layout.word = 0
+        if layout.definition is None and not mapping.definition and len(field_names) > 1:
+            layout.definition = next(i for i in range(len(field_names)) if i != layout.word)
+        return layout
+
+
+class AnkiCollection:
+    """Read-only cursor access to an extracted collection."""
+
+    def __init__(self, path: str):
+        try:
+            # A streaming response advances the import from whichever threadpool thread is free; use is sequential
+            self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            self.created_at = datetime.utcfromtimestamp(
+                self.connection.execute("SELECT crt FROM col").fetchone()[0]
+            )
+            self.note_count = self.connection.execute("SELECT count(*) FROM notes").fetchone()[0]
+            self.field_names = self._field_names()
+        except (sqlite3.DatabaseError, TypeError, ValueError, KeyError) as e:
+            self.connection.close()
+            raise AnkiImportError(f"Unreadable Anki collection: {e}")
+
+    def _field_names(self) -> Dict[int, List[str]]:
+        tables = {row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "fields" in tables:
+            # Schema 18 (Anki 2.1.28+): one row per note type field
+            names: Dict[int, List[str]] = {}
+            for notetype_id, name in self.connection.execute("SELECT ntid, name FROM fields ORDER BY ntid, ord"):
+                names.setdefault(notetype_id, []).append(name)
+            return names
+
+        models = json.loads(self.connection.execute("SELECT models FROM col").fetchone()[0] or "{}")
+        return {
+            int(model_id): [field["name"] for field in sorted(model["flds"], key=lambda field: field["ord"])]
+            for model_id, model in models.items()
+        }
+
+    def notes(self) -> Iterator[tuple]:
+        """(note type id, fields, first card's scheduling columns) per note, in note id order."""
+        cursor = self.connection.execute(
+            "SELECT n.mid, n.flds, c.type, c.queue, c.due, c.odue, c.odid, c.ivl, c.factor "
+            "FROM notes n LEFT JOIN cards c ON c.id = "
+            "(SELECT id FROM cards WHERE nid = n.id ORDER BY ord LIMIT 1) "
+            "ORDER BY n.id"
+        )
+        while True:
+            rows = cursor.fetchmany(IMPORT_BATCH_SIZE)
+            if not rows:
+                return
+            for notetype_id, fields, *schedule in rows:
+                yield notetype_id, fields.split("\x1f"), schedule
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def sm2_schedule(collection_created: datetime, card_type, queue, due, original_due, original_deck,
+                 interval, factor) -> dict:
+    """SM-2 fields for an Anki card's state; {} for new cards (initial_schedule applies)."""
+    if card_type is None or card_type == CARD_TYPE_NEW:
+        return {}
+    if original_deck:
+        due = original_due  # Cards in a filtered deck keep their real due date here
+    ease_factor = max(1.3, factor / 1000) if factor else 2.5
+
+    if card_type == CARD_TYPE_REVIEW:
+        return {
+            "interval": interval,
+            # SM-2 uses 1 and 6 days for its first two repetitions, then multiplies by ease
+            "repetition": 1 if interval <= 1 else 2 if interval <= 6 else 3,
+            "ease_factor": ease_factor,
+            "next_review_date": collection_created + timedelta(days=due),
+        }
+
+    # Learning and relearning: due is a timestamp in the intraday queue, else a day number
+    if queue == QUEUE_LEARNING:
+        next_review_date = datetime.utcfromtimestamp(due)
+    else:
+        next_review_date = collection_created + timedelta(days=due)
+    return {
+        "interval": max(interval, 0) if card_type == CARD_TYPE_RELEARNING else 0,
+        "repetition": 0,
+        "ease_factor": ease_factor,
+        "next_review_date": next_review_date,
+    }
+
+
+def mark_word(sentence: str, word: str) -> str:
+    """Wrap the word's first appearance in the sentence in cloze markers, if it appears as written."""
+    if not sentence or not word or "*" in sentence:
+        return sentence
+    index = sentence.lower().find(word.lower())
+    if index < 0:
+        return sentence
+    return f"{sentence[:index]}*{sentence[index:index + len(word)]}*{sentence[index + len(word):]}"
+
+
+def note_to_card(fields: List[str], layout: NoteLayout) -> Optional[dict]:
+    """Card values for a note, or None when it has no usable word and definition."""
+    def field(index: Optional[int]) -> str:
+        return clean_field(fields[index]) if index is not None and index < len(fields) else ""
+
+    cloze_index = next((i for i, value in enumerate(fields) if _CLOZE_RE.search(value)), None)
+    if cloze_index is not None:
+        text = fields[cloze_index]
+        first = _CLOZE_RE.search(text)
+        word = clean_field(first.group(1))
+        sentence = clean_field(_CLOZE_RE.sub(lambda match: f"*{match.group(1)}*", text))
+        definition = field(layout.definition) if layout.definition != cloze_index else ""
+        examples = [{"sentence": sentence, "translation": field(layout.translation) or None}]
+        definition = definition or clean_field(first.group(2) or "")
+    else:
+        word = field(layout.word)
+        definition = field(layout.definition)
+        sentence = mark_word(field(layout.example), word)
+        examples = [{"sentence": sentence, "translation": field(layout.translation) or None}] if sentence else None
+
+    word = " ".join(word.split())[:WORD_MAX_LENGTH]
+    if not word or not definition:
+        return None
+    return {"word": word, "definition": definition, "synonyms": None, "examples": examples}
+
+
+def anki_card_batches(collection: AnkiCollection, mapping: FieldMapping,
+                      include_scheduling: bool) -> Iterator[tuple]:
+    """(notes in the batch, card values) for each batch of IMPORT_BATCH_SIZE notes."""
+    layouts: Dict[int, NoteLayout] = {}
+    notes = 0
+    batch: List[dict] = []
+    for notetype_id, fields, schedule in collection.notes():
+        layout = layouts.get(notetype_id)
+        if layout is None:
+            layout = layouts[notetype_id] = NoteLayout.for_fields(
+                collection.field_names.get(notetype_id, []), mapping
+            )
+        card = note_to_card(fields, layout)
+        if card is not None:
+            if include_scheduling:
+                card.update(sm2_schedule(collection.created_at, *schedule))
+            batch.append(card)
+        notes += 1
+        if notes == IMPORT_BATCH_SIZE:
+            yield notes, batch
+            notes, batch = 0, []
+    if notes:
+        yield notes, batch
+
+
+def open_package(package) -> tuple:
+    """Extract and open a package's collection: (collection, temporary directory to remove afterwards)."""
+    workdir = tempfile.mkdtemp(prefix="anki-import-")
+    try:
+        return AnkiCollection(extract_collection(package, workdir)), workdir
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+
+def stream_anki_import(collection: AnkiCollection, workdir: str, user_id: int, deck_id: int, import_id: str,
+                       mapping: FieldMapping, include_scheduling: bool,
+                       session_factory=SessionLocal) -> Iterator[bytes]:
+    """Import batch by batch, committing each as a chunk; yields one NDJSON progress line per batch.
+
+    Runs as a StreamingResponse body, so it uses its own session. An error
+    ends the stream with an "error" line; committed batches stay, and a
+    retry with the same import id continues after them.
+    """
+    progress = {"import_id": import_id, "deck_id": deck_id, "notes": collection.note_count,
+                "processed": 0, "imported": 0, "skipped": 0}
+    db = session_factory()
+    try:
+        yield (json.dumps(progress) + "\n").encode("utf-8")
+        for seq, (notes, cards) in enumerate(anki_card_batches(collection, mapping, include_scheduling)):
+            chunk_id, imported = claim_chunk(db, user_id, deck_id, import_id, seq)
+            if chunk_id is not None:
+                imported = insert_cards(db, deck_id, cards)
+                finish_chunk(db, chunk_id, imported)
+                db.commit()
+            progress["processed"] += notes
+            progress["imported"] += imported
+            progress["skipped"] += notes - imported
+            yield (json.dumps(progress) + "\n").encode("utf-8")
+        yield (json.dumps({**progress, "done": True}) + "\n").encode("utf-8")
+    except Exception:
+        db.rollback()
+        logger.exception("Anki import %s failed", import_id)
+        yield (json.dumps({**progress, "error": "Import failed; retry with the same import_id to resume"}) + "\n").encode("utf-8")
+    finally:
+        db.close()
+        collection.close()
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -7,7 +7,7 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database import SessionLocal, engine, get_db, get_read_db
 from models import User
 from schemas import TokenData
 
@@ -48,6 +48,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def username_from_token(token: str) -> Optional[str]:
+    """Subject of a valid token without touching the database, or None."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+
 def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     """Authenticate a user by username and password."""
     user = db.query(User).filter(User.username == username).first()
@@ -90,6 +99,27 @@ async def get_current_user(
     return user
 
 
+async def get_current_reader(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_read_db)
+) -> User:
+    """get_current_user for read-only endpoints, looked up on their read session.
+
+    A user registered moments ago may not have reached the replica yet, so a
+    miss there is retried on the primary.
+    """
+    try:
+        return await get_current_user(token, db)
+    except HTTPException:
+        if db.get_bind() is engine:
+            raise
+    primary = SessionLocal()
+    try:
+        return await get_current_user(token, primary)
+    finally:
+        primary.close()
+
+
 def create_user(db: Session, username: str, password: str) -> User:
     """Create a new user."""
     hashed_password = get_password_hash(password)
@@ -0,0 +1 @@
+# Synthetic data and benchmark tooling (run from backend/, e.g. python -m bench.endpoints)
@@ -0,0 +1,68 @@
+"""Helpers shared by the benchmark scripts: percentiles and JSON result files."""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def latency_summary(samples_seconds: List[float], elapsed_seconds: float) -> Dict[str, float]:
+    ordered = sorted(samples_seconds)
+    return {
+        "requests": len(ordered),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "throughput_rps": round(len(ordered) / elapsed_seconds, 1) if elapsed_seconds else 0.0,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def write_results(name: str, results: List[dict], settings: dict, output: Optional[str] = None) -> str:
+    """Store a run as JSON (bench/results/<name>-<timestamp>.json by default) and return the path."""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+
+    document = {
+        "benchmark": name,
+        "created_at": datetime.utcnow().isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": settings,
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2)
+    return output
+
+
+def print_table(results: List[dict], key_fields: List[str], value_fields: List[str], header: bool = True) -> None:
+    columns = key_fields + value_fields
+    widths = {column: max(14, len(column), *(len(str(row.get(column, ""))) for row in results)) for column in columns}
+    if header:
+        print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in results:
+        print("  ".join(str(row.get(column, "")).ljust(widths[column]) for column in columns))
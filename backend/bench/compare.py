@@ -0,0 +1,45 @@
+"""
+Compare two benchmark result files.
+
+    python -m bench.compare bench/results/endpoints-before.json bench/results/endpoints-after.json
+"""
+import argparse
+import json
+
+# Fields that identify a row (whichever a benchmark uses) and the metrics worth diffing
+KEY_FIELDS = ("profile", "endpoint", "scenario", "workers", "encoding", "payload", "dialect", "path")
+METRIC_FIELDS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def row_key(row: dict) -> tuple:
+    return tuple((field, row[field]) for field in KEY_FIELDS if field in row)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Diff two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as handle:
+        before = {row_key(row): row for row in json.load(handle)["results"]}
+    with open(args.after, encoding="utf-8") as handle:
+        after = json.load(handle)["results"]
+
+    for row in after:
+        key = row_key(row)
+        label = " ".join(str(value) for _, value in key)
+        previous = before.get(key)
+        if previous is None:
+            print(f"{label}: new")
+            continue
+        changes = []
+        for field in METRIC_FIELDS:
+            if field in row and field in previous and previous[field]:
+                delta = (row[field] - previous[field]) / previous[field] * 100
+                changes.append(f"{field} {previous[field]} -> {row[field]} ({delta:+.1f}%)")
+        print(f"{label}: " + "; ".join(changes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Response encoding benchmark.
+
+Builds card-list JSON payloads of several sizes (the shape /library/decks/{id}/cards
+returns) and measures each negotiated encoding from response_encoding: bytes on
+the wire, compression ratio and encode latency per response.
+
+    python -m bench.encoding --cards 10 --cards 100 --cards 1000 --cards 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from bench.common import latency_summary, print_table, write_results
+from bench.seed import fake_card
+from response_encoding import OFFLOAD_MIN_SIZE, brotli, encode_body, msgpack
+
+# (name, to_msgpack, content_encoding)
+ENCODINGS = [
+    ("json", False, None),
+    ("json+gzip", False, "gzip"),
+    ("json+br", False, "br"),
+    ("msgpack", True, None),
+    ("msgpack+gzip", True, "gzip"),
+    ("msgpack+br", True, "br"),
+]
+
+
+def card_payload(count: int, seed: int) -> bytes:
+    """JSON body as FastAPI renders it for `count` cards."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    cards = []
+    for card_id in range(1, count + 1):
+        card = fake_card(rng, deck_id=1, now=now)
+        card.pop("updated_at")
+        cards.append({"id": card_id, "version": 0, **card})
+    return json.dumps(
+        jsonable_encoder(cards), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def available_encodings() -> List[tuple]:
+    return [
+        item for item in ENCODINGS
+        if (not item[1] or msgpack is not None) and (item[2] != "br" or brotli is not None)
+    ]
+
+
+def run(card_counts: List[int], repeat: int, seed: int) -> List[dict]:
+    results = []
+    for count in card_counts:
+        body = card_payload(count, seed)
+        for name, to_msgpack, content_encoding in available_encodings():
+            encoded = encode_body(body, to_msgpack, content_encoding)
+            samples = []
+            cpu_started = time.process_time()
+            wall_started = time.perf_counter()
+            for _ in range(repeat):
+                started = time.perf_counter()
+                encode_body(body, to_msgpack, content_encoding)
+                samples.append(time.perf_counter() - started)
+            elapsed = time.perf_counter() - wall_started
+            results.append({
+                "payload": f"{count} cards",
+                "encoding": name,
+                "json_bytes": len(body),
+                "bytes": len(encoded),
+                "ratio": round(len(body) / len(encoded), 2),
+                "cpu_ms_per_response": round((time.process_time() - cpu_started) / repeat * 1000, 3),
+                "offloaded": len(body) >= OFFLOAD_MIN_SIZE,
+                **latency_summary(samples, elapsed),
+            })
+            print_table(
+                results[-1:], ["payload", "encoding"],
+                ["json_bytes", "bytes", "ratio", "p50_ms", "p95_ms", "cpu_ms_per_response", "offloaded"],
+                header=len(results) == 1,
+            )
+    return results
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark negotiated response encodings")
+    parser.add_argument("--cards", type=int, action="append", help="Payload sizes in cards (repeatable)")
+    parser.add_argument("--repeat", type=int, default=20, help="Encodes measured per payload and encoding")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result JSON path (default: bench/results/encoding-<time>.json)")
+    args = parser.parse_args()
+
+    card_counts = args.cards or [10, 100, 1000, 10000]
+    results = run(card_counts, args.repeat, args.seed)
+    path = write_results("encoding", results, {
+        "cards": card_counts,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "brotli": brotli is not None,
+        "msgpack": msgpack is not None,
+    }, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,149 @@
+"""
+Endpoint benchmark.
+
+Seeds one user per data-size profile into a fresh database, then drives the
+FastAPI app in process (httpx ASGI transport, no network) and reports
+p50/p95/p99 latency and throughput for each key endpoint per profile.
+
+    python -m bench.endpoints --profile small --profile medium --requests 100
+    python -m bench.compare bench/results/endpoints-A.json bench/results/endpoints-B.json
+
+Without --database-url a temporary SQLite file is used. A Postgres URL must
+point at an empty database.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+from bench.common import latency_summary, print_table, write_results
+
+# name -> builds (method, url, params, json) from the seeded user context
+Scenario = Callable[[dict, random.Random], Tuple[str, str, dict, object]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "library": lambda ctx, rng: ("GET", "/library", {}, None),
+    "deck_cards": lambda ctx, rng: ("GET", f"/library/decks/{ctx['deck_ids'][-1]}/cards", {}, None),
+    "study_deck": lambda ctx, rng: ("GET", f"/study/{ctx['deck_ids'][0]}", {"mode": "all"}, None),
+    "study_multi": lambda ctx, rng: ("POST", "/study/multi", {}, {"deck_ids": ctx["deck_ids"], "mode": "all"}),
+    "study_folder": lambda ctx, rng: ("GET", f"/study/folder/{ctx['folder_ids'][0]}", {"mode": "all"}, None),
+    "review": lambda ctx, rng: ("POST", f"/study/{rng.choice(ctx['card_ids'])}/review", {}, {"quality": rng.choice([1, 3, 4, 5])}),
+    "search": lambda ctx, rng: ("GET", "/search", {"q": rng.choice(ctx["words"])[:4]}, None),
+    "stats": lambda ctx, rng: ("GET", "/stats", {}, None),
+    "sync_empty": lambda ctx, rng: ("GET", "/sync", {"since": ctx["sync_cursor"]}, None),
+    "summary": lambda ctx, rng: ("GET", "/summary", {}, None),
+}
+
+
+def build_contexts(users: List[dict]) -> List[dict]:
+    """Add auth headers and sample card ids/words to each seeded user."""
+    from sqlalchemy import select
+    from auth import create_access_token
+    from database import SessionLocal
+    from models import Card
+
+    db = SessionLocal()
+    try:
+        for user in users:
+            rows = db.execute(
+                select(Card.id, Card.word).where(Card.deck_id.in_(user["deck_ids"])).limit(2000)
+            ).all()
+            user["card_ids"] = [row[0] for row in rows]
+            user["words"] = [row[1] for row in rows]
+            user["headers"] = {"Authorization": f"Bearer {create_access_token({'sub': user['username']})}"}
+            user["sync_cursor"] = datetime.utcnow().isoformat()
+    finally:
+        db.close()
+    return users
+
+
+async def run_scenario(client, ctx: dict, scenario: Scenario, requests: int, concurrency: int, seed: int):
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    errors = 0
+    queue = list(range(requests))
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            queue.pop()
+            method, url, params, body = scenario(ctx, rng)
+            started = time.perf_counter()
+            response = await client.request(method, url, params=params, json=body, headers=ctx["headers"])
+            await response.aread()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def run_all(users: List[dict], scenarios: List[str], requests: int, concurrency: int, warmup: int) -> List[dict]:
+    import httpx
+    import main
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for ctx in users:
+            for name in scenarios:
+                scenario = SCENARIOS[name]
+                await run_scenario(client, ctx, scenario, warmup, 1, seed=0)
+                latencies, errors, elapsed = await run_scenario(client, ctx, scenario, requests, concurrency, seed=1)
+                results.append({
+                    "profile": ctx["profile"],
+                    "cards": ctx["card_count"],
+                    "endpoint": name,
+                    "errors": errors,
+                    **latency_summary(latencies, elapsed),
+                })
+                print_table(
+                    results[-1:], ["profile", "endpoint"], ["p50_ms", "p95_ms", "p99_ms", "throughput_rps", "errors"],
+                    header=len(results) == 1,
+                )
+    return results
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark key API endpoints in process")
+    parser.add_argument("--database-url", help="Empty database to seed (default: temporary SQLite file)")
+    parser.add_argument("--profile", action="append", help="Data size profile(s) from bench.seed.PROFILES")
+    parser.add_argument("--endpoint", action="append", choices=sorted(SCENARIOS), help="Endpoints to run (default: all)")
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per endpoint and profile")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent in-flight requests")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result JSON path (default: bench/results/endpoints-<time>.json)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='srs-bench-'), 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+
+    from bench.seed import seed_database
+
+    profiles = args.profile or ["small", "medium"]
+    scenarios = args.endpoint or list(SCENARIOS)
+
+    seed_started = time.perf_counter()
+    users = build_contexts(seed_database(profiles, args.seed))
+    print(f"Seeded {sum(user['card_count'] for user in users)} cards in {time.perf_counter() - seed_started:.1f}s")
+
+    results = asyncio.run(run_all(users, scenarios, args.requests, args.concurrency, args.warmup))
+    path = write_results("endpoints", results, {
+        "database": database_url.split(":", 1)[0],
+        "profiles": profiles,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+    }, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,127 @@
+"""
+Card import benchmark.
+
+Imports the same synthetic cards into fresh decks through the old per-row
+ORM path (Card objects + add_all) and through bulk_import.insert_cards (COPY
+via a staging table on Postgres, batched executemany elsewhere), search
+indexing included, and reports wall time and rows per second.
+
+    python -m bench.imports --cards 100000
+    python -m bench.imports --cards 100000 --database-url postgresql://localhost/srs_bench
+
+Without --database-url a temporary SQLite file is used. A Postgres URL must
+point at an empty database.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+from bench.common import print_table, write_results
+from bench.seed import fake_card
+
+
+def import_orm(db, deck_id: int, cards: List[dict]) -> int:
+    from models import Card
+
+    db.add_all([
+        Card(deck_id=deck_id, word=card["word"], definition=card["definition"],
+             synonyms=card["synonyms"], examples=card["examples"])
+        for card in cards
+    ])
+    db.flush()
+    return len(cards)
+
+
+def import_bulk(db, deck_id: int, cards: List[dict]) -> int:
+    from bulk_import import insert_cards
+
+    return insert_cards(db, deck_id, cards)
+
+
+METHODS = {"orm": import_orm, "bulk": import_bulk}
+
+
+def generate_cards(count: int, seed: int) -> List[dict]:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    return [
+        {key: card[key] for key in ("word", "definition", "synonyms", "examples")}
+        for card in (fake_card(rng, deck_id=0, now=now) for _ in range(count))
+    ]
+
+
+def run(card_counts: List[int], methods: List[str], seed: int) -> List[dict]:
+    from bulk_import import supports_copy
+    from database import SessionLocal
+    from models import Deck, User
+
+    db = SessionLocal()
+    try:
+        user = User(username=f"bench-imports-{seed}-{time.time_ns()}", password_hash="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+        path = "copy" if supports_copy(db) else "executemany"
+
+        results = []
+        for count in card_counts:
+            cards = generate_cards(count, seed)
+            for method in methods:
+                deck = Deck(name=f"{method}-{count}", user_id=user_id)
+                db.add(deck)
+                db.commit()
+                deck_id = deck.id
+
+                started = time.perf_counter()
+                imported = METHODS[method](db, deck_id, cards)
+                db.commit()
+                elapsed = time.perf_counter() - started
+                db.expunge_all()
+
+                results.append({
+                    "cards": count,
+                    "method": method if method == "orm" else f"bulk ({path})",
+                    "imported": imported,
+                    "seconds": round(elapsed, 3),
+                    "rows_per_second": round(imported / elapsed) if elapsed else 0,
+                })
+                print_table(results[-1:], ["cards", "method"], ["seconds", "rows_per_second"], header=len(results) == 1)
+        return results
+    finally:
+        db.close()
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ORM against bulk card imports")
+    parser.add_argument("--database-url", help="Empty database to use (default: temporary SQLite file)")
+    parser.add_argument("--cards", type=int, action="append", help="Cards per import (repeatable, default: 100000)")
+    parser.add_argument("--method", action="append", choices=sorted(METHODS), help="Import paths (default: both)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result JSON path (default: bench/results/imports-<time>.json)")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='srs-bench-'), 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+
+    from migrate_db import prepare_database
+
+    prepare_database()
+
+    card_counts = args.cards or [100000]
+    methods = args.method or ["orm", "bulk"]
+    results = run(card_counts, methods, args.seed)
+    path = write_results("imports", results, {
+        "database": database_url.split(":", 1)[0],
+        "cards": card_counts,
+        "methods": methods,
+        "seed": args.seed,
+    }, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,170 @@
+"""
+Seeded synthetic dataset generator.
+
+Builds users with nested folders and decks of realistic cards (synonyms,
+examples with Chinese translations, and a spread of SM-2 states from new to
+mature, overdue to far future) straight into any DATABASE_URL. The same
+seed always produces the same data.
+
+    python -m bench.seed --database-url sqlite:///bench.db --profile medium
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+# Library shapes per user: folders nest `folder_depth` deep, `folder_count` wide
+PROFILES = {
+    "small": {"folder_count": 2, "folder_depth": 2, "decks": 4, "cards_min": 10, "cards_max": 200},
+    "medium": {"folder_count": 4, "folder_depth": 3, "decks": 20, "cards_min": 50, "cards_max": 2000},
+    "large": {"folder_count": 6, "folder_depth": 4, "decks": 40, "cards_min": 200, "cards_max": 50000},
+}
+
+INSERT_BATCH_SIZE = 5000
+SYLLABLES = ["ab", "ac", "al", "an", "ar", "be", "ca", "de", "di", "en", "er", "fa", "ga", "in", "io",
+             "la", "le", "ma", "mo", "ne", "or", "pe", "ra", "re", "ri", "sa", "ta", "te", "ti", "um", "ur", "va"]
+HAN = "的一是不了人我在有他這中大來上國個到說們為子和你地出道也時年得就那要下以生會自著去之過家學對可"
+
+
+def fake_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def fake_han(rng: random.Random, low: int, high: int) -> str:
+    return "".join(rng.choice(HAN) for _ in range(rng.randint(low, high)))
+
+
+def fake_sm2_state(rng: random.Random, now: datetime) -> dict:
+    """New, learning or mature card with a plausible due date."""
+    roll = rng.random()
+    if roll < 0.3:
+        return {"interval": 0, "repetition": 0, "ease_factor": 2.5, "next_review_date": now - timedelta(days=rng.randint(0, 30))}
+    if roll < 0.6:
+        interval = rng.choice([1, 1, 2, 3, 6])
+        repetition = rng.randint(0, 2)
+    else:
+        interval = rng.randint(7, 400)
+        repetition = rng.randint(3, 15)
+    return {
+        "interval": interval,
+        "repetition": repetition,
+        "ease_factor": round(rng.uniform(1.3, 2.9), 2),
+        "next_review_date": now + timedelta(days=rng.randint(-interval, interval), hours=rng.randint(0, 23)),
+    }
+
+
+def fake_card(rng: random.Random, deck_id: int, now: datetime) -> dict:
+    word = fake_word(rng)
+    examples = None
+    if rng.random() < 0.7:
+        examples = [
+            {"sentence": f"The {fake_word(rng)} had a *{word}* {fake_word(rng)}.", "translation": fake_han(rng, 6, 14)}
+            for _ in range(rng.randint(1, 3))
+        ]
+    synonyms = [fake_word(rng) for _ in range(rng.randint(1, 4))] if rng.random() < 0.5 else None
+    return {
+        "deck_id": deck_id,
+        "word": word,
+        "definition": fake_han(rng, 2, 8),
+        "synonyms": synonyms,
+        "examples": examples,
+        "is_starred": rng.random() < 0.05,
+        "created_at": now,
+        "updated_at": now,
+        **fake_sm2_state(rng, now),
+    }
+
+
+def seed_user(db: Session, username: str, profile: str, rng: random.Random) -> Dict:
+    """Create one user with a library of the given profile. Returns ids for benchmarks."""
+    from auth import get_password_hash
+    from models import User, Folder, Deck, Card
+
+    shape = PROFILES[profile]
+    now = datetime.utcnow()
+
+    user = User(username=username, password_hash=get_password_hash("bench"))
+    db.add(user)
+    db.flush()
+
+    folder_ids: List[int] = []
+    for _ in range(shape["folder_count"]):
+        parent_id = None
+        for depth in range(shape["folder_depth"]):
+            folder = Folder(name=f"{fake_word(rng).title()} {depth}", user_id=user.id, parent_folder_id=parent_id)
+            db.add(folder)
+            db.flush()
+            folder_ids.append(folder.id)
+            parent_id = folder.id
+
+    deck_ids: List[int] = []
+    card_total = 0
+    for deck_index in range(shape["decks"]):
+        # A few root decks, the rest spread over the folder tree
+        folder_id = rng.choice(folder_ids) if folder_ids and deck_index % 5 else None
+        deck = Deck(name=f"{fake_word(rng).title()} deck", user_id=user.id, folder_id=folder_id)
+        db.add(deck)
+        db.flush()
+        deck_ids.append(deck.id)
+
+        # Log-uniform deck sizes: mostly small decks, occasionally a huge one
+        size = int(shape["cards_min"] * (shape["cards_max"] / shape["cards_min"]) ** rng.random())
+        if deck_index == 0:
+            size = shape["cards_max"]
+        for start in range(0, size, INSERT_BATCH_SIZE):
+            rows = [fake_card(rng, deck.id, now) for _ in range(min(INSERT_BATCH_SIZE, size - start))]
+            db.execute(insert(Card), rows)
+        card_total += size
+
+    db.commit()
+    return {
+        "user_id": user.id,
+        "username": username,
+        "profile": profile,
+        "folder_ids": folder_ids,
+        "deck_ids": deck_ids,
+        "card_count": card_total,
+    }
+
+
+def seed_database(profiles: List[str], seed: int = 42) -> List[Dict]:
+    """Seed one user per profile into the configured DATABASE_URL and rebuild the search index."""
+    from database import SessionLocal
+    from migrate_db import prepare_database
+    from search_index import rebuild_search_index
+
+    prepare_database()
+
+    rng = random.Random(seed)
+    db = SessionLocal()
+    try:
+        users = [
+            seed_user(db, f"bench-{profile}-{index}-{seed}", profile, rng)
+            for index, profile in enumerate(profiles)
+        ]
+        # Bulk inserts bypass the ORM flush hook that normally feeds the index
+        rebuild_search_index(db)
+        db.commit()
+        return users
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    import os
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic SRS dataset")
+    parser.add_argument("--database-url", help="Target database (defaults to DATABASE_URL)")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="Library profile per user; repeat for several users (default: small medium)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+
+    for seeded in seed_database(args.profile or ["small", "medium"], args.seed):
+        print(f"{seeded['username']}: {len(seeded['deck_ids'])} decks, {seeded['card_count']} cards")
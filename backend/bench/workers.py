@@ -0,0 +1,177 @@
+"""
+Multi-worker throughput benchmark.
+
+Seeds a database once, then starts the real server (gunicorn.conf.py, uvicorn
+workers, preload_app) with each requested worker count and drives it over TCP
+with concurrent keep-alive clients. Reports throughput and latency per worker
+count and endpoint, plus the speedup over the smallest worker count.
+
+    python -m bench.workers --workers 1 --workers 2 --workers 4 --concurrency 12
+
+The summary cache is disabled in every run (SUMMARY_CACHE_TTL=0) because it
+is only on by default for a single worker. The load generator is one Python
+process; when its CPU saturates, the scaling it reports flattens, so run it
+on a machine with spare cores. Without --database-url a temporary SQLite file
+is used; writes then serialize on the SQLite lock, so the default endpoints
+are read-only. Keep --concurrency below one worker's connection pool (15 by
+default): handlers query on the event loop, so a worker that waits for a
+pooled connection stalls until the pool timeout.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+from bench.common import latency_summary, print_table, write_results
+from bench.endpoints import SCENARIOS, build_contexts, run_scenario
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ENDPOINTS = ["library", "deck_cards", "study_deck", "summary"]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, database_url: str, log_path: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "SUMMARY_CACHE_TTL": "0",
+    }
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py"],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+
+async def wait_until_ready(client, process: subprocess.Popen, workers: int, timeout: float = 60) -> None:
+    """Wait for /health, then until every worker has had a chance to boot."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                await asyncio.sleep(0.5 * workers)
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("Server did not become ready in time")
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def run_workers(users: List[dict], workers: int, database_url: str, scenarios: List[str],
+                      requests: int, concurrency: int, warmup: int, log_path: str) -> List[dict]:
+    import httpx
+
+    results = []
+    port = free_port()
+    process = start_server(workers, port, database_url, log_path)
+    try:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_until_ready(client, process, workers)
+            for ctx in users:
+                for name in scenarios:
+                    scenario = SCENARIOS[name]
+                    await run_scenario(client, ctx, scenario, warmup, concurrency, seed=0)
+                    latencies, errors, elapsed = await run_scenario(
+                        client, ctx, scenario, requests, concurrency, seed=1
+                    )
+                    results.append({
+                        "workers": workers,
+                        "profile": ctx["profile"],
+                        "endpoint": name,
+                        "errors": errors,
+                        **latency_summary(latencies, elapsed),
+                    })
+    finally:
+        stop_server(process)
+    return results
+
+
+def add_speedup(results: List[dict]) -> None:
+    """Throughput relative to the smallest worker count for the same profile and endpoint."""
+    baseline = {}
+    for row in sorted(results, key=lambda item: item["workers"]):
+        key = (row["profile"], row["endpoint"])
+        baseline.setdefault(key, row["throughput_rps"])
+        row["speedup"] = round(row["throughput_rps"] / baseline[key], 2) if baseline[key] else 0.0
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark throughput against the number of worker processes")
+    parser.add_argument("--database-url", help="Empty database to seed (default: temporary SQLite file)")
+    parser.add_argument("--profile", action="append", help="Data size profile(s) from bench.seed.PROFILES")
+    parser.add_argument("--workers", type=int, action="append", help="Worker counts to run (default: 1 2 4)")
+    parser.add_argument("--endpoint", action="append", choices=sorted(SCENARIOS),
+                        help=f"Endpoints to run (default: {' '.join(DEFAULT_ENDPOINTS)})")
+    parser.add_argument("--requests", type=int, default=400, help="Measured requests per endpoint and worker count")
+    parser.add_argument("--concurrency", type=int, default=12, help="Concurrent in-flight requests")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result JSON path (default: bench/results/workers-<time>.json)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="srs-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["DATABASE_URL"] = database_url
+    log_path = os.path.join(workdir, "server.log")
+
+    from bench.seed import seed_database
+
+    profiles = args.profile or ["medium"]
+    worker_counts = sorted(set(args.workers or [1, 2, 4]))
+    scenarios = args.endpoint or DEFAULT_ENDPOINTS
+
+    seed_started = time.perf_counter()
+    users = build_contexts(seed_database(profiles, args.seed))
+    print(f"Seeded {sum(user['card_count'] for user in users)} cards in {time.perf_counter() - seed_started:.1f}s")
+    print(f"Server logs: {log_path}")
+
+    results = []
+    for workers in worker_counts:
+        results.extend(asyncio.run(run_workers(
+            users, workers, database_url, scenarios, args.requests, args.concurrency, args.warmup, log_path
+        )))
+    add_speedup(results)
+    print_table(
+        results, ["workers", "profile", "endpoint"],
+        ["throughput_rps", "speedup", "p50_ms", "p95_ms", "p99_ms", "errors"],
+    )
+
+    path = write_results("workers", results, {
+        "database": database_url.split(":", 1)[0],
+        "profiles": profiles,
+        "workers": worker_counts,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+    }, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main_cli()
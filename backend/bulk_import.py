@@ -0,0 +1,178 @@
+"""
+Bulk card inserts for the import endpoints.
+
+Parsed cards are written without building ORM objects. On Postgres (psycopg2)
+they are streamed through COPY FROM STDIN into a temporary staging table and
+merged into cards with one INSERT ... SELECT ... RETURNING. Other databases
+get batched executemany INSERTs. Either way the new cards are then added to
+the search index, skipping the delete a re-index would need. Callers own the
+transaction and commit once the import succeeded.
+
+Cards are new unless they carry their own SM-2 state (SCHEDULE_FIELDS), as
+imports of already-studied decks do.
+"""
+import json
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, List, Optional
+
+from sqlalchemy import JSON, DateTime, Float, Integer, Text, cast, column, func, insert, literal, select, table, text
+from sqlalchemy.orm import Session
+
+from deck_operations import initial_schedule
+from models import Card
+from search_index import index_card_ids, index_new_cards
+
+IMPORT_BATCH_SIZE = 1000
+COPY_READ_SIZE = 64 * 1024
+
+# Optional per-card SM-2 state; missing values fall back to initial_schedule
+SCHEDULE_FIELDS = ("interval", "repetition", "ease_factor", "next_review_date")
+
+STAGING_TABLE = "card_import_staging"
+staging = table(
+    STAGING_TABLE,
+    column("seq", Integer), column("word", Text), column("definition", Text),
+    column("synonyms", Text), column("examples", Text),
+    column("interval", Integer), column("repetition", Integer), column("ease_factor", Float),
+    column("next_review_date", DateTime),
+)
+
+
+def _copy_value(value) -> str:
+    """Escape one field for COPY's text format, where \\N is NULL."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if not isinstance(value, str):
+        return str(value)
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _json_text(value) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False)
+
+
+class CopyStream:
+    """File-like COPY source that encodes cards into lines only as psycopg2 reads them."""
+
+    def __init__(self, cards: Iterable[dict]):
+        self._cards = iter(cards)
+        self._buffer = bytearray()
+        self.count = 0
+
+    def _next_line(self) -> Optional[bytes]:
+        card = next(self._cards, None)
+        if card is None:
+            return None
+        self.count += 1
+        fields = [
+            str(self.count), card["word"], card["definition"],
+            _json_text(card.get("synonyms")), _json_text(card.get("examples")),
+            *(card.get(name) for name in SCHEDULE_FIELDS),
+        ]
+        return ("\t".join(_copy_value(field) for field in fields) + "\n").encode("utf-8")
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            line = self._next_line()
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return chunk
+
+
+def supports_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == "postgresql" and dialect.driver == "psycopg2"
+
+
+def _new_card_values(deck_id: int, now: datetime) -> dict:
+    # Python-side defaults don't apply to these statements, so every column is explicit
+    return {
+        "deck_id": deck_id, "is_starred": False, "version": 0, "created_at": now, "updated_at": now,
+        **initial_schedule(now),
+    }
+
+
+def _copy_cards(db: Session, deck_id: int, cards: Iterable[dict], now: datetime) -> List[int]:
+    """COPY into a transaction-scoped staging table, then one INSERT ... SELECT into cards."""
+    connection = db.connection()
+    connection.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+    connection.execute(text(
+        f"CREATE TEMPORARY TABLE {STAGING_TABLE} "
+        "(seq integer, word text, definition text, synonyms text, examples text, "
+        "interval integer, repetition integer, ease_factor double precision, next_review_date timestamp) "
+        "ON COMMIT DROP"
+    ))
+    # The raw psycopg2 cursor shares the session's connection, so COPY joins its transaction
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} (seq, word, definition, synonyms, examples, "
+            f"{', '.join(SCHEDULE_FIELDS)}) FROM STDIN",
+            CopyStream(cards), size=COPY_READ_SIZE,
+        )
+    finally:
+        cursor.close()
+
+    values = _new_card_values(deck_id, now)
+    selected = {
+        "word": staging.c.word,
+        "definition": staging.c.definition,
+        "synonyms": cast(staging.c.synonyms, JSON),
+        "examples": cast(staging.c.examples, JSON),
+        **{name: literal(value, type_=getattr(Card, name).type) for name, value in values.items()},
+        **{
+            name: func.coalesce(staging.c[name], literal(values[name], type_=getattr(Card, name).type))
+            for name in SCHEDULE_FIELDS
+        },
+    }
+    result = connection.execute(
+        insert(Card)
+        .from_select(list(selected), select(*selected.values()).order_by(staging.c.seq))
+        .returning(Card.id)
+    )
+    return [row[0] for row in result]
+
+
+def _insert_cards(db: Session, deck_id: int, cards: Iterable[dict], now: datetime) -> List[int]:
+    """Batched executemany INSERT ... RETURNING, for databases without COPY."""
+    values = _new_card_values(deck_id, now)
+    cards = iter(cards)
+    card_ids = []
+    while True:
+        batch = list(islice(cards, IMPORT_BATCH_SIZE))
+        if not batch:
+            return card_ids
+        rows = [
+            {
+                "word": card["word"], "definition": card["definition"],
+                "synonyms": card.get("synonyms"), "examples": card.get("examples"), **values,
+                **{name: card[name] for name in SCHEDULE_FIELDS if card.get(name) is not None},
+            }
+            for card in batch
+        ]
+        batch_ids = db.scalars(insert(Card).returning(Card.id, sort_by_parameter_order=True), rows).all()
+        # The rows are still in hand, so index them without reading the cards back
+        index_new_cards(db, [
+            (card_id, row["word"], row["definition"], row["synonyms"], row["examples"])
+            for card_id, row in zip(batch_ids, rows)
+        ])
+        card_ids.extend(batch_ids)
+
+
+def insert_cards(db: Session, deck_id: int, cards: Iterable[dict]) -> int:
+    """Insert cards (word, definition, synonyms, examples and optionally SCHEDULE_FIELDS) into a deck."""
+    now = datetime.utcnow()
+    if supports_copy(db):
+        card_ids = _copy_cards(db, deck_id, cards, now)
+        index_card_ids(db, card_ids, new=True)
+    else:
+        card_ids = _insert_cards(db, deck_id, cards, now)
+    return len(card_ids)
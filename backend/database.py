@@ -1,26 +1,77 @@
 import os
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./srs_vocab.db")
 
-# Railway uses postgres:// but SQLAlchemy requires postgresql://
-if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+def normalize_database_url(url: str) -> str:
+    # Railway uses postgres:// but SQLAlchemy requires postgresql://
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
 
-# SQLite requires check_same_thread=False, other databases don't need it
-connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+SQLALCHEMY_DATABASE_URL = normalize_database_url(os.getenv("DATABASE_URL", "sqlite:///./srs_vocab.db"))
+
+# Optional read replica for read-only endpoints (see get_read_db)
+READ_DATABASE_URL = normalize_database_url(os.getenv("READ_DATABASE_URL", ""))
+
+# Worker processes serving the app; gunicorn.conf.py exports it before the app is loaded
+WORKER_COUNT = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+
+def make_engine(url: str):
+    # SQLite requires check_same_thread=False, other databases don't need it
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    # Per worker process: the server holds up to WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections
+    return create_engine(
+        url,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    )
+
+
+engine = make_engine(SQLALCHEMY_DATABASE_URL)
+read_engine = make_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
 
+def _reset_pool_after_fork():
+    # Pooled connections opened before a fork (migrations under gunicorn's
+    # preload_app) share their sockets with the parent. close=False drops them
+    # from the child's pool without closing the parent's connections.
+    engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def read_session_factory(request: Request) -> sessionmaker:
+    """ReadSessionLocal, or SessionLocal while the caller's own recent writes
+    may not have replicated yet (see read_routing)."""
+    request.state.read_only = True
+    return SessionLocal if getattr(request.state, "read_primary", False) else ReadSessionLocal
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints."""
+    db = read_session_factory(request)()
+    try:
+        yield db
+    finally:
+        db.close()
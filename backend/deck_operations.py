@@ -0,0 +1,121 @@
+"""
+Set-based deck duplicate, merge and split.
+
+Cards are copied with INSERT ... SELECT and moved with UPDATE, so a deck of
+any size is handled in a few statements without loading cards into Python.
+Callers own the transaction and commit once the whole operation succeeded.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session, aliased
+
+from models import Card, Deck
+from search_index import index_card_ids, remove_card_ids
+
+# Columns copied verbatim when duplicating a card
+CONTENT_COLUMNS = ("word", "definition", "synonyms", "examples", "is_starred")
+SCHEDULE_COLUMNS = ("interval", "repetition", "ease_factor", "next_review_date")
+
+
+def initial_schedule(now: datetime) -> dict:
+    """SM-2 state of a card that has never been reviewed."""
+    return {"interval": 0, "repetition": 0, "ease_factor": 2.5, "next_review_date": now}
+
+
+def normalized_word(column):
+    return func.lower(func.trim(column))
+
+
+def word_exists_in_deck(deck_id: int):
+    """Correlated EXISTS: a card with the same word (case-insensitive) is already in deck_id."""
+    existing = aliased(Card)
+    return exists().where(
+        existing.deck_id == deck_id,
+        normalized_word(existing.word) == normalized_word(Card.word),
+    )
+
+
+def duplicate_deck_cards(db: Session, source_deck_id: int, target_deck_id: int, keep_schedule: bool) -> int:
+    """Copy every card of source into target with one INSERT ... SELECT."""
+    now = datetime.utcnow()
+    schedule = {} if keep_schedule else initial_schedule(now)
+
+    columns = list(CONTENT_COLUMNS) + list(SCHEDULE_COLUMNS)
+    selected = [getattr(Card, name) for name in CONTENT_COLUMNS]
+    selected += [
+        literal(schedule[name], type_=getattr(Card, name).type) if name in schedule else getattr(Card, name)
+        for name in SCHEDULE_COLUMNS
+    ]
+    # Python-side defaults don't apply to INSERT ... SELECT, so every column is explicit
+    columns += ["deck_id", "version", "created_at", "updated_at"]
+    selected += [
+        literal(target_deck_id),
+        literal(0),
+        literal(now, type_=Card.created_at.type),
+        literal(now, type_=Card.updated_at.type),
+    ]
+
+    new_ids = list(db.scalars(
+        insert(Card).from_select(
+            columns,
+            select(*selected).where(Card.deck_id == source_deck_id).order_by(Card.id),
+        ).returning(Card.id)
+    ))
+    # The copies have no search documents yet, so only inserts are needed
+    index_card_ids(db, new_ids, new=True)
+    return len(new_ids)
+
+
+def move_cards(db: Session, card_filter, target_deck_id: int, keep_schedule: bool) -> int:
+    """Move the cards matching card_filter into target with one UPDATE."""
+    values = {"deck_id": target_deck_id}
+    if not keep_schedule:
+        values.update(initial_schedule(datetime.utcnow()), version=Card.version + 1)
+    result = db.execute(
+        update(Card).where(card_filter).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def merge_decks(
+    db: Session,
+    source_deck_id: int,
+    target_deck_id: int,
+    keep_schedule: bool,
+    skip_duplicates: bool,
+) -> tuple:
+    """Move source's cards into target and delete source.
+
+    With skip_duplicates, cards whose word is already in target stay behind
+    and are deleted along with the source deck. Returns (moved, skipped).
+    """
+    card_filter = Card.deck_id == source_deck_id
+    if skip_duplicates:
+        card_filter = card_filter & ~word_exists_in_deck(target_deck_id)
+    moved = move_cards(db, card_filter, target_deck_id, keep_schedule)
+
+    skipped_ids: List[int] = list(db.scalars(select(Card.id).where(Card.deck_id == source_deck_id)))
+    remove_card_ids(db, skipped_ids)
+    db.execute(delete(Card).where(Card.deck_id == source_deck_id).execution_options(synchronize_session=False))
+    db.execute(delete(Deck).where(Deck.id == source_deck_id).execution_options(synchronize_session=False))
+    return moved, len(skipped_ids)
+
+
+def split_deck(
+    db: Session,
+    source_deck_id: int,
+    target_deck_id: int,
+    card_ids: Optional[List[int]],
+    conditions: list,
+    keep_schedule: bool,
+) -> int:
+    """Move the selected cards of source into the (new) target deck."""
+    card_filter = Card.deck_id == source_deck_id
+    if card_ids is not None:
+        card_filter = card_filter & Card.id.in_(card_ids)
+    for condition in conditions:
+        card_filter = card_filter & condition
+    return move_cards(db, card_filter, target_deck_id, keep_schedule)
@@ -0,0 +1,181 @@
+"""
+Set-based deletion of decks, folders and whole accounts.
+
+Nothing here loads cards into the session. Small deletions run as a few
+DELETE statements inside the request. On Postgres the foreign keys cascade
+(ON DELETE CASCADE, see migrate_db.migrate_foreign_keys), so deleting a deck
+row removes its cards. SQLite does not enforce foreign keys here, so child
+rows are deleted explicitly.
+
+Decks with at least BACKGROUND_DELETE_MIN_CARDS cards are detached instead:
+user_id is set to NULL, which hides them from every user-scoped query, and
+the request returns right away. A sweeper in each worker (one at a time,
+through the "deletions" lease) then removes their cards DELETE_CHUNK_SIZE
+at a time, one short transaction per chunk. Detached decks are just rows
+with no owner, so a restart picks the work up where it stopped. Set
+BACKGROUND_DELETE_MIN_CARDS=0 to always delete inside the request.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, inspect as sa_inspect, select, update
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from due_queues import acquire_lease, lease_holder
+from models import (
+    Card, DailyDueQueue, DailyReviewRollup, Deck, Folder, ImportChunk, ReviewLog,
+    StudySessionRecord, Tombstone, User,
+)
+from search_index import remove_cards_where
+from sync_logic import record_tombstones
+
+BACKGROUND_DELETE_MIN_CARDS = int(os.getenv("BACKGROUND_DELETE_MIN_CARDS", "20000"))
+DELETE_CHUNK_SIZE = int(os.getenv("DELETE_CHUNK_SIZE", "5000"))
+DELETION_SWEEP_INTERVAL = float(os.getenv("DELETION_SWEEP_INTERVAL", "10"))  # Seconds between sweeps
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "deletions"
+
+# Per-engine: whether decks.user_id accepts NULL (older SQLite files keep NOT NULL)
+_can_detach = {}
+
+
+def _cascades(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def can_detach(db: Session) -> bool:
+    bind = db.get_bind()
+    if bind not in _can_detach:
+        columns = sa_inspect(bind).get_columns("decks")
+        _can_detach[bind] = any(col["name"] == "user_id" and col["nullable"] for col in columns)
+    return _can_detach[bind]
+
+
+def _delete_decks(db: Session, deck_condition) -> None:
+    """Delete the matching decks and everything in them."""
+    deck_ids = select(Deck.id).where(deck_condition)
+    remove_cards_where(db, Card.deck_id.in_(deck_ids))
+    if not _cascades(db):
+        db.execute(delete(Card).where(Card.deck_id.in_(deck_ids)).execution_options(synchronize_session=False))
+        db.execute(delete(ImportChunk).where(ImportChunk.deck_id.in_(deck_ids)).execution_options(synchronize_session=False))
+    db.execute(delete(Deck).where(deck_condition).execution_options(synchronize_session=False))
+
+
+def _detach_decks(db: Session, deck_condition) -> None:
+    """Hide the matching decks from their owner; the sweeper deletes them."""
+    deck_ids = select(Deck.id).where(deck_condition)
+    db.execute(delete(ImportChunk).where(ImportChunk.deck_id.in_(deck_ids)).execution_options(synchronize_session=False))
+    db.execute(
+        update(Deck).where(deck_condition)
+        .values(user_id=None, folder_id=None)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _in_background(db: Session, deck_condition) -> bool:
+    if BACKGROUND_DELETE_MIN_CARDS <= 0 or not can_detach(db):
+        return False
+    card_count = db.scalar(
+        select(func.count(Card.id)).where(Card.deck_id.in_(select(Deck.id).where(deck_condition)))
+    )
+    return card_count >= BACKGROUND_DELETE_MIN_CARDS
+
+
+def delete_deck(db: Session, user_id: int, deck_id: int) -> bool:
+    """Delete one deck and record its tombstone. Returns True if its cards are deleted in the background."""
+    condition = (Deck.id == deck_id) & (Deck.user_id == user_id)
+    background = _in_background(db, condition)
+    if background:
+        _detach_decks(db, condition)
+    else:
+        _delete_decks(db, condition)
+    record_tombstones(db, user_id, "deck", [deck_id])
+    return background
+
+
+def delete_folder(db: Session, user_id: int, folder_id: int, parent_folder_id: Optional[int]) -> None:
+    """Delete a folder, moving its decks and subfolders up to its parent."""
+    db.execute(
+        update(Deck).where(Deck.folder_id == folder_id)
+        .values(folder_id=parent_folder_id).execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(Folder).where(Folder.parent_folder_id == folder_id)
+        .values(parent_folder_id=parent_folder_id).execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(Folder).where(Folder.id == folder_id, Folder.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    record_tombstones(db, user_id, "folder", [folder_id])
+
+
+def delete_user(db: Session, user_id: int) -> bool:
+    """Delete an account and all its data. Returns True if card deletion continues in the background."""
+    decks = Deck.user_id == user_id
+    background = _in_background(db, decks)
+    if background:
+        _detach_decks(db, decks)
+    else:
+        _delete_decks(db, decks)
+
+    # Postgres cascades every other table keyed by user from the users row
+    if not _cascades(db):
+        for model in (Folder, Tombstone, ReviewLog, DailyReviewRollup, StudySessionRecord, DailyDueQueue, ImportChunk):
+            db.execute(delete(model).where(model.user_id == user_id).execution_options(synchronize_session=False))
+    db.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
+    return background
+
+
+def sweep_detached_decks(db: Session, max_chunks: int = 20) -> int:
+    """Delete up to max_chunks chunks of detached decks' cards, committing after each. Returns cards deleted."""
+    deleted = 0
+    for _ in range(max_chunks):
+        deck_id = db.scalar(select(Deck.id).where(Deck.user_id.is_(None)).limit(1))
+        if deck_id is None:
+            break
+        # The chunk is an id range, so it is found and deleted without holding its ids in memory
+        last_id = db.scalar(
+            select(Card.id).where(Card.deck_id == deck_id)
+            .order_by(Card.id).offset(DELETE_CHUNK_SIZE - 1).limit(1)
+        )
+        chunk = Card.deck_id == deck_id
+        if last_id is not None:
+            chunk = chunk & (Card.id <= last_id)
+        remove_cards_where(db, chunk)
+        result = db.execute(delete(Card).where(chunk).execution_options(synchronize_session=False))
+        deleted += result.rowcount
+        if last_id is None:
+            db.execute(delete(Deck).where(Deck.id == deck_id).execution_options(synchronize_session=False))
+        db.commit()
+    return deleted
+
+
+def run_deletion_sweep(now: Optional[datetime] = None) -> Optional[int]:
+    """One sweep: cards deleted, or None when another process holds the lease."""
+    now = now or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        if not acquire_lease(db, LEASE_NAME, lease_holder(), timedelta(seconds=DELETION_SWEEP_INTERVAL * 3), now):
+            return None
+        return sweep_detached_decks(db)
+    finally:
+        db.close()
+
+
+async def run_deletion_sweeper() -> None:
+    """Background task sweeping detached decks every DELETION_SWEEP_INTERVAL seconds."""
+    while True:
+        try:
+            # Keep going without waiting while there is a backlog
+            while await asyncio.to_thread(run_deletion_sweep):
+                pass
+        except Exception:
+            logger.exception("Deletion sweep failed")
+        await asyncio.sleep(DELETION_SWEEP_INTERVAL)
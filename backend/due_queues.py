@@ -0,0 +1,297 @@
+"""
+Precomputed daily due queues.
+
+Every morning most users open the app at about the same time, and each first
+request would scan their whole collection for due cards. Instead, a
+background task builds each user's queue (every card due before their local
+day ends) shortly before that day starts, as set by users.utc_offset_minutes.
+
+A queue is a snapshot plus the changes since. On read, cards updated after
+refreshed_at (reviews, edits, imports, moves) are merged in, and tombstoned
+cards and decks are dropped, so the result always matches the live tables.
+Every scheduler tick the leader folds those changes back into the stored
+queues, which keeps the merge done on read small all day.
+
+Each worker runs the scheduler loop, but only the holder of the "due_queues"
+lease in scheduler_leases does any work. The lease is a database row, so
+there is exactly one leader across gunicorn workers and replicas. Set
+DUE_QUEUE_SCHEDULER=0 to turn the loop off; reads then fall back to the live
+queries whenever no queue exists for the day.
+"""
+import asyncio
+import logging
+import os
+import socket
+from collections import defaultdict, namedtuple
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Card, DailyDueQueue, Deck, SchedulerLease, Tombstone, User
+
+DUE_QUEUE_SCHEDULER = os.getenv("DUE_QUEUE_SCHEDULER", "1") == "1"
+DUE_QUEUE_INTERVAL = float(os.getenv("DUE_QUEUE_INTERVAL", "60"))  # Seconds between scheduler ticks
+DUE_QUEUE_LEAD_MINUTES = int(os.getenv("DUE_QUEUE_LEAD_MINUTES", "30"))  # Build this long before a user's day starts
+DUE_QUEUE_BATCH = int(os.getenv("DUE_QUEUE_BATCH", "200"))  # Queues built per transaction
+DUE_QUEUE_RETENTION_DAYS = 2
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "due_queues"
+# Writes commit a little after they stamp updated_at; re-reading this much overlap never misses one
+REFRESH_OVERLAP = timedelta(seconds=10)
+
+EPOCH = datetime(1970, 1, 1)
+
+# One stored entry: [card_id, deck_id, next_review_date in epoch microseconds, interval, repetition]
+QueuedCard = namedtuple("QueuedCard", "id deck_id due_at interval repetition")
+
+_ENTRY_COLUMNS = (Card.id, Card.deck_id, Card.next_review_date, Card.interval, Card.repetition)
+
+
+def local_day(now: datetime, utc_offset_minutes: int) -> date:
+    return (now + timedelta(minutes=utc_offset_minutes)).date()
+
+
+def day_end_utc(day: date, utc_offset_minutes: int) -> datetime:
+    """The UTC instant the user's local `day` ends."""
+    return datetime.combine(day, dt_time.min) + timedelta(days=1) - timedelta(minutes=utc_offset_minutes)
+
+
+def _timestamp(value: datetime) -> int:
+    # Whole microseconds stay exact in JSON, so a queued time equals the column value
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_timestamp(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _entry(row) -> list:
+    card_id, deck_id, next_review_date, interval, repetition = row
+    return [card_id, deck_id, _timestamp(next_review_date), interval or 0, repetition or 0]
+
+
+def _user_deck_ids(user_id: int):
+    return select(Deck.id).where(Deck.user_id == user_id)
+
+
+def build_queue(db: Session, user_id: int, utc_offset_minutes: int, day: date, now: datetime) -> None:
+    """Snapshot every card of the user due before `day` ends and store it (replacing any older one)."""
+    end = day_end_utc(day, utc_offset_minutes)
+    refreshed_at = now - REFRESH_OVERLAP
+    # Both statements drive from the user's deck ids over the covering (deck_id, next_review_date, ...) index
+    rows = db.execute(
+        select(*_ENTRY_COLUMNS).where(Card.deck_id.in_(_user_deck_ids(user_id)), Card.next_review_date < end)
+    ).all()
+    next_due_after = db.scalar(
+        select(func.min(Card.next_review_date))
+        .where(Card.deck_id.in_(_user_deck_ids(user_id)), Card.next_review_date >= end)
+    )
+    db.execute(delete(DailyDueQueue).where(DailyDueQueue.user_id == user_id, DailyDueQueue.day == day))
+    db.execute(insert(DailyDueQueue).values(
+        user_id=user_id, day=day, entries=[_entry(row) for row in rows],
+        next_due_after=next_due_after, refreshed_at=refreshed_at,
+    ))
+
+
+def _merge(entries: Dict[int, list], next_due_after: Optional[datetime], end: datetime,
+           changed_rows: Iterable, deleted_decks: set, deleted_cards: set) -> Optional[datetime]:
+    """Apply tombstones, then changed cards, to entries (by card id). Returns the new next_due_after."""
+    if deleted_decks or deleted_cards:
+        for card_id in [card_id for card_id, entry in entries.items()
+                        if entry[1] in deleted_decks or card_id in deleted_cards]:
+            del entries[card_id]
+    for row in changed_rows:
+        if row[2] < end:
+            entries[row[0]] = _entry(row)
+        else:
+            entries.pop(row[0], None)
+            if next_due_after is None or row[2] < next_due_after:
+                next_due_after = row[2]
+    return next_due_after
+
+
+def _tombstones(db: Session, user_ids: List[int], since: datetime) -> Dict[int, Tuple[set, set]]:
+    deleted = defaultdict(lambda: (set(), set()))
+    rows = db.execute(
+        select(Tombstone.user_id, Tombstone.entity_type, Tombstone.entity_id)
+        .where(Tombstone.user_id.in_(user_ids), Tombstone.deleted_at > since,
+               Tombstone.entity_type.in_(("deck", "card")))
+    )
+    for user_id, entity_type, entity_id in rows:
+        deck_ids, card_ids = deleted[user_id]
+        (deck_ids if entity_type == "deck" else card_ids).add(entity_id)
+    return deleted
+
+
+def current_queue(db: Session, user, now: Optional[datetime] = None) -> Optional[Tuple[List[QueuedCard], Optional[datetime]]]:
+    """Today's queue for the user with changes since its refresh merged in, or None if it wasn't built.
+
+    Returns (cards due before the user's day ends, earliest due time after it).
+    """
+    now = now or datetime.utcnow()
+    offset = user.utc_offset_minutes or 0
+    day = local_day(now, offset)
+    queue = db.execute(
+        select(DailyDueQueue.entries, DailyDueQueue.next_due_after, DailyDueQueue.refreshed_at)
+        .where(DailyDueQueue.user_id == user.id, DailyDueQueue.day == day)
+    ).first()
+    if queue is None:
+        return None
+
+    entries = {entry[0]: entry for entry in queue.entries}
+    changed = db.execute(
+        select(*_ENTRY_COLUMNS)
+        .where(Card.updated_at > queue.refreshed_at, Card.deck_id.in_(_user_deck_ids(user.id)))
+    ).all()
+    deleted_decks, deleted_cards = _tombstones(db, [user.id], queue.refreshed_at).get(user.id, (set(), set()))
+    next_due_after = _merge(
+        entries, queue.next_due_after, day_end_utc(day, offset), changed, deleted_decks, deleted_cards
+    )
+    return [QueuedCard(*entry) for entry in entries.values()], next_due_after
+
+
+def due_now(cards: List[QueuedCard], now: datetime) -> List[QueuedCard]:
+    cutoff = _timestamp(now)
+    return [card for card in cards if card.due_at <= cutoff]
+
+
+def refresh_queues(db: Session, now: datetime) -> int:
+    """Fold changes since each live queue's refresh into it. Returns the number of queues rewritten."""
+    today = now.date()
+    queues = db.execute(
+        select(DailyDueQueue.id, DailyDueQueue.user_id, DailyDueQueue.day, DailyDueQueue.entries,
+               DailyDueQueue.next_due_after, DailyDueQueue.refreshed_at, User.utc_offset_minutes)
+        .join(User, User.id == DailyDueQueue.user_id)
+        .where(DailyDueQueue.day >= today - timedelta(days=1))
+    ).all()
+    if not queues:
+        return 0
+
+    since = min(queue.refreshed_at for queue in queues)
+    changed_by_user = defaultdict(list)
+    for row in db.execute(
+        select(Deck.user_id, *_ENTRY_COLUMNS, Card.updated_at)
+        .join(Deck, Deck.id == Card.deck_id)
+        .where(Card.updated_at > since)
+    ):
+        changed_by_user[row[0]].append(row[1:])
+    deleted = _tombstones(db, list({queue.user_id for queue in queues}), since)
+
+    refreshed_at = now - REFRESH_OVERLAP
+    rewritten = 0
+    for queue in queues:
+        changed = [row[:5] for row in changed_by_user.get(queue.user_id, []) if row[5] > queue.refreshed_at]
+        deleted_decks, deleted_cards = deleted.get(queue.user_id, (set(), set()))
+        if not changed and not deleted_decks and not deleted_cards:
+            continue
+        entries = {entry[0]: entry for entry in queue.entries}
+        next_due_after = _merge(
+            entries, queue.next_due_after, day_end_utc(queue.day, queue.utc_offset_minutes or 0),
+            changed, deleted_decks, deleted_cards,
+        )
+        db.execute(
+            update(DailyDueQueue).where(DailyDueQueue.id == queue.id)
+            .values(entries=list(entries.values()), next_due_after=next_due_after, refreshed_at=refreshed_at)
+        )
+        rewritten += 1
+    # Untouched queues only move their refresh mark forward
+    db.execute(
+        update(DailyDueQueue).where(DailyDueQueue.day >= today - timedelta(days=1), DailyDueQueue.refreshed_at < refreshed_at)
+        .values(refreshed_at=refreshed_at)
+    )
+    return rewritten
+
+
+def _offset_range(day: date, at: datetime) -> Tuple[float, float]:
+    """UTC offsets (minutes, [low, high)) whose local date at `at` is `day`."""
+    day_start = datetime.combine(day, dt_time.min)
+    return (day_start - at) / timedelta(minutes=1), (day_start + timedelta(days=1) - at) / timedelta(minutes=1)
+
+
+def build_upcoming_queues(db: Session, now: datetime, batch_size: int = DUE_QUEUE_BATCH) -> int:
+    """Build queues for users whose next local day starts within the lead time (or has already started).
+
+    Only users still missing that day's queue are selected, batch_size at a
+    time with a commit after each batch, until none are left.
+    """
+    lead = now + timedelta(minutes=DUE_QUEUE_LEAD_MINUTES)
+    offset = func.coalesce(User.utc_offset_minutes, 0)
+    built = 0
+    # UTC offsets stay within a day of UTC, so the day at `lead` is one of three
+    for day in (lead.date() - timedelta(days=1), lead.date(), lead.date() + timedelta(days=1)):
+        low, high = _offset_range(day, lead)
+        missing = (
+            select(User.id, offset)
+            .where(offset >= low, offset < high)
+            .where(~select(DailyDueQueue.id).where(DailyDueQueue.user_id == User.id, DailyDueQueue.day == day).exists())
+            .order_by(User.id)
+            .limit(batch_size)
+        )
+        while True:
+            users = db.execute(missing).all()
+            if not users:
+                break
+            for user_id, user_offset in users:
+                build_queue(db, user_id, user_offset, day, now)
+            db.commit()
+            built += len(users)
+    return built
+
+
+def acquire_lease(db: Session, name: str, holder: str, ttl: timedelta, now: datetime) -> bool:
+    """Take or renew a named lease. True if `holder` now owns it."""
+    renewed = db.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name, or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now))
+        .values(holder=holder, expires_at=now + ttl)
+    ).rowcount
+    if not renewed:
+        if db.get(SchedulerLease, name) is not None:
+            db.rollback()
+            return False
+        try:
+            db.execute(insert(SchedulerLease).values(name=name, holder=holder, expires_at=now + ttl))
+        except IntegrityError:
+            db.rollback()
+            return False
+    db.commit()
+    return True
+
+
+def lease_holder() -> str:
+    # Looked up per call: under gunicorn's preload the module is imported before the workers fork
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_scheduler_tick(now: Optional[datetime] = None) -> Optional[Tuple[int, int]]:
+    """One scheduler pass: (queues built, queues refreshed), or None when another process leads."""
+    now = now or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        if not acquire_lease(db, LEASE_NAME, lease_holder(), timedelta(seconds=DUE_QUEUE_INTERVAL * 3), now):
+            return None
+        refreshed = refresh_queues(db, now)
+        built = build_upcoming_queues(db, now)
+        db.execute(delete(DailyDueQueue).where(
+            DailyDueQueue.day < now.date() - timedelta(days=DUE_QUEUE_RETENTION_DAYS)
+        ))
+        db.commit()
+        return built, refreshed
+    finally:
+        db.close()
+
+
+async def run_due_queue_scheduler() -> None:
+    """Background task running a scheduler tick every DUE_QUEUE_INTERVAL seconds."""
+    while True:
+        try:
+            await asyncio.to_thread(run_scheduler_tick)
+        except Exception:
+            logger.exception("Due queue scheduler tick failed")
+        await asyncio.sleep(DUE_QUEUE_INTERVAL)
@@ -0,0 +1,236 @@
+"""
+Streaming deck exports.
+
+Every format writes what the importers read back: pipe lines for
+parse_pipe_line, CSV rows for parse_csv_line and NDJSON objects shaped like
+ImportCard. Rows are pulled from the database in yield_per batches on a
+session owned by the generator (from the factory the router picked, usually
+the read replica), so memory stays flat however large the export is.
+
+Backslash, parentheses and "|" delimit synonyms, examples and (in pipe
+lines) fields, so they are backslash-escaped wherever they would be read as
+syntax; the importers undo it. Examples like "(a red one)" or "either | or"
+therefore survive the round trip.
+"""
+import csv
+import json
+import re
+import zipfile
+from io import StringIO
+from typing import Iterator, List, Optional
+from urllib.parse import quote
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import Deck, Card, Folder
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    # format: (media type, file extension)
+    "pipe": ("text/plain; charset=utf-8", "txt"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+CSV_HEADER = ["word", "definition", "synonyms", "examples"]
+
+_SYNTAX_RE = re.compile(r"([\\()|])")
+
+
+def _single_line(value: Optional[str]) -> str:
+    return re.sub(r"\s*[\r\n]+\s*", " ", value or "").strip()
+
+
+def escape_field(value: str) -> str:
+    """Backslash-escape the characters the import syntax treats as delimiters."""
+    return _SYNTAX_RE.sub(r"\\\1", value)
+
+
+def _format_synonyms(synonyms: Optional[list]) -> str:
+    return " | ".join(escape_field(_single_line(s)) for s in synonyms or [] if s)
+
+
+def _format_examples(examples: Optional[list]) -> str:
+    """(sentence | translation); (sentence2) — the syntax parse_examples reads."""
+    parts = []
+    for example in examples or []:
+        sentence = escape_field(_single_line((example or {}).get("sentence")))
+        if not sentence:
+            continue
+        translation = escape_field(_single_line((example or {}).get("translation")))
+        parts.append(f"({sentence} | {translation})" if translation else f"({sentence})")
+    return "; ".join(parts)
+
+
+def format_pipe_line(word: str, definition: str, synonyms: Optional[list], examples: Optional[list]) -> str:
+    """word || meaning || syn1 | syn2 || (example1 | trans1); (example2 | trans2)"""
+    parts = [escape_field(_single_line(word)), escape_field(_single_line(definition))]
+    synonyms_str = _format_synonyms(synonyms)
+    examples_str = _format_examples(examples)
+    if synonyms_str or examples_str:
+        parts.append(synonyms_str)
+    if examples_str:
+        parts.append(examples_str)
+    return " || ".join(parts) + "\n"
+
+
+def format_csv_line(word: str, definition: str, synonyms: Optional[list], examples: Optional[list]) -> str:
+    """word, meaning, syn1 | syn2, (example1 | trans1); (example2 | trans2)"""
+    buffer = StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow([
+        word,
+        definition,
+        _format_synonyms(synonyms),
+        _format_examples(examples),
+    ])
+    return buffer.getvalue()
+
+
+def format_ndjson_line(word: str, definition: str, synonyms: Optional[list], examples: Optional[list]) -> str:
+    return json.dumps({
+        "word": word,
+        "def": definition,
+        "synonyms": synonyms or None,
+        "examples": examples or None,
+    }, ensure_ascii=False) + "\n"
+
+
+LINE_FORMATTERS = {
+    "pipe": format_pipe_line,
+    "csv": format_csv_line,
+    "ndjson": format_ndjson_line,
+}
+
+
+def _header(export_format: str) -> str:
+    if export_format == "csv":
+        return ",".join(CSV_HEADER) + "\n"
+    return ""
+
+
+def content_disposition(filename: str) -> str:
+    """Attachment header that survives non-ASCII deck names."""
+    fallback = re.sub(r'[^A-Za-z0-9._-]+', "_", filename) or "export"
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def safe_filename(name: str) -> str:
+    return re.sub(r'[\\/:*?"<>|\x00-\x1f]+', "_", name).strip(" .") or "untitled"
+
+
+def _card_columns():
+    return (Card.word, Card.definition, Card.synonyms, Card.examples)
+
+
+def stream_deck(deck_id: int, export_format: str, session_factory=SessionLocal) -> Iterator[bytes]:
+    """Yield one deck's cards in the requested format."""
+    format_line = LINE_FORMATTERS[export_format]
+    db = session_factory()
+    try:
+        header = _header(export_format)
+        if header:
+            yield header.encode("utf-8")
+
+        result = db.execute(
+            select(*_card_columns())
+            .where(Card.deck_id == deck_id)
+            .order_by(Card.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for batch in result.partitions():
+            yield "".join(format_line(*row) for row in batch).encode("utf-8")
+    finally:
+        db.close()
+
+
+class _ZipSink:
+    """Write-only, unseekable file object whose contents are drained after every write."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _deck_paths(db, user_id: int) -> dict:
+    """Archive path for every deck, e.g. 'Folder/Subfolder/Deck.txt' minus the extension."""
+    folders = {
+        folder_id: (name, parent_id)
+        for folder_id, name, parent_id in db.execute(
+            select(Folder.id, Folder.name, Folder.parent_folder_id).where(Folder.user_id == user_id)
+        )
+    }
+
+    def folder_path(folder_id):
+        parts = []
+        seen = set()
+        while folder_id in folders and folder_id not in seen:
+            seen.add(folder_id)
+            name, folder_id = folders[folder_id]
+            parts.append(safe_filename(name))
+        return "/".join(reversed(parts))
+
+    paths = {}
+    used = set()
+    for deck_id, name, folder_id in db.execute(
+        select(Deck.id, Deck.name, Deck.folder_id).where(Deck.user_id == user_id).order_by(Deck.id)
+    ):
+        prefix = folder_path(folder_id)
+        path = f"{prefix}/{safe_filename(name)}" if prefix else safe_filename(name)
+        if path in used:
+            path = f"{path} ({deck_id})"
+        used.add(path)
+        paths[deck_id] = path
+    return paths
+
+
+def stream_library_zip(user_id: int, export_format: str, session_factory=SessionLocal) -> Iterator[bytes]:
+    """Yield a zip archive with one file per deck, built while cards stream from the database."""
+    format_line = LINE_FORMATTERS[export_format]
+    extension = EXPORT_FORMATS[export_format][1]
+    header = _header(export_format)
+
+    db = session_factory()
+    sink = _ZipSink()
+    try:
+        paths = _deck_paths(db, user_id)
+        # Outer join so empty decks still get a file; one ordered pass over every card
+        result = db.execute(
+            select(Deck.id, *_card_columns())
+            .outerjoin(Card, Card.deck_id == Deck.id)
+            .where(Deck.user_id == user_id)
+            .order_by(Deck.id, Card.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            entry = None
+            current_deck_id = None
+            for batch in result.partitions():
+                for deck_id, word, definition, synonyms, examples in batch:
+                    if deck_id != current_deck_id:
+                        if entry is not None:
+                            entry.close()
+                        entry = archive.open(f"{paths[deck_id]}.{extension}", mode="w", force_zip64=True)
+                        entry.write(header.encode("utf-8"))
+                        current_deck_id = deck_id
+                    if word is not None:
+                        entry.write(format_line(word, definition, synonyms, examples).encode("utf-8"))
+                yield sink.drain()
+            if entry is not None:
+                entry.close()
+        yield sink.drain()
+    finally:
+        db.close()
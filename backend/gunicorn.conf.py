@@ -0,0 +1,25 @@
+"""
+Gunicorn settings for multi-process serving.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+The app is imported once in the master (preload_app), so tables, migrations
+and the search index are set up exactly once before any worker forks. Each
+worker then starts with an empty connection pool (see database.py) and runs
+its own event loop and review-log flusher.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, multiprocessing.cpu_count()))))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# AI generation requests can take a while; keep them from being killed as hung workers
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+# Read by the app at import (database.WORKER_COUNT) to choose cross-worker-safe caches
+os.environ["WEB_CONCURRENCY"] = str(workers)
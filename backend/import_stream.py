@@ -0,0 +1,165 @@
+"""
+Resumable NDJSON imports.
+
+A large import is uploaded as numbered chunks under one client-chosen import
+id. Each chunk body is NDJSON, one ImportCard per line, of at most
+IMPORT_MAX_CHUNK_CARDS cards. Cards are validated line by line as the body
+arrives and kept as parsed values (the raw body is never buffered whole).
+Nothing is written until the body has been read, so a slow upload holds no
+locks. The chunk is then written in a worker thread, off the event loop.
+
+A chunk commits as a unit, together with its import_chunks row. Sending a
+committed chunk again returns its stored result and inserts nothing. An
+upload that was cut off resumes by asking which chunks are committed and
+sending the others. A chunk that fails halfway (bad line, dropped
+connection) rolls back completely and can simply be resent.
+"""
+import asyncio
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from bulk_import import IMPORT_BATCH_SIZE, insert_cards
+from models import ImportChunk
+from schemas import ImportCard
+
+IMPORT_MAX_LINE_BYTES = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+IMPORT_MAX_CHUNK_CARDS = int(os.getenv("IMPORT_MAX_CHUNK_CARDS", "20000"))
+
+
+def _card_values(card: ImportCard) -> dict:
+    return {
+        "word": card.word,
+        "definition": card.definition,
+        "synonyms": card.synonyms,
+        "examples": [ex.model_dump() for ex in card.examples] if card.examples else None,
+    }
+
+
+def _parse_line(line: bytes, line_number: int) -> dict:
+    try:
+        return _card_values(ImportCard.model_validate_json(line))
+    except ValidationError as e:
+        error = e.errors()[0]
+        location = ".".join(str(part) for part in error["loc"])
+        detail = f"{location}: {error['msg']}" if location else error["msg"]
+        raise HTTPException(status_code=400, detail=f"Line {line_number}: {detail}")
+
+
+async def ndjson_cards(body: AsyncIterator[bytes]) -> AsyncIterator[dict]:
+    """Validated card values from an NDJSON byte stream; blank lines are skipped."""
+    buffer = b""
+    line_number = 0
+    async for data in body:
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_line(line, line_number)
+        if len(buffer) > IMPORT_MAX_LINE_BYTES:
+            raise HTTPException(status_code=400, detail=f"Line {line_number + 1} is too long")
+    if buffer.strip():
+        yield _parse_line(buffer, line_number + 1)
+
+
+def committed_chunk(db: Session, user_id: int, import_id: str, seq: int) -> Optional[ImportChunk]:
+    return db.query(ImportChunk).filter(
+        ImportChunk.user_id == user_id,
+        ImportChunk.import_id == import_id,
+        ImportChunk.seq == seq
+    ).first()
+
+
+def import_deck_id(db: Session, user_id: int, import_id: str) -> Optional[int]:
+    return db.scalar(
+        select(ImportChunk.deck_id)
+        .where(ImportChunk.user_id == user_id, ImportChunk.import_id == import_id)
+        .limit(1)
+    )
+
+
+def import_progress(db: Session, user_id: int, import_id: str) -> Tuple[list, int]:
+    """(committed chunk numbers in order, cards imported by them)."""
+    rows = db.execute(
+        select(ImportChunk.seq, ImportChunk.card_count)
+        .where(ImportChunk.user_id == user_id, ImportChunk.import_id == import_id)
+        .order_by(ImportChunk.seq)
+    ).all()
+    return [seq for seq, _ in rows], sum(count for _, count in rows)
+
+
+def claim_chunk(db: Session, user_id: int, deck_id: int, import_id: str, seq: int) -> Tuple[Optional[int], int]:
+    """Write a chunk's row ahead of its cards: (row id, 0), or (None, its card count) if already committed.
+
+    Written first, the row makes a concurrent retry of the same chunk fail on
+    the unique index instead of inserting the cards twice.
+    """
+    existing = committed_chunk(db, user_id, import_id, seq)
+    if existing is not None:
+        return None, existing.card_count
+
+    try:
+        chunk_id = db.execute(
+            insert(ImportChunk)
+            .values(user_id=user_id, import_id=import_id, seq=seq, deck_id=deck_id, card_count=0)
+            .returning(ImportChunk.id)
+        ).scalar_one()
+    except IntegrityError:
+        db.rollback()
+        existing = committed_chunk(db, user_id, import_id, seq)
+        if existing is None:
+            raise
+        return None, existing.card_count
+    return chunk_id, 0
+
+
+def finish_chunk(db: Session, chunk_id: int, card_count: int) -> None:
+    db.execute(update(ImportChunk).where(ImportChunk.id == chunk_id).values(card_count=card_count))
+
+
+async def read_chunk(body: AsyncIterator[bytes]) -> List[dict]:
+    """Every card of a chunk body, validated; rejects chunks over IMPORT_MAX_CHUNK_CARDS."""
+    cards = []
+    async for card in ndjson_cards(body):
+        if len(cards) >= IMPORT_MAX_CHUNK_CARDS:
+            raise HTTPException(
+                status_code=413, detail=f"A chunk holds at most {IMPORT_MAX_CHUNK_CARDS} cards"
+            )
+        cards.append(card)
+    return cards
+
+
+def write_chunk(db: Session, user_id: int, deck_id: int, import_id: str, seq: int,
+                cards: List[dict]) -> Tuple[int, bool]:
+    """Claim the chunk, insert its cards and commit. Returns (cards in the chunk, was a retry)."""
+    chunk_id, committed_count = claim_chunk(db, user_id, deck_id, import_id, seq)
+    if chunk_id is None:
+        return committed_count, True
+
+    imported = 0
+    for start in range(0, len(cards), IMPORT_BATCH_SIZE):
+        imported += insert_cards(db, deck_id, cards[start:start + IMPORT_BATCH_SIZE])
+    finish_chunk(db, chunk_id, imported)
+    db.commit()
+    return imported, False
+
+
+async def import_chunk(db: Session, user_id: int, deck_id: int, import_id: str, seq: int,
+                       body: AsyncIterator[bytes]) -> Tuple[int, bool]:
+    """Insert one chunk's cards unless it is already committed. Returns (cards in the chunk, was a retry).
+
+    The body is read and validated completely before the first write, and
+    the chunk commits before this returns.
+    """
+    existing = committed_chunk(db, user_id, import_id, seq)
+    if existing is not None:
+        return existing.card_count, True
+
+    cards = await read_chunk(body)
+    return await asyncio.to_thread(write_chunk, db, user_id, deck_id, import_id, seq, cards)
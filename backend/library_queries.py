@@ -0,0 +1,119 @@
+"""
+Set-based queries over the folder tree and deck statistics.
+
+Folder hierarchies are walked with recursive CTEs and deck statistics are
+aggregated in SQL, so library views cost a fixed number of queries no
+matter how deeply folders nest or how many cards a deck holds.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import String, and_, case, cast, func, literal, select
+from sqlalchemy.orm import Session
+
+from models import Folder, Deck, Card
+
+
+def card_has_examples():
+    """SQL condition matching cards with at least one example (JSON null and [] excluded)."""
+    return and_(
+        Card.examples.isnot(None),
+        cast(Card.examples, String).notin_(["null", "[]"]),
+    )
+
+
+def familiarity_condition(bucket: Optional[str]):
+    """Familiarity bucket filter by interval in days: low 0-1, medium 2-3, high 4+."""
+    interval = func.coalesce(Card.interval, 0)
+    if bucket == "low":
+        return interval.between(0, 1)
+    if bucket == "medium":
+        return interval.between(2, 3)
+    if bucket == "high":
+        return interval >= 4
+    return None
+
+
+def folder_subtree_cte(user_id: int, root_folder_id: int):
+    """Recursive CTE of the ids of a folder and all of its descendants.
+
+    UNION (not UNION ALL) keeps the recursion finite even if bad data ever
+    contains a cycle.
+    """
+    subtree = select(Folder.id).where(
+        Folder.id == root_folder_id,
+        Folder.user_id == user_id,
+    ).cte("folder_subtree", recursive=True)
+    return subtree.union(
+        select(Folder.id).where(
+            Folder.parent_folder_id == subtree.c.id,
+            Folder.user_id == user_id,
+        )
+    )
+
+
+def folder_ancestor_cte(user_id: int, folder_id: int):
+    """Recursive CTE of (id, name, parent_folder_id, depth) from a folder up to its root."""
+    ancestors = select(
+        Folder.id, Folder.name, Folder.parent_folder_id, literal(0).label("depth")
+    ).where(
+        Folder.id == folder_id,
+        Folder.user_id == user_id,
+    ).cte("folder_ancestors", recursive=True)
+    return ancestors.union(
+        select(
+            Folder.id, Folder.name, Folder.parent_folder_id, (ancestors.c.depth + 1).label("depth")
+        ).where(
+            Folder.id == ancestors.c.parent_folder_id,
+            Folder.user_id == user_id,
+        )
+    )
+
+
+def folder_ancestor_path(db: Session, user_id: int, folder_id: int) -> List[dict]:
+    """Folders from the root down to (and including) folder_id, in one query."""
+    ancestors = folder_ancestor_cte(user_id, folder_id)
+    rows = db.execute(
+        select(ancestors.c.id, ancestors.c.name).order_by(ancestors.c.depth.desc())
+    ).all()
+    return [{"id": row.id, "name": row.name} for row in rows]
+
+
+def is_in_subtree(db: Session, user_id: int, root_folder_id: int, folder_id: int) -> bool:
+    """Whether folder_id is root_folder_id or one of its descendants."""
+    subtree = folder_subtree_cte(user_id, root_folder_id)
+    return db.execute(
+        select(subtree.c.id).where(subtree.c.id == folder_id).limit(1)
+    ).first() is not None
+
+
+def deck_stats_map(db: Session, user_id: int, deck_ids: Optional[List[int]] = None) -> Dict[int, dict]:
+    """Card, mastered, due and with-examples counts per deck, aggregated in one query."""
+    now = datetime.utcnow()
+    query = db.query(
+        Card.deck_id,
+        func.count(Card.id),
+        func.sum(case((Card.interval > 3, 1), else_=0)),
+        func.sum(case((Card.next_review_date <= now, 1), else_=0)),
+        func.sum(case((card_has_examples(), 1), else_=0)),
+    ).join(Deck).filter(Deck.user_id == user_id)
+    if deck_ids is not None:
+        query = query.filter(Card.deck_id.in_(deck_ids))
+
+    return {
+        deck_id: {
+            "card_count": card_count,
+            "mastered_count": mastered_count or 0,
+            "due_count": due_count or 0,
+            "cards_with_examples_count": with_examples or 0,
+        }
+        for deck_id, card_count, mastered_count, due_count, with_examples in query.group_by(Card.deck_id)
+    }
+
+
+EMPTY_DECK_STATS = {
+    "card_count": 0,
+    "mastered_count": 0,
+    "due_count": 0,
+    "cards_with_examples_count": 0,
+}
@@ -1,18 +1,30 @@
+import asyncio
 import os
 import traceback
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from database import engine, Base
-from routers import auth_router, library_router, study_router
-from migrate_db import migrate
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
+from database import engine, read_engine
+from routers import (
+    auth_router, library_router, study_router, sync_router, stats_router, search_router, export_router,
+    summary_router, session_router
+)
+from migrate_db import prepare_database
+from review_log import review_log_buffer, flush_review_log_periodically
+from due_queues import DUE_QUEUE_SCHEDULER, run_due_queue_scheduler
+from deletion import run_deletion_sweeper
+from metrics import MetricsMiddleware, registry, register_gauge, register_pool_metrics
+from query_inspector import QUERY_INSPECTOR_ENABLED, QueryInspectorMiddleware
+from summary import SummaryCacheMiddleware
+from response_encoding import ContentNegotiationMiddleware
+from read_routing import READ_PRIMARY_HEADER, ReadRoutingMiddleware
 
-# Run migrations to add any missing columns
-migrate()
+# Create tables, run migrations and build the search index. Under gunicorn
+# (preload_app) this runs once in the master before the workers fork. Set
+# RUN_MIGRATIONS=0 when `python migrate_db.py` runs as a separate release step.
+if os.getenv("RUN_MIGRATIONS", "1") == "1":
+    prepare_database()
 
 app = FastAPI(
     title="SRS Vocabulary API",
@@ -27,12 +39,64 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[READ_PRIMARY_HEADER],
+)
+
+# MessagePack and gzip/brotli responses, negotiated from Accept / Accept-Encoding
+app.add_middleware(ContentNegotiationMiddleware)
+
+# Per-route latency, in-flight and DB query metrics for /metrics
+app.add_middleware(MetricsMiddleware)
+pool_engines = {"primary": engine}
+if read_engine is not engine:
+    pool_engines["replica"] = read_engine
+register_pool_metrics(pool_engines)
+register_gauge(
+    "review_log_pending_rows",
+    "Review log rows buffered in process and not yet flushed.",
+    lambda: len(review_log_buffer),
 )
 
+# Drop a user's cached /summary after any of their successful writes
+app.add_middleware(SummaryCacheMiddleware)
+
+# Route read-only endpoints to READ_DATABASE_URL, pinning users to the primary after their writes
+if read_engine is not engine:
+    app.add_middleware(ReadRoutingMiddleware)
+
+# Opt-in per-request statement recording and N+1 warnings (QUERY_INSPECTOR=1)
+if QUERY_INSPECTOR_ENABLED:
+    app.add_middleware(QueryInspectorMiddleware)
+
 # Include routers
 app.include_router(auth_router.router)
 app.include_router(library_router.router)
 app.include_router(study_router.router)
+app.include_router(sync_router.router)
+app.include_router(stats_router.router)
+app.include_router(search_router.router)
+app.include_router(export_router.router)
+app.include_router(summary_router.router)
+app.include_router(session_router.router)
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    app.state.review_log_flusher = asyncio.create_task(flush_review_log_periodically())
+    # Every worker runs the loop; the database lease lets only one of them build queues
+    app.state.due_queue_scheduler = (
+        asyncio.create_task(run_due_queue_scheduler()) if DUE_QUEUE_SCHEDULER else None
+    )
+    app.state.deletion_sweeper = asyncio.create_task(run_deletion_sweeper())
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    app.state.review_log_flusher.cancel()
+    if app.state.due_queue_scheduler is not None:
+        app.state.due_queue_scheduler.cancel()
+    app.state.deletion_sweeper.cancel()
+    review_log_buffer.flush()
 
 
 @app.get("/")
@@ -45,6 +109,11 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler to ensure CORS headers are included on 500 errors."""
@@ -0,0 +1,315 @@
+"""
+In-process metrics in the Prometheus text exposition format, served at /metrics.
+
+Request latency and counts come from MetricsMiddleware (labelled by route
+template, not raw path), database query counts and time from SQLAlchemy
+cursor events, and AI call latency from track_ai_call. Caches report hits
+and misses through record_cache. Everything is a lock-protected dict
+update, cheap enough to leave on in production.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or read from a callback at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, *args, callback: Optional[Callable[[], Dict[tuple, float]]] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[tuple, float] = {}
+        self._callback = callback
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def render(self) -> List[str]:
+        if self._callback is not None:
+            try:
+                items = list(self._callback().items())
+            except Exception:
+                items = []
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._values.items()]
+        lines = self.header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served."
+))
+http_unhandled_exceptions_total = registry.register(Counter(
+    "http_unhandled_exceptions_total", "Requests that ended in an unhandled exception.", ("route",)
+))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "Database statements issued per HTTP request.", ("route",),
+    buckets=QUERY_COUNT_BUCKETS,
+))
+db_query_seconds_per_request = registry.register(Histogram(
+    "db_query_seconds_per_request", "Time spent in database statements per HTTP request.", ("route",)
+))
+db_queries_total = registry.register(Counter(
+    "db_queries_total", "Database statements executed, in or out of requests."
+))
+db_query_seconds_total = registry.register(Counter(
+    "db_query_seconds_total", "Total time spent executing database statements."
+))
+ai_request_duration_seconds = registry.register(Histogram(
+    "ai_request_duration_seconds", "Latency of calls to the AI provider.", ("operation",)
+))
+ai_request_errors_total = registry.register(Counter(
+    "ai_request_errors_total", "Failed or unparseable AI provider calls.", ("operation",)
+))
+cache_requests_total = registry.register(Counter(
+    "cache_requests_total", "Cache lookups by cache and result.", ("cache", "result")
+))
+
+
+def _cache_hit_ratios() -> Dict[tuple, float]:
+    caches = {labels[0] for labels in list(cache_requests_total._values)}
+    ratios = {}
+    for cache in caches:
+        hits = cache_requests_total.value(cache, "hit")
+        total = hits + cache_requests_total.value(cache, "miss")
+        if total:
+            ratios[(cache,)] = hits / total
+    return ratios
+
+
+registry.register(Gauge(
+    "cache_hit_ratio", "Share of cache lookups served from cache since start.", ("cache",),
+    callback=_cache_hit_ratios,
+))
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    cache_requests_total.inc(cache, "hit" if hit else "miss")
+
+
+def register_gauge(name: str, documentation: str, callback: Callable[[], float]) -> None:
+    """Expose a value read at scrape time, e.g. a queue length."""
+    registry.register(Gauge(name, documentation, callback=lambda: {(): callback()}))
+
+
+def register_pool_metrics(engines: Dict[str, Engine]) -> None:
+    """Expose connection pool usage per engine label (pools without counters are skipped)."""
+    def read(attribute: str):
+        def callback():
+            values = {}
+            for label, engine in engines.items():
+                # engine.pool is looked up per scrape: dispose() (after a fork) replaces it
+                reader = getattr(engine.pool, attribute, None)
+                if callable(reader):
+                    values[(label,)] = reader()
+            return values
+        return callback
+
+    for attribute, documentation in [
+        ("size", "Configured connection pool size."),
+        ("checkedout", "Connections currently checked out of the pool."),
+        ("overflow", "Connections open beyond the pool size."),
+    ]:
+        registry.register(Gauge(f"db_pool_{attribute}", documentation, ("engine",), callback=read(attribute)))
+
+
+@contextmanager
+def track_ai_call(operation: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ai_request_errors_total.inc(operation)
+        raise
+    finally:
+        ai_request_duration_seconds.observe(time.perf_counter() - started, operation)
+
+
+# Per-request database accounting: [statement count, seconds]
+_request_db_stats: ContextVar[Optional[list]] = ContextVar("request_db_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    db_queries_total.inc()
+    db_query_seconds_total.inc(amount=elapsed)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (works with streaming responses) recording per-route metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_db_stats.set(stats)
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            http_unhandled_exceptions_total.inc(_route_template(scope))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            _request_db_stats.reset(token)
+            route = _route_template(scope)
+            method = scope.get("method", "")
+            http_requests_total.inc(method, route, str(status_holder["status"]))
+            http_request_duration_seconds.observe(elapsed, method, route)
+            db_queries_per_request.observe(stats[0], route)
+            db_query_seconds_per_request.observe(stats[1], route)
@@ -2,16 +2,40 @@
 Database migration script to add missing columns.
 Run this once to update the database schema.
 """
-import os
-from sqlalchemy import create_engine, text, inspect
+from contextlib import contextmanager
 
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./srs_vocab.db")
+from sqlalchemy import text, inspect
 
-# Railway uses postgres:// but SQLAlchemy requires postgresql://
-if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
-    SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+import models  # noqa: F401  (registers every table on Base.metadata)
+from database import Base, engine
+from search_index import ensure_search_index
+
+# Arbitrary key for the Postgres advisory lock that serializes schema setup across replicas
+MIGRATION_LOCK_KEY = 73710521
+
+
+@contextmanager
+def migration_lock():
+    """Hold a Postgres advisory lock so concurrently starting replicas migrate one at a time."""
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+
+def prepare_database():
+    """Create tables, add missing columns and indexes, and build the search index."""
+    with migration_lock():
+        Base.metadata.create_all(bind=engine)
+        migrate()
+        # Create (and on first run, fill) the full-text search index
+        ensure_search_index(engine)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
 def migrate():
     """Add missing columns to cards/folders tables."""
@@ -57,6 +81,15 @@ def migrate():
         else:
             print("Column 'is_starred' already exists")
 
+        # Add version column (optimistic concurrency for reviews) if missing
+        if 'version' not in existing_columns:
+            print("Adding 'version' column...")
+            conn.execute(text("ALTER TABLE cards ADD COLUMN version INTEGER NOT NULL DEFAULT 0"))
+            conn.commit()
+            print("Added 'version' column")
+        else:
+            print("Column 'version' already exists")
+
     # Folder table migration for nested folders
     if 'folders' in inspector.get_table_names():
         folder_columns = {col['name'] for col in inspector.get_columns('folders')}
@@ -73,6 +106,18 @@ def migrate():
             else:
                 print("Column 'parent_folder_id' already exists")
 
+            if 'updated_at' not in folder_columns:
+                print("Adding 'updated_at' column to folders...")
+                if engine.dialect.name == "postgresql":
+                    conn.execute(text("ALTER TABLE folders ADD COLUMN updated_at TIMESTAMP"))
+                else:
+                    conn.execute(text("ALTER TABLE folders ADD COLUMN updated_at DATETIME"))
+                conn.execute(text("UPDATE folders SET updated_at = created_at WHERE updated_at IS NULL"))
+                conn.commit()
+                print("Added 'updated_at' column to folders")
+            else:
+                print("Column 'updated_at' already exists on folders")
+
     # Deck table migration for sorting support
     if 'decks' in inspector.get_table_names():
         deck_columns = {col['name'] for col in inspector.get_columns('decks')}
@@ -91,6 +136,69 @@ def migrate():
             else:
                 print("Column 'updated_at' already exists")
 
+    # User table migration for per-user day boundaries
+    if 'users' in inspector.get_table_names():
+        user_columns = {col['name'] for col in inspector.get_columns('users')}
+        with engine.connect() as conn:
+            if 'utc_offset_minutes' not in user_columns:
+                print("Adding 'utc_offset_minutes' column to users...")
+                conn.execute(text("ALTER TABLE users ADD COLUMN utc_offset_minutes INTEGER NOT NULL DEFAULT 0"))
+                conn.commit()
+                print("Added 'utc_offset_minutes' column")
+            else:
+                print("Column 'utc_offset_minutes' already exists on users")
+
+    # Database-side cascades for set-based deletes (SQLite can't alter constraints; deletion.py
+    # deletes child rows itself there)
+    if engine.dialect.name == "postgresql":
+        migrate_foreign_keys(inspector)
+
+    # Indexes for delta sync and due-card lookups (create_all only adds them to brand new tables)
+    with engine.connect() as conn:
+        for index_name, table_name, columns in [
+            ("ix_folders_updated_at", "folders", "updated_at"),
+            ("ix_decks_updated_at", "decks", "updated_at"),
+            ("ix_cards_updated_at", "cards", "updated_at"),
+            ("ix_cards_deck_next_review", "cards", "deck_id, next_review_date, repetition, interval"),
+        ]:
+            if table_name in inspector.get_table_names():
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({columns})"))
+        conn.commit()
+
+
+def migrate_foreign_keys(inspector):
+    """Give existing Postgres foreign keys the ON DELETE actions declared in models.py."""
+    table_names = inspector.get_table_names()
+    with engine.connect() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in table_names:
+                continue
+            existing = {
+                tuple(fk["constrained_columns"]): fk for fk in inspector.get_foreign_keys(table.name)
+            }
+            for fk in table.foreign_keys:
+                current = existing.get((fk.parent.name,))
+                if fk.ondelete is None or current is None:
+                    continue
+                if (current["options"].get("ondelete") or "").upper() == fk.ondelete:
+                    continue
+                print(f"Setting ON DELETE {fk.ondelete} on {table.name}.{fk.parent.name}...")
+                name = current["name"]
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} DROP CONSTRAINT {name}, "
+                    f"ADD CONSTRAINT {name} FOREIGN KEY ({fk.parent.name}) "
+                    f"REFERENCES {fk.column.table.name} ({fk.column.name}) ON DELETE {fk.ondelete}"
+                ))
+
+        # Decks being deleted in the background are detached from their user
+        if 'decks' in table_names:
+            deck_user = next(col for col in inspector.get_columns('decks') if col['name'] == 'user_id')
+            if not deck_user['nullable']:
+                print("Making decks.user_id nullable...")
+                conn.execute(text("ALTER TABLE decks ALTER COLUMN user_id DROP NOT NULL"))
+        conn.commit()
+
+
 if __name__ == "__main__":
-    migrate()
+    prepare_database()
     print("Migration complete!")
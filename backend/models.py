@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -10,10 +10,12 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
+    utc_offset_minutes = Column(Integer, default=0, nullable=False)  # Local time minus UTC, sets the user's day boundary
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    folders = relationship("Folder", back_populates="user", cascade="all, delete-orphan")
-    decks = relationship("Deck", back_populates="user", cascade="all, delete-orphan")
+    # passive_deletes: the database's ON DELETE CASCADE removes children without loading them
+    folders = relationship("Folder", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    decks = relationship("Deck", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Folder(Base):
@@ -21,9 +23,10 @@ class Folder(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    parent_folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    parent_folder_id = Column(Integer, ForeignKey("folders.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="folders")
     decks = relationship("Deck", back_populates="folder")
@@ -36,21 +39,22 @@ class Deck(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
+    # NULL while a deleted deck's cards are removed in the background (see deletion.py)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+    folder_id = Column(Integer, ForeignKey("folders.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     user = relationship("User", back_populates="decks")
     folder = relationship("Folder", back_populates="decks")
-    cards = relationship("Card", back_populates="deck", cascade="all, delete-orphan")
+    cards = relationship("Card", back_populates="deck", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Card(Base):
     __tablename__ = "cards"
 
     id = Column(Integer, primary_key=True, index=True)
-    deck_id = Column(Integer, ForeignKey("decks.id"), nullable=False)
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), nullable=False)
     word = Column(String(200), nullable=False)
     definition = Column(Text, nullable=False)
     synonyms = Column(JSON, nullable=True)  # List of synonyms: ["syn1", "syn2"]
@@ -62,8 +66,130 @@ class Card(Base):
     repetition = Column(Integer, default=0)  # Number of successful reviews
     ease_factor = Column(Float, default=2.5)  # Difficulty factor
     next_review_date = Column(DateTime, default=datetime.utcnow)
+    version = Column(Integer, default=0, nullable=False)  # Bumped on every schedule write, guards concurrent reviews
     
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     deck = relationship("Deck", back_populates="cards")
+
+    __table_args__ = (
+        # Covers the due-card aggregates, which then never touch the table
+        Index("ix_cards_deck_next_review", "deck_id", "next_review_date", "repetition", "interval"),
+    )
+
+
+class Tombstone(Base):
+    """Record of a deleted folder, deck or card, so sync clients can drop it locally."""
+    __tablename__ = "tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    entity_type = Column(String(10), nullable=False)  # "folder", "deck" or "card"
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_tombstones_user_deleted_at", "user_id", "deleted_at"),
+    )
+
+
+class ReviewLog(Base):
+    """Append-only history of every review and the SM-2 state it moved the card between."""
+    __tablename__ = "review_log"
+
+    id = Column(Integer, primary_key=True)
+    # No foreign keys on card/deck: history outlives the cards it describes
+    card_id = Column(Integer, nullable=False)
+    deck_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    quality = Column(Integer, nullable=False)
+
+    prev_interval = Column(Integer, nullable=False)
+    prev_repetition = Column(Integer, nullable=False)
+    prev_ease_factor = Column(Float, nullable=False)
+    prev_next_review_date = Column(DateTime, nullable=True)
+    new_interval = Column(Integer, nullable=False)
+    new_repetition = Column(Integer, nullable=False)
+    new_ease_factor = Column(Float, nullable=False)
+    new_next_review_date = Column(DateTime, nullable=False)
+
+    reviewed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    response_time_ms = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_review_log_user_reviewed_at", "user_id", "reviewed_at"),
+        Index("ix_review_log_card_reviewed_at", "card_id", "reviewed_at"),
+    )
+
+
+class DailyReviewRollup(Base):
+    """Per user, deck and UTC day review totals, maintained as review_log rows are written."""
+    __tablename__ = "daily_review_rollups"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    deck_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    reviews = Column(Integer, default=0, nullable=False)
+    lapses = Column(Integer, default=0, nullable=False)  # Failed reviews of previously passed cards
+    quality_sum = Column(Integer, default=0, nullable=False)  # average quality = quality_sum / reviews
+    new_cards = Column(Integer, default=0, nullable=False)  # First-ever reviews
+
+    __table_args__ = (
+        Index("ux_daily_review_rollups_user_day_deck", "user_id", "day", "deck_id", unique=True),
+    )
+
+
+class StudySessionRecord(Base):
+    """Frozen study queue, used when STUDY_SESSION_STORE=db so sessions survive restarts and span workers."""
+    __tablename__ = "study_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    state = Column(JSON, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class DailyDueQueue(Base):
+    """A user's due cards for one local day, precomputed by the due_queues scheduler."""
+    __tablename__ = "daily_due_queues"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)  # In the user's local time
+    # [[card_id, deck_id, next_review_date (epoch microseconds), interval, repetition], ...] due before the day ends
+    entries = Column(JSON, nullable=False)
+    next_due_after = Column(DateTime, nullable=True)  # Earliest card due after the day, if any
+    refreshed_at = Column(DateTime, nullable=False)  # Cards updated after this are merged in on read
+
+    __table_args__ = (
+        Index("ux_daily_due_queues_user_day", "user_id", "day", unique=True),
+    )
+
+
+class ImportChunk(Base):
+    """One committed chunk of a streamed import; makes retried chunks no-ops."""
+    __tablename__ = "import_chunks"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    import_id = Column(String(64), nullable=False)  # Chosen by the client, unique per user
+    seq = Column(Integer, nullable=False)
+    deck_id = Column(Integer, ForeignKey("decks.id", ondelete="CASCADE"), nullable=False)
+    card_count = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ux_import_chunks_user_import_seq", "user_id", "import_id", "seq", unique=True),
+    )
+
+
+class SchedulerLease(Base):
+    """Leader lock for background jobs shared by every worker and replica."""
+    __tablename__ = "scheduler_leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -0,0 +1,75 @@
+"""
+Sparse card payloads for the study endpoints.
+
+A named view (`flashcard`, `cloze`, `full`) or an explicit `fields=` list
+narrows both the SELECT column list and the JSON returned. The `cloze` view
+also trims each card's examples to a single pre-selected sentence.
+"""
+import random
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from models import Card
+from schemas import CardResponse
+
+CARD_FIELDS = tuple(CardResponse.model_fields)
+
+FLASHCARD_FIELDS = (
+    "id", "deck_id", "word", "definition", "is_starred",
+    "interval", "repetition", "ease_factor", "next_review_date", "version",
+)
+
+# None means the full CardResponse
+VIEWS = {
+    "flashcard": FLASHCARD_FIELDS,
+    "cloze": FLASHCARD_FIELDS + ("examples",),
+    "full": None,
+}
+
+
+@dataclass(frozen=True)
+class Projection:
+    fields: Tuple[str, ...]
+    single_example: bool = False
+
+    def columns(self, *extra: str) -> list:
+        """Labelled Card columns for the projection plus any the caller needs (e.g. for sampling)."""
+        names = dict.fromkeys(self.fields + extra)
+        return [getattr(Card, name).label(name) for name in names]
+
+    def serialize(self, rows: Iterable) -> List[dict]:
+        items = []
+        for row in rows:
+            item = {name: getattr(row, name) for name in self.fields}
+            if self.single_example and item.get("examples"):
+                item["examples"] = [pick_example(item["examples"])]
+            items.append(item)
+        return jsonable_encoder(items)
+
+
+def pick_example(examples: list) -> dict:
+    """One example to show, preferring sentences with *cloze* markers."""
+    marked = [example for example in examples if "*" in example.get("sentence", "")]
+    return random.choice(marked or examples)
+
+
+def resolve_projection(view: Optional[str], fields: Optional[str]) -> Optional[Projection]:
+    """Projection for a request, or None for full CardResponse objects.
+
+    Raises ValueError for an unknown view or field name.
+    """
+    if view is not None and view not in VIEWS:
+        raise ValueError(f"Unknown view '{view}'; expected one of {', '.join(VIEWS)}")
+
+    if fields:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in CARD_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown card field(s): {', '.join(unknown)}")
+        return Projection(tuple(dict.fromkeys(["id"] + names)), single_example=view == "cloze")
+
+    if VIEWS.get(view) is None:
+        return None
+    return Projection(VIEWS[view], single_example=view == "cloze")
@@ -0,0 +1,123 @@
+"""
+Statement recording for catching N+1 queries.
+
+QueryRecorder captures every statement issued in the current context
+through SQLAlchemy's before_cursor_execute hook, groups them by shape
+(literals and IN-lists collapsed) and can assert a query budget. With
+QUERY_INSPECTOR=1, QueryInspectorMiddleware records each request, adds an
+X-Query-Count header and logs a warning for shapes repeated
+N_PLUS_ONE_THRESHOLD times or more.
+"""
+import logging
+import os
+import re
+from collections import Counter as _Counter
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+QUERY_INSPECTOR_ENABLED = os.getenv("QUERY_INSPECTOR", "0") == "1"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+_active_recorders: ContextVar[Tuple["QueryRecorder", ...]] = ContextVar("active_query_recorders", default=())
+
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\?|:\w+")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so repeats that differ only in values compare equal."""
+    shape = _STRING_RE.sub("?", statement)
+    shape = _IN_LIST_RE.sub("IN (...)", shape)
+    shape = _PARAM_RE.sub("?", shape)
+    shape = _NUMBER_RE.sub("?", shape)
+    return _WHITESPACE_RE.sub(" ", shape).strip()
+
+
+class QueryRecorder:
+    """Context manager recording the statements executed while it is active.
+
+        with QueryRecorder() as recorder:
+            client.get("/library", headers=headers)
+        recorder.assert_max_queries(4)
+    """
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self._token = None
+
+    def __enter__(self) -> "QueryRecorder":
+        self._token = _active_recorders.set(_active_recorders.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _active_recorders.reset(self._token)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def shapes(self) -> Dict[str, int]:
+        return dict(_Counter(statement_shape(statement) for statement in self.statements))
+
+    def repeated_shapes(self, threshold: int = 2) -> Dict[str, int]:
+        """Statement shapes executed at least `threshold` times: the signature of an N+1."""
+        return {shape: count for shape, count in self.shapes().items() if count >= threshold}
+
+    def report(self) -> str:
+        lines = [f"{self.count} statements:"]
+        for shape, count in sorted(self.shapes().items(), key=lambda item: -item[1]):
+            lines.append(f"  {count}x {shape[:200]}")
+        return "\n".join(lines)
+
+    def assert_max_queries(self, budget: int) -> None:
+        if self.count > budget:
+            raise AssertionError(f"Query budget exceeded ({self.count} > {budget}). {self.report()}")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    for recorder in _active_recorders.get():
+        recorder.statements.append(statement)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "")
+
+
+class QueryInspectorMiddleware:
+    """Records each request's statements; reports the count and flags likely N+1 patterns."""
+
+    def __init__(self, app, threshold: int = N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.threshold = threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recorder = QueryRecorder()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(recorder.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with recorder:
+            await self.app(scope, receive, send_wrapper)
+
+        repeated = recorder.repeated_shapes(self.threshold)
+        if repeated:
+            shapes = "\n".join(f"  {count}x {shape[:200]}" for shape, count in repeated.items())
+            logger.warning("Possible N+1 in %s %s:\n%s", scope.get("method"), _route_template(scope), shapes)
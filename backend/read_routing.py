@@ -0,0 +1,83 @@
+"""
+Read-your-writes routing between the primary database and a read replica.
+
+Endpoints that only read take their session from get_read_db, which uses
+READ_DATABASE_URL when it is set. A user who has just written must not read
+from a replica that may still lag behind, so after every successful write
+the user is pinned to the primary for READ_YOUR_WRITES_SECONDS:
+
+- in this worker, through a small per-user cache;
+- across workers, through the X-Read-Primary-Until response header (a Unix
+  time), which the frontend echoes back on its following requests.
+
+Writes always use the primary (get_db). Without READ_DATABASE_URL both
+factories share one engine and this middleware is not installed.
+"""
+import os
+import time
+
+from auth import username_from_token
+from ttl_cache import TTLCache
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+
+recent_writers = TTLCache("recent_writers", ttl=READ_YOUR_WRITES_SECONDS)
+
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+_HEADER_KEY = READ_PRIMARY_HEADER.lower().encode("latin-1")
+
+
+def _request_headers(scope):
+    username = None
+    primary_until = 0.0
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                username = username_from_token(token)
+        elif name == _HEADER_KEY:
+            try:
+                primary_until = float(value)
+            except ValueError:
+                pass
+    return username, primary_until
+
+
+def reads_from_primary(username, primary_until: float, now: float) -> bool:
+    # The client's hint is capped at one window, so a forged far-future value can't pin it for good
+    if now < primary_until <= now + READ_YOUR_WRITES_SECONDS:
+        return True
+    return username is not None and recent_writers.get(username) is not None
+
+
+class ReadRoutingMiddleware:
+    """Pure ASGI middleware choosing primary or replica reads and recording successful writes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        username, primary_until = _request_headers(scope)
+        state = scope.setdefault("state", {})
+        state["read_primary"] = reads_from_primary(username, primary_until, time.time())
+        if scope.get("method") in _READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            # Read-only POSTs (get_read_db marks them) don't pin the user
+            if message["type"] == "http.response.start" and message["status"] < 400 and not state.get("read_only"):
+                until = time.time() + READ_YOUR_WRITES_SECONDS
+                if username is not None:
+                    recent_writers.set(username, until)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (_HEADER_KEY, f"{until:.3f}".encode("latin-1"))
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,168 @@
+"""
+Negotiated response encoding.
+
+JSON responses can be re-encoded as MessagePack (`Accept: application/msgpack`)
+and bodies of at least COMPRESSION_MIN_SIZE bytes are compressed with brotli
+or gzip according to Accept-Encoding. Bodies of OFFLOAD_MIN_SIZE bytes or more
+are encoded in a worker thread so large payloads don't stall the event loop.
+
+brotli and msgpack are pinned in requirements.txt; an install without them
+still works, with the middleware offering only gzip and JSON. Streaming
+responses and responses that already carry a Content-Encoding pass through
+untouched.
+"""
+import gzip
+import json
+import os
+from typing import List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+OFFLOAD_MIN_SIZE = int(os.getenv("ENCODING_OFFLOAD_MIN_SIZE", str(64 * 1024)))
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+COMPRESSIBLE_PREFIXES = ("application/json", "application/msgpack", "text/")
+
+
+def parse_quality_list(header: str) -> List[Tuple[str, float]]:
+    """Parse 'gzip;q=0.8, br' style headers into (token, q) pairs."""
+    items = []
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        items.append((token.strip().lower(), quality))
+    return items
+
+
+def choose_content_encoding(accept_encoding: str) -> Optional[str]:
+    """'br' or 'gzip' (preferring br on ties), or None for identity."""
+    offered = {token: quality for token, quality in parse_quality_list(accept_encoding)}
+    wildcard = offered.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = offered.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def wants_msgpack(accept: str) -> bool:
+    if msgpack is None:
+        return False
+    return any(token in MSGPACK_MEDIA_TYPES and quality > 0 for token, quality in parse_quality_list(accept))
+
+
+def encode_body(body: bytes, to_msgpack: bool, content_encoding: Optional[str]) -> bytes:
+    """Re-encode a JSON body and/or compress it. CPU-bound; may run in a thread."""
+    if to_msgpack:
+        body = msgpack.packb(json.loads(body), use_bin_type=True)
+    if content_encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif content_encoding == "gzip":
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+class ContentNegotiationMiddleware:
+    """Pure ASGI middleware applying MessagePack and gzip/brotli per the request's Accept headers."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = {}
+        for name, value in scope.get("headers", []):
+            if name in (b"accept", b"accept-encoding"):
+                request_headers[name] = value.decode("latin-1")
+        accept = request_headers.get(b"accept", "")
+        accept_encoding = request_headers.get(b"accept-encoding", "")
+        if not accept_encoding and "msgpack" not in accept:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            if message.get("more_body", False):
+                # Streaming response: leave it alone
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            await self._send_encoded(start_message, message.get("body", b""), accept, accept_encoding, send)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_encoded(self, start_message, body: bytes, accept: str, accept_encoding: str, send) -> None:
+        headers = MutableHeaders(raw=start_message["headers"])
+        content_type = headers.get("content-type", "")
+
+        to_msgpack = content_type.startswith("application/json") and wants_msgpack(accept)
+        content_encoding = None
+        if (
+            "content-encoding" not in headers
+            and len(body) >= COMPRESSION_MIN_SIZE
+            and content_type.startswith(COMPRESSIBLE_PREFIXES)
+        ):
+            content_encoding = choose_content_encoding(accept_encoding)
+
+        if to_msgpack or content_encoding:
+            if len(body) >= OFFLOAD_MIN_SIZE:
+                body = await anyio.to_thread.run_sync(encode_body, body, to_msgpack, content_encoding)
+            else:
+                body = encode_body(body, to_msgpack, content_encoding)
+            if to_msgpack:
+                headers["content-type"] = "application/msgpack"
+            if content_encoding:
+                headers["content-encoding"] = content_encoding
+            headers["content-length"] = str(len(body))
+
+        if content_type.startswith(COMPRESSIBLE_PREFIXES):
+            headers.add_vary_header("Accept-Encoding")
+            if msgpack is not None and content_type.startswith("application/json"):
+                headers.add_vary_header("Accept")
+
+        start_message["headers"] = headers.raw
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body, "more_body": False})
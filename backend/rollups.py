@@ -0,0 +1,127 @@
+"""
+Daily review rollups for the statistics dashboard.
+
+Each review_log row also bumps one daily_review_rollups row (user, deck, UTC
+day), in the same transaction, so /stats never has to scan raw history.
+Run `python rollups.py` to rebuild every rollup from review_log.
+"""
+from collections import defaultdict
+from typing import List, Optional
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from models import DailyReviewRollup, ReviewLog
+
+COUNTER_COLUMNS = ("reviews", "lapses", "quality_sum", "new_cards")
+
+
+def is_lapse(quality: int, prev_repetition: int) -> bool:
+    return quality < 3 and prev_repetition > 0
+
+
+def is_new_card(prev_interval: int) -> bool:
+    # SM-2 never schedules an interval of 0, so only unreviewed (or reset) cards have one
+    return prev_interval == 0
+
+
+def aggregate_log_entries(entries: List[dict]) -> List[dict]:
+    """Collapse review_log rows into one rollup increment per (user, deck, day)."""
+    totals = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+    for entry in entries:
+        bucket = totals[(entry["user_id"], entry["deck_id"], entry["reviewed_at"].date())]
+        bucket["reviews"] += 1
+        bucket["lapses"] += int(is_lapse(entry["quality"], entry["prev_repetition"]))
+        bucket["quality_sum"] += entry["quality"]
+        bucket["new_cards"] += int(is_new_card(entry["prev_interval"]))
+
+    return [
+        {"user_id": user_id, "deck_id": deck_id, "day": day, **counters}
+        for (user_id, deck_id, day), counters in totals.items()
+    ]
+
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    stmt = dialect_insert(DailyReviewRollup)
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "day", "deck_id"],
+        set_={
+            column: getattr(DailyReviewRollup, column) + getattr(stmt.excluded, column)
+            for column in COUNTER_COLUMNS
+        },
+    )
+
+
+def apply_log_entries(db: Session, entries: List[dict]) -> None:
+    """Add freshly logged reviews to the rollups (committed by the caller)."""
+    increments = aggregate_log_entries(entries)
+    if not increments:
+        return
+
+    stmt = _upsert_statement(db.get_bind().dialect.name)
+    if stmt is not None:
+        db.execute(stmt, increments)
+        return
+
+    # Generic fallback: read-modify-write per bucket
+    for increment in increments:
+        rollup = db.query(DailyReviewRollup).filter(
+            DailyReviewRollup.user_id == increment["user_id"],
+            DailyReviewRollup.day == increment["day"],
+            DailyReviewRollup.deck_id == increment["deck_id"],
+        ).first()
+        if rollup is None:
+            db.add(DailyReviewRollup(**increment))
+        else:
+            for column in COUNTER_COLUMNS:
+                setattr(rollup, column, getattr(rollup, column) + increment[column])
+    db.flush()
+
+
+def rebuild_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute rollups from review_log with one INSERT ... SELECT. Returns rows written."""
+    delete_stmt = delete(DailyReviewRollup)
+    if user_id is not None:
+        delete_stmt = delete_stmt.where(DailyReviewRollup.user_id == user_id)
+    db.execute(delete_stmt)
+
+    day = func.date(ReviewLog.reviewed_at)
+    source = select(
+        ReviewLog.user_id,
+        ReviewLog.deck_id,
+        day,
+        func.count(),
+        func.sum(case((
+            (ReviewLog.quality < 3) & (ReviewLog.prev_repetition > 0), 1
+        ), else_=0)),
+        func.sum(ReviewLog.quality),
+        func.sum(case((ReviewLog.prev_interval == 0, 1), else_=0)),
+    ).group_by(ReviewLog.user_id, ReviewLog.deck_id, day)
+    if user_id is not None:
+        source = source.where(ReviewLog.user_id == user_id)
+
+    result = db.execute(insert(DailyReviewRollup).from_select(
+        ["user_id", "deck_id", "day", *COUNTER_COLUMNS], source
+    ))
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    import sys
+    from database import SessionLocal
+
+    target_user = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    session = SessionLocal()
+    try:
+        written = rebuild_rollups(session, target_user)
+        session.commit()
+        print(f"Rebuilt {written} daily rollup rows")
+    finally:
+        session.close()
@@ -3,9 +3,10 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
+import deletion
 from database import get_db
 from models import User, Deck, Card
-from schemas import Token, UserCreate, UserResponse
+from schemas import Token, UserCreate, UserResponse, UserUpdate
 from auth import (
     authenticate_user,
     create_access_token,
@@ -103,3 +104,30 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
 async def get_me(current_user: User = Depends(get_current_user)):
     """Get current user info."""
     return current_user
+
+
+@router.put("/me", response_model=UserResponse)
+async def update_me(
+    user_data: UserUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Update the current user's settings (UTC offset, which sets when their day starts)."""
+    current_user.utc_offset_minutes = user_data.utc_offset_minutes
+    db.commit()
+    db.refresh(current_user)
+    return current_user
+
+
+@router.delete("/me")
+async def delete_me(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Delete the current user's account and all their data."""
+    background = deletion.delete_user(db, current_user.id)
+    db.commit()
+    
+    if background:
+        return {"message": "Account deleted; cards are being removed in the background"}
+    return {"message": "Account and all data deleted"}
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from database import get_read_db, read_session_factory
+from models import User, Deck
+from auth import get_current_reader
+from exporters import (
+    EXPORT_FORMATS, content_disposition, safe_filename, stream_deck, stream_library_zip
+)
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+
+def validate_format(export_format: str) -> str:
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    return export_format
+
+
+@router.get("/decks/{deck_id}")
+async def export_deck(
+    deck_id: int,
+    request: Request,
+    format: str = "pipe",
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
+):
+    """Download a deck as pipe lines, CSV or NDJSON that the importers accept."""
+    export_format = validate_format(format)
+    deck = db.query(Deck).filter(
+        Deck.id == deck_id,
+        Deck.user_id == current_user.id
+    ).first()
+
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        stream_deck(deck.id, export_format, read_session_factory(request)),
+        media_type=media_type,
+        headers={"Content-Disposition": content_disposition(f"{safe_filename(deck.name)}.{extension}")},
+    )
+
+
+@router.get("/library")
+async def export_library(
+    request: Request,
+    format: str = "pipe",
+    current_user: User = Depends(get_current_reader)
+):
+    """Download every deck as a zip archive, one file per deck laid out by folder."""
+    export_format = validate_format(format)
+    return StreamingResponse(
+        stream_library_zip(current_user.id, export_format, read_session_factory(request)),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition("library.zip")},
+    )
@@ -1,43 +1,51 @@
-from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from database import get_db
+from database import get_db, get_read_db
 from models import User, Folder, Deck, Card
 from schemas import (
     FolderCreate, FolderUpdate, FolderResponse,
     DeckCreate, DeckUpdate, DeckResponse,
+    DeckDuplicateRequest, DeckMergeRequest, DeckSplitRequest, DeckOperationResponse,
     CardCreate, CardUpdate, CardResponse,
-    LibraryResponse, FolderWithDecks, DeckInFolder
+    LibraryResponse, FolderWithDecks, DeckInFolder, FolderSubtreeResponse,
+    BulkCardRequest, BulkCardResponse
+)
+from auth import get_current_user, get_current_reader
+from library_queries import (
+    EMPTY_DECK_STATS, deck_stats_map, familiarity_condition, folder_subtree_cte,
+    folder_ancestor_path, is_in_subtree
 )
-from auth import get_current_user
+from search_index import remove_card_ids
+import deck_operations
+import deletion
+from sync_logic import record_tombstones
 
 router = APIRouter(prefix="/library", tags=["Library"])
 
+CARD_LIST_BATCH_SIZE = 1000
 
-def get_deck_stats(deck: Deck) -> dict:
-    """Get card count, mastered count, due count, and cards with examples count for a deck."""
-    cards = deck.cards
-    card_count = len(cards)
-    mastered_count = sum(1 for card in cards if card.interval > 3)
-    due_count = sum(1 for card in cards if card.next_review_date <= datetime.utcnow())
-    cards_with_examples_count = sum(1 for card in cards if card.examples and len(card.examples) > 0)
-    
+
+def get_deck_stats(deck: Deck, counts: Optional[dict] = None) -> dict:
+    """Combine a deck's aggregated card counts (from deck_stats_map) with its metadata."""
     deck_updated_at = getattr(deck, "updated_at", None) or deck.created_at
 
     return {
-        "card_count": card_count,
-        "mastered_count": mastered_count,
-        "due_count": due_count,
-        "cards_with_examples_count": cards_with_examples_count,
+        **(counts or EMPTY_DECK_STATS),
         "folder_id": deck.folder_id,
         "created_at": deck.created_at,
         "updated_at": deck_updated_at,
     }
 
 
-def build_folder_tree(folders: List[Folder]) -> List[FolderWithDecks]:
+def build_folder_tree(
+    folders: List[Folder],
+    decks: List[Deck],
+    stats_by_deck: Dict[int, dict],
+) -> List[FolderWithDecks]:
     folder_nodes = {
         folder.id: FolderWithDecks(
             id=folder.id,
@@ -49,16 +57,17 @@ def build_folder_tree(folders: List[Folder]) -> List[FolderWithDecks]:
         for folder in folders
     }
 
-    for folder in folders:
-        for deck in folder.decks:
-            stats = get_deck_stats(deck)
-            folder_nodes[folder.id].decks.append(DeckInFolder(
-                id=deck.id,
-                name=deck.name,
-                **stats,
-            ))
+    for deck in decks:
+        if deck.folder_id not in folder_nodes:
+            continue
+        folder_nodes[deck.folder_id].decks.append(DeckInFolder(
+            id=deck.id,
+            name=deck.name,
+            **get_deck_stats(deck, stats_by_deck.get(deck.id)),
+        ))
 
-        folder_nodes[folder.id].decks.sort(key=lambda deck_item: deck_item.name.lower())
+    for node in folder_nodes.values():
+        node.decks.sort(key=lambda deck_item: deck_item.name.lower())
 
     roots = []
     for folder in folders:
@@ -102,39 +111,28 @@ def assert_valid_parent_folder(
     if parent_folder_id == current_folder_id:
         raise HTTPException(status_code=400, detail="Folder cannot be its own parent")
 
-    cursor = parent
-    while cursor is not None:
-        if cursor.parent_folder_id == current_folder_id:
-            raise HTTPException(status_code=400, detail="Cannot move folder into its descendant")
-        if cursor.parent_folder_id is None:
-            break
-        cursor = db.query(Folder).filter(
-            Folder.id == cursor.parent_folder_id,
-            Folder.user_id == current_user.id,
-        ).first()
+    if is_in_subtree(db, current_user.id, current_folder_id, parent_folder_id):
+        raise HTTPException(status_code=400, detail="Cannot move folder into its descendant")
 
 
 @router.get("", response_model=LibraryResponse)
 async def get_library(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
     """Get the full library structure with folders and decks."""
-    # Get all folders for the user
+    # Get all folders and decks for the user, with card statistics aggregated in SQL
     folders = db.query(Folder).filter(Folder.user_id == current_user.id).all()
+    decks = db.query(Deck).filter(Deck.user_id == current_user.id).all()
+    stats_by_deck = deck_stats_map(db, current_user.id)
     
-    # Get root decks (decks without a folder)
-    root_decks = db.query(Deck).filter(
-        Deck.user_id == current_user.id,
-        Deck.folder_id == None
-    ).all()
+    folders_with_decks = build_folder_tree(folders, decks, stats_by_deck)
     
-    folders_with_decks = build_folder_tree(folders)
-    
-    # Build root decks response
+    # Build root decks response (decks without a folder)
+    root_decks = [deck for deck in decks if deck.folder_id is None]
     root_decks_response = []
     for deck in sorted(root_decks, key=lambda item: item.name.lower()):
-        stats = get_deck_stats(deck)
+        stats = get_deck_stats(deck, stats_by_deck.get(deck.id))
         root_decks_response.append(DeckInFolder(
             id=deck.id,
             name=deck.name,
@@ -167,6 +165,31 @@ async def create_folder(
     return folder
 
 
+@router.get("/folders/{folder_id}/subtree", response_model=FolderSubtreeResponse)
+async def get_folder_subtree(
+    folder_id: int,
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
+):
+    """Get a folder with all nested folders and decks, plus its path from the root."""
+    path = folder_ancestor_path(db, current_user.id, folder_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    subtree = folder_subtree_cte(current_user.id, folder_id)
+    folders = db.query(Folder).filter(Folder.id.in_(select(subtree.c.id))).all()
+    decks = db.query(Deck).filter(
+        Deck.user_id == current_user.id,
+        Deck.folder_id.in_(select(subtree.c.id))
+    ).all()
+    stats_by_deck = deck_stats_map(db, current_user.id, [deck.id for deck in decks])
+
+    # The requested folder is the only root once its ancestors are left out
+    root = next(node for node in build_folder_tree(folders, decks, stats_by_deck) if node.id == folder_id)
+
+    return FolderSubtreeResponse(folder=root, path=path)
+
+
 @router.put("/folders/{folder_id}", response_model=FolderResponse)
 async def update_folder(
     folder_id: int,
@@ -209,12 +232,7 @@ async def delete_folder(
     if not folder:
         raise HTTPException(status_code=404, detail="Folder not found")
     
-    target_parent_id = folder.parent_folder_id
-    db.query(Deck).filter(Deck.folder_id == folder_id).update({"folder_id": target_parent_id})
-    db.query(Folder).filter(Folder.parent_folder_id == folder_id).update({"parent_folder_id": target_parent_id})
-    
-    # Delete the folder
-    db.delete(folder)
+    deletion.delete_folder(db, current_user.id, folder_id, folder.parent_folder_id)
     db.commit()
     
     return {"message": "Folder deleted; nested content moved to parent"}
@@ -259,11 +277,39 @@ async def create_deck(
     )
 
 
+def build_deck_response(db: Session, user_id: int, deck: Deck) -> DeckResponse:
+    """DeckResponse with stats for a single deck."""
+    stats = get_deck_stats(deck, deck_stats_map(db, user_id, [deck.id]).get(deck.id))
+    stats_for_deck_response = {
+        k: v for k, v in stats.items() if k not in {"folder_id", "created_at"}
+    }
+    
+    return DeckResponse(
+        id=deck.id,
+        name=deck.name,
+        user_id=deck.user_id,
+        folder_id=deck.folder_id,
+        created_at=deck.created_at,
+        **stats_for_deck_response
+    )
+
+
+def get_user_deck(db: Session, user_id: int, deck_id: int, detail: str = "Deck not found") -> Deck:
+    deck = db.query(Deck).filter(
+        Deck.id == deck_id,
+        Deck.user_id == user_id
+    ).first()
+    
+    if not deck:
+        raise HTTPException(status_code=404, detail=detail)
+    return deck
+
+
 @router.get("/decks/{deck_id}", response_model=DeckResponse)
 async def get_deck(
     deck_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific deck."""
     deck = db.query(Deck).filter(
@@ -274,19 +320,7 @@ async def get_deck(
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    stats = get_deck_stats(deck)
-    stats_for_deck_response = {
-        k: v for k, v in stats.items() if k not in {"folder_id", "created_at"}
-    }
-    
-    return DeckResponse(
-        id=deck.id,
-        name=deck.name,
-        user_id=deck.user_id,
-        folder_id=deck.folder_id,
-        created_at=deck.created_at,
-        **stats_for_deck_response
-    )
+    return build_deck_response(db, current_user.id, deck)
 
 
 @router.put("/decks/{deck_id}", response_model=DeckResponse)
@@ -326,19 +360,7 @@ async def update_deck(
     db.commit()
     db.refresh(deck)
     
-    stats = get_deck_stats(deck)
-    stats_for_deck_response = {
-        k: v for k, v in stats.items() if k not in {"folder_id", "created_at"}
-    }
-    
-    return DeckResponse(
-        id=deck.id,
-        name=deck.name,
-        user_id=deck.user_id,
-        folder_id=deck.folder_id,
-        created_at=deck.created_at,
-        **stats_for_deck_response
-    )
+    return build_deck_response(db, current_user.id, deck)
 
 
 @router.delete("/decks/{deck_id}")
@@ -347,8 +369,8 @@ async def delete_deck(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Delete a deck and all its cards (cascade delete)."""
-    deck = db.query(Deck).filter(
+    """Delete a deck and all its cards with set-based statements; very large decks finish in the background."""
+    deck = db.query(Deck.id).filter(
         Deck.id == deck_id,
         Deck.user_id == current_user.id
     ).first()
@@ -356,18 +378,134 @@ async def delete_deck(
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    db.delete(deck)
+    background = deletion.delete_deck(db, current_user.id, deck_id)
     db.commit()
     
+    if background:
+        return {"message": "Deck deleted; its cards are being removed in the background"}
     return {"message": "Deck and all cards deleted"}
 
 
+@router.post("/decks/{deck_id}/duplicate", response_model=DeckOperationResponse)
+async def duplicate_deck(
+    deck_id: int,
+    duplicate_data: DeckDuplicateRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Copy a deck and its cards inside the database, optionally keeping review progress."""
+    source = get_user_deck(db, current_user.id, deck_id)
+    
+    folder_id = source.folder_id
+    if duplicate_data.folder_id is not None:
+        folder = db.query(Folder).filter(
+            Folder.id == duplicate_data.folder_id,
+            Folder.user_id == current_user.id
+        ).first()
+        if not folder:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        folder_id = folder.id
+    
+    deck = Deck(
+        name=duplicate_data.name or f"{source.name} (copy)",
+        user_id=current_user.id,
+        folder_id=folder_id
+    )
+    db.add(deck)
+    db.flush()
+    
+    copied = deck_operations.duplicate_deck_cards(db, source.id, deck.id, duplicate_data.keep_schedule)
+    db.commit()
+    
+    return DeckOperationResponse(
+        deck=build_deck_response(db, current_user.id, deck),
+        cards_affected=copied
+    )
+
+
+@router.post("/decks/{deck_id}/merge", response_model=DeckOperationResponse)
+async def merge_deck(
+    deck_id: int,
+    merge_data: DeckMergeRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Merge another deck into this one and delete it.
+    With skip_duplicates, cards whose word is already here are dropped instead of moved.
+    """
+    if merge_data.source_deck_id == deck_id:
+        raise HTTPException(status_code=400, detail="Cannot merge a deck into itself")
+    
+    target = get_user_deck(db, current_user.id, deck_id)
+    get_user_deck(db, current_user.id, merge_data.source_deck_id, detail="Source deck not found")
+    
+    moved, skipped = deck_operations.merge_decks(
+        db, merge_data.source_deck_id, target.id,
+        keep_schedule=merge_data.keep_schedule,
+        skip_duplicates=merge_data.skip_duplicates
+    )
+    record_tombstones(db, current_user.id, "deck", [merge_data.source_deck_id])
+    db.commit()
+    
+    return DeckOperationResponse(
+        deck=build_deck_response(db, current_user.id, target),
+        cards_affected=moved,
+        cards_skipped=skipped
+    )
+
+
+@router.post("/decks/{deck_id}/split", response_model=DeckOperationResponse)
+async def split_deck(
+    deck_id: int,
+    split_data: DeckSplitRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Move the selected cards (by id and/or filter) into a new deck in the same folder."""
+    if split_data.card_ids is not None and not split_data.card_ids:
+        raise HTTPException(status_code=400, detail="card_ids is empty")
+    if split_data.card_ids is None and split_data.familiarity_bucket is None and not split_data.starred_only:
+        raise HTTPException(status_code=400, detail="Select cards by card_ids or a filter")
+    
+    source = get_user_deck(db, current_user.id, deck_id)
+    
+    conditions = []
+    bucket = familiarity_condition(split_data.familiarity_bucket)
+    if bucket is not None:
+        conditions.append(bucket)
+    if split_data.starred_only:
+        conditions.append(Card.is_starred == True)
+    
+    deck = Deck(
+        name=split_data.name,
+        user_id=current_user.id,
+        folder_id=source.folder_id
+    )
+    db.add(deck)
+    db.flush()
+    
+    moved = deck_operations.split_deck(
+        db, source.id, deck.id, split_data.card_ids, conditions, split_data.keep_schedule
+    )
+    if not moved:
+        # Don't leave an empty deck behind
+        db.rollback()
+        raise HTTPException(status_code=400, detail="No cards in the deck match the selection")
+    db.commit()
+    
+    return DeckOperationResponse(
+        deck=build_deck_response(db, current_user.id, deck),
+        cards_affected=moved
+    )
+
+
 # Card CRUD
 @router.get("/decks/{deck_id}/cards", response_model=List[CardResponse])
 async def get_cards(
     deck_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
     """Get all cards in a deck."""
     deck = db.query(Deck).filter(
@@ -378,7 +516,13 @@ async def get_cards(
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    return deck.cards
+    # yield_per streams the rows (a named server-side cursor on Postgres), so a
+    # large deck is never buffered as raw rows and ORM objects at the same time
+    cards = db.scalars(
+        select(Card).where(Card.deck_id == deck_id).order_by(Card.id)
+        .execution_options(yield_per=CARD_LIST_BATCH_SIZE)
+    )
+    return [CardResponse.model_validate(card) for card in cards]
 
 
 @router.post("/decks/{deck_id}/cards", response_model=CardResponse)
@@ -416,6 +560,73 @@ async def create_card(
     return card
 
 
+@router.post("/cards/bulk", response_model=BulkCardResponse)
+async def bulk_update_cards(
+    bulk_data: BulkCardRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Star, unstar, move, delete or reset many cards in one transaction.
+    Cards are picked by id or by filter; ids the user doesn't own are ignored.
+    """
+    if (bulk_data.card_ids is None) == (bulk_data.filter is None):
+        raise HTTPException(status_code=400, detail="Provide either card_ids or filter")
+    if bulk_data.operation == "move" and bulk_data.target_deck_id is None:
+        raise HTTPException(status_code=400, detail="target_deck_id is required for move")
+
+    selection = select(Card.id).join(Deck).where(Deck.user_id == current_user.id)
+    if bulk_data.card_ids is not None:
+        selection = selection.where(Card.id.in_(bulk_data.card_ids))
+    else:
+        if bulk_data.filter.deck_id is not None:
+            selection = selection.where(Card.deck_id == bulk_data.filter.deck_id)
+        bucket = familiarity_condition(bulk_data.filter.familiarity_bucket)
+        if bucket is not None:
+            selection = selection.where(bucket)
+        if bulk_data.filter.starred_only:
+            selection = selection.where(Card.is_starred == True)
+
+    if bulk_data.operation == "move":
+        target = db.query(Deck.id).filter(
+            Deck.id == bulk_data.target_deck_id,
+            Deck.user_id == current_user.id
+        ).first()
+        if not target:
+            raise HTTPException(status_code=404, detail="Target deck not found")
+
+    # Ids feed tombstones, the search index and the response; the writes reuse the selection
+    card_ids = list(db.scalars(selection.order_by(Card.id)))
+    if not card_ids:
+        return BulkCardResponse(operation=bulk_data.operation, affected=0, card_ids=[])
+
+    if bulk_data.operation == "delete":
+        remove_card_ids(db, card_ids)
+        db.execute(delete(Card).where(Card.id.in_(selection)).execution_options(synchronize_session=False))
+        record_tombstones(db, current_user.id, "card", card_ids)
+    else:
+        if bulk_data.operation in ("star", "unstar"):
+            values = {"is_starred": bulk_data.operation == "star"}
+        elif bulk_data.operation == "move":
+            values = {"deck_id": bulk_data.target_deck_id}
+        else:
+            values = {
+                "interval": 0,
+                "repetition": 0,
+                "ease_factor": 2.5,
+                "next_review_date": datetime.utcnow(),
+                "version": Card.version + 1,
+            }
+        db.execute(
+            update(Card).where(Card.id.in_(selection)).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    db.commit()
+
+    return BulkCardResponse(operation=bulk_data.operation, affected=len(card_ids), card_ids=card_ids)
+
+
 @router.put("/cards/{card_id}", response_model=CardResponse)
 async def update_card(
     card_id: int,
@@ -490,6 +701,7 @@ async def delete_card(
         raise HTTPException(status_code=404, detail="Card not found")
     
     db.delete(card)
+    record_tombstones(db, current_user.id, "card", [card_id])
     db.commit()
     
     return {"message": "Card deleted"}
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import String, and_, cast, or_, text
+from sqlalchemy.orm import Session
+
+from database import get_read_db
+from models import User, Deck, Card
+from schemas import CardResponse, SearchHit, SearchResponse
+from auth import get_current_reader
+from search_index import (
+    SEARCH_TABLE, search_backend, query_terms, fts5_match_expression, tsquery_expression
+)
+
+router = APIRouter(tags=["Search"])
+
+# Column weights for bm25(): word, definition, synonyms, examples
+FTS5_RANKING = f"bm25({SEARCH_TABLE}, 10.0, 4.0, 4.0, 1.0)"
+
+
+def ranked_card_ids(db: Session, user_id: int, terms: list, limit: int, offset: int) -> list:
+    """Ids of the user's cards matching all terms, best match first."""
+    backend = search_backend(db)
+    params = {"user_id": user_id, "limit": limit, "offset": offset}
+
+    if backend == "fts5":
+        params["match"] = fts5_match_expression(terms)
+        rows = db.execute(text(
+            f"SELECT {SEARCH_TABLE}.rowid FROM {SEARCH_TABLE} "
+            f"JOIN cards ON cards.id = {SEARCH_TABLE}.rowid "
+            "JOIN decks ON decks.id = cards.deck_id "
+            f"WHERE {SEARCH_TABLE} MATCH :match AND decks.user_id = :user_id "
+            f"ORDER BY {FTS5_RANKING} LIMIT :limit OFFSET :offset"
+        ), params)
+        return [row[0] for row in rows]
+
+    if backend == "postgres":
+        params["match"] = tsquery_expression(terms)
+        rows = db.execute(text(
+            f"SELECT s.card_id FROM {SEARCH_TABLE} s "
+            "JOIN cards ON cards.id = s.card_id "
+            "JOIN decks ON decks.id = cards.deck_id "
+            "WHERE s.document @@ to_tsquery('simple', :match) AND decks.user_id = :user_id "
+            "ORDER BY ts_rank(s.document, to_tsquery('simple', :match)) DESC, s.card_id "
+            "LIMIT :limit OFFSET :offset"
+        ), params)
+        return [row[0] for row in rows]
+
+    # No index available: unranked substring scan
+    conditions = [
+        or_(
+            Card.word.ilike(f"%{term}%"),
+            Card.definition.ilike(f"%{term}%"),
+            cast(Card.synonyms, String).ilike(f"%{term}%"),
+            cast(Card.examples, String).ilike(f"%{term}%"),
+        )
+        for term in terms
+    ]
+    rows = db.query(Card.id).join(Deck).filter(
+        Deck.user_id == user_id,
+        and_(*conditions)
+    ).order_by(Card.word, Card.id).limit(limit).offset(offset).all()
+    return [row[0] for row in rows]
+
+
+@router.get("/search", response_model=SearchResponse)
+async def search_cards(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
+):
+    """Search words, definitions, synonyms and example sentences across all of the user's decks."""
+    terms = query_terms(q)
+    if not terms:
+        return SearchResponse(query=q, results=[], offset=offset, limit=limit, has_more=False)
+
+    # Fetch one extra id to know whether another page exists
+    card_ids = ranked_card_ids(db, current_user.id, terms, limit + 1, offset)
+    has_more = len(card_ids) > limit
+    card_ids = card_ids[:limit]
+
+    rows = db.query(Card, Deck.name).join(Deck).filter(Card.id.in_(card_ids)).all() if card_ids else []
+    by_id = {card.id: (card, deck_name) for card, deck_name in rows}
+
+    results = []
+    for card_id in card_ids:
+        if card_id not in by_id:
+            continue
+        card, deck_name = by_id[card_id]
+        results.append(SearchHit(**CardResponse.model_validate(card).model_dump(), deck_name=deck_name))
+
+    return SearchResponse(query=q, results=results, offset=offset, limit=limit, has_more=has_more)
@@ -0,0 +1,183 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import List
+
+from database import get_db
+from due_queues import current_queue, due_now
+from models import User, Folder, Deck, Card
+from schemas import (
+    ReviewRequest, StudySessionCreate, StudySessionResponse, StudySessionReviewResponse
+)
+from auth import get_current_user
+from library_queries import folder_subtree_cte
+from routers.study_router import has_cloze_marker, sample_study_cards, study_card_conditions, submit_review
+from study_sessions import StudySession, session_store
+
+router = APIRouter(prefix="/study/sessions", tags=["Study Sessions"])
+
+
+def load_cards(db: Session, user_id: int, card_ids: List[int]) -> List[Card]:
+    """Cards by id in the given order; cards deleted since the session started are skipped."""
+    if not card_ids:
+        return []
+    cards = db.query(Card).join(Deck).filter(
+        Card.id.in_(card_ids),
+        Deck.user_id == user_id
+    ).all()
+    by_id = {card.id: card for card in cards}
+    return [by_id[card_id] for card_id in card_ids if card_id in by_id]
+
+
+def get_user_session(db: Session, user_id: int, session_id: str) -> StudySession:
+    session = session_store.get(db, session_id)
+    if session is None or session.user_id != user_id:
+        raise HTTPException(status_code=404, detail="Study session not found or expired")
+    return session
+
+
+def session_response(session: StudySession, cards: List[Card]) -> StudySessionResponse:
+    return StudySessionResponse(
+        session_id=session.id,
+        total=session.total,
+        remaining=session.remaining,
+        reviewed=session.reviewed,
+        lapses=session.lapses,
+        cards=cards
+    )
+
+
+@router.post("", response_model=StudySessionResponse)
+async def start_study_session(
+    session_data: StudySessionCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Run the study query once and freeze the result as a session.
+    Picks decks by deck_ids, by folder (with nested folders) or, with neither, the whole library.
+    Returns the first chunk of cards.
+    """
+    now = datetime.utcnow()
+    scope = [Deck.user_id == current_user.id]
+    if session_data.deck_ids is not None:
+        owned = db.query(Deck.id).filter(
+            Deck.id.in_(session_data.deck_ids),
+            Deck.user_id == current_user.id
+        ).count()
+        if owned != len(set(session_data.deck_ids)):
+            raise HTTPException(status_code=404, detail="One or more decks not found")
+        scope.append(Card.deck_id.in_(session_data.deck_ids))
+    elif session_data.folder_id is not None:
+        folder = db.query(Folder.id).filter(
+            Folder.id == session_data.folder_id,
+            Folder.user_id == current_user.id
+        ).first()
+        if not folder:
+            raise HTTPException(status_code=404, detail="Folder not found")
+        subtree = folder_subtree_cte(current_user.id, session_data.folder_id)
+        scope.append(Deck.folder_id.in_(select(subtree.c.id)))
+
+    # A plain due session over the whole library is exactly today's precomputed queue
+    queue = None
+    if len(scope) == 1 and session_data.mode != "all" and not (
+        session_data.cloze_only or session_data.with_examples_only
+        or session_data.familiarity_bucket or session_data.starred_only
+    ):
+        queue = current_queue(db, current_user, now)
+    if queue is not None:
+        candidates = due_now(queue[0], now)
+    else:
+        # Only what sampling needs; full cards are loaded one chunk at a time
+        columns = [Card.id, Card.interval]
+        if session_data.cloze_only:
+            columns.append(Card.examples)
+        candidates = db.query(*columns).join(Deck).filter(
+            *scope,
+            *study_card_conditions(
+                session_data.mode,
+                session_data.cloze_only,
+                session_data.with_examples_only,
+                session_data.familiarity_bucket,
+                session_data.starred_only,
+            )
+        ).all()
+    if session_data.cloze_only:
+        candidates = [row for row in candidates if has_cloze_marker(row)]
+
+    selected = sample_study_cards(candidates, session_data.limit)
+    session = StudySession.start(current_user.id, [row.id for row in selected], session_data.chunk_size)
+    response = session_response(session, load_cards(db, current_user.id, session.take()))
+    session_store.save(db, session)
+    db.commit()
+
+    return response
+
+
+@router.get("/{session_id}", response_model=StudySessionResponse)
+async def resume_study_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Session progress plus the cards handed out but not reviewed yet, for resuming after a reload."""
+    session = get_user_session(db, current_user.id, session_id)
+    return session_response(session, load_cards(db, current_user.id, session.in_flight))
+
+
+@router.post("/{session_id}/next", response_model=StudySessionResponse)
+async def next_session_cards(
+    session_id: str,
+    count: int = 0,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Hand out the next chunk of cards (count=0 uses the session's chunk size)."""
+    session = get_user_session(db, current_user.id, session_id)
+    response = session_response(
+        session, load_cards(db, current_user.id, session.take(count if count > 0 else None))
+    )
+    session_store.save(db, session)
+    db.commit()
+
+    return response
+
+
+@router.post("/{session_id}/review/{card_id}", response_model=StudySessionReviewResponse)
+async def review_session_card(
+    session_id: str,
+    card_id: int,
+    review_data: ReviewRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Review a card (as POST /study/{card_id}/review) and requeue it at a learning step if it lapsed."""
+    session = get_user_session(db, current_user.id, session_id)
+    review = submit_review(db, current_user, card_id, review_data)
+    requeued_at = session.record_review(card_id, review_data.quality)
+    session_store.save(db, session)
+    db.commit()
+
+    return StudySessionReviewResponse(
+        review=review,
+        remaining=session.remaining,
+        reviewed=session.reviewed,
+        lapses=session.lapses,
+        requeued_at=requeued_at
+    )
+
+
+@router.delete("/{session_id}")
+async def end_study_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Discard a session."""
+    session = get_user_session(db, current_user.id, session_id)
+    session_store.delete(db, session.id)
+    db.commit()
+
+    return {"message": "Study session ended", "session_id": session.id}
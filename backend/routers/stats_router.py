@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from database import get_read_db
+from models import User, DailyReviewRollup
+from schemas import DailyStats, StatsResponse
+from auth import get_current_reader
+
+router = APIRouter(prefix="/stats", tags=["Statistics"])
+
+
+def compute_streaks(active_days: List, today) -> tuple:
+    """Return (current_streak, longest_streak) from sorted days with reviews.
+
+    The current streak still counts if today has no reviews yet but yesterday did.
+    """
+    longest = 0
+    run = 0
+    previous = None
+    for day in active_days:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+
+    current = 0
+    if previous is not None and today - previous <= timedelta(days=1):
+        current = run
+
+    return current, longest
+
+
+def active_days(db: Session, user_id: int, deck_id: Optional[int] = None) -> List:
+    """Every day the user reviewed anything (in deck_id, if given), oldest first, regardless of any window."""
+    query = db.query(DailyReviewRollup.day).filter(
+        DailyReviewRollup.user_id == user_id,
+        DailyReviewRollup.reviews > 0,
+    )
+    if deck_id is not None:
+        query = query.filter(DailyReviewRollup.deck_id == deck_id)
+    return [day for (day,) in query.distinct().order_by(DailyReviewRollup.day)]
+
+
+@router.get("", response_model=StatsResponse)
+async def get_stats(
+    days: int = Query(365, ge=1, le=3660),
+    deck_id: Optional[int] = None,
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
+):
+    """Daily review history for heatmaps, streaks and retention, read from rollups only.
+
+    `days` limits the history and totals; streaks always cover every day with reviews.
+    """
+    today = datetime.utcnow().date()
+    start_day = today - timedelta(days=days - 1)
+
+    query = db.query(
+        DailyReviewRollup.day,
+        func.sum(DailyReviewRollup.reviews),
+        func.sum(DailyReviewRollup.lapses),
+        func.sum(DailyReviewRollup.quality_sum),
+        func.sum(DailyReviewRollup.new_cards),
+    ).filter(
+        DailyReviewRollup.user_id == current_user.id,
+        DailyReviewRollup.day >= start_day,
+    )
+    if deck_id is not None:
+        query = query.filter(DailyReviewRollup.deck_id == deck_id)
+    rows = query.group_by(DailyReviewRollup.day).order_by(DailyReviewRollup.day).all()
+
+    daily = [
+        DailyStats(
+            day=day,
+            reviews=reviews,
+            lapses=lapses,
+            new_cards=new_cards,
+            average_quality=round(quality_sum / reviews, 2) if reviews else 0.0,
+        )
+        for day, reviews, lapses, quality_sum, new_cards in rows
+        if reviews
+    ]
+
+    total_reviews = sum(item.reviews for item in daily)
+    total_lapses = sum(item.lapses for item in daily)
+    total_new_cards = sum(item.new_cards for item in daily)
+    seen_reviews = total_reviews - total_new_cards
+    retention_rate = round(1 - total_lapses / seen_reviews, 3) if seen_reviews > 0 else None
+
+    # Streaks span the whole history: one that began before start_day still counts in full
+    current_streak, longest_streak = compute_streaks(active_days(db, current_user.id, deck_id), today)
+
+    return StatsResponse(
+        start_day=start_day,
+        end_day=today,
+        days=daily,
+        total_reviews=total_reviews,
+        total_lapses=total_lapses,
+        total_new_cards=total_new_cards,
+        retention_rate=retention_rate,
+        current_streak=current_streak,
+        longest_streak=longest_streak,
+    )
@@ -1,63 +1,165 @@
 from datetime import datetime
+import asyncio
+import heapq
 import random
 import os
 import json
 import re
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+import uuid
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Path, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import String, cast, select
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 
-from database import get_db
-from models import User, Deck, Card
+from database import get_db, get_read_db
+from models import User, Folder, Deck, Card
 from schemas import (
-    CardResponse, ReviewRequest, ReviewResponse, ImportRequest, ImportResponse, 
-    CSVImportRequest, MultiDeckStudyRequest, CardBase, ExampleItem
+    CardResponse, ReviewRequest, ReviewResponse, ImportRequest, ImportResponse,
+    ImportChunkResponse, ImportStatusResponse,
+    CSVImportRequest, MultiDeckStudyRequest, CardBase, ExampleItem,
+    RescheduleRequest, RescheduleResponse
 )
-from auth import get_current_user
-from srs_logic import calculate_sm2
+from auth import get_current_user, get_current_reader
+from srs_logic import apply_review, spread_due_cards, ReviewConflict
+from review_log import build_log_entry, record_reviews
+from bulk_import import insert_cards
+from import_stream import import_chunk, import_deck_id, import_progress
+from anki_import import AnkiImportError, FieldMapping, open_package, stream_anki_import
+from library_queries import card_has_examples, familiarity_condition, folder_subtree_cte
+from metrics import track_ai_call
+from projections import Projection, resolve_projection
 
 router = APIRouter(tags=["Study"])
 
 
 def weighted_sample(cards: List[Card], n: int) -> List[Card]:
-    """Sample cards with weights inversely proportional to interval (smaller interval = higher probability)."""
+    """Sample cards with weights inversely proportional to interval (smaller interval = higher probability).
+
+    Weighted sampling without replacement via Efraimidis-Spirakis keys
+    (u ** (1 / weight), highest first): the same draw order as picking one
+    card at a time, in O(len(cards) log n) instead of O(len(cards) * n).
+    """
     if len(cards) <= n:
         return cards
     
-    # Calculate weights: smaller interval = higher weight
-    weights = []
-    for card in cards:
-        # Add 1 to avoid division by zero, use inverse of interval
-        weight = 1.0 / (card.interval + 1)
-        weights.append(weight)
-    
-    # Normalize weights
-    total_weight = sum(weights)
-    weights = [w / total_weight for w in weights]
-    
-    # Weighted random sampling without replacement
-    selected = []
-    available_indices = list(range(len(cards)))
-    available_weights = weights.copy()
-    
-    for _ in range(n):
-        if not available_indices:
-            break
-        # Normalize remaining weights
-        total = sum(available_weights)
-        if total == 0:
-            break
-        probs = [w / total for w in available_weights]
-        
-        # Select one index
-        idx = random.choices(range(len(available_indices)), weights=probs, k=1)[0]
-        selected.append(cards[available_indices[idx]])
-        
-        # Remove selected from available
-        available_indices.pop(idx)
-        available_weights.pop(idx)
+    # weight = 1 / (interval + 1), so each key is u ** (interval + 1)
+    keyed = (
+        (random.random() ** (card.interval + 1), index)
+        for index, card in enumerate(cards)
+    )
+    return [cards[index] for _, index in heapq.nlargest(n, keyed)]
+
+
+def study_card_conditions(
+    mode: str = "due",
+    cloze_only: bool = False,
+    with_examples_only: bool = False,
+    familiarity_bucket: Optional[str] = None,
+    starred_only: bool = False,
+) -> list:
+    """SQL filter conditions shared by every study endpoint."""
+    conditions = []
+    if mode != "all":
+        # Due cards: next_review_date <= NOW
+        conditions.append(Card.next_review_date <= datetime.utcnow())
+
+    # Cloze markers are re-checked exactly in Python; SQL narrows to JSON containing '*'
+    if cloze_only:
+        conditions.append(card_has_examples())
+        conditions.append(cast(Card.examples, String).like("%*%"))
+    elif with_examples_only:
+        conditions.append(card_has_examples())
+
+    # Familiarity bucket (based on interval in days)
+    bucket = familiarity_condition(familiarity_bucket)
+    if bucket is not None:
+        conditions.append(bucket)
+
+    if starred_only:
+        conditions.append(Card.is_starred == True)
+
+    return conditions
+
+
+def has_cloze_marker(card: Card) -> bool:
+    return bool(card.examples) and any(
+        ex.get('sentence', '').find('*') != -1 for ex in card.examples
+    )
+
+
+def sample_study_cards(cards: List[Card], limit: int) -> List[Card]:
+    # Apply weighted sampling if limit > 0
+    if limit > 0 and len(cards) > limit:
+        return weighted_sample(cards, limit)
+    # Even if not sampling, shuffle the cards for variety
+    cards = list(cards)
+    random.shuffle(cards)
+    return cards
+
+
+def get_projection(view: Optional[str], fields: Optional[str]) -> Optional[Projection]:
+    try:
+        return resolve_projection(view, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def query_study_cards(db: Session, projection: Optional[Projection], cloze_only: bool, *criterion, join_deck: bool = False) -> list:
+    """Matching cards: ORM objects, or rows holding only the projected columns
+    (plus interval for sampling and examples for the cloze check)."""
+    if projection is None:
+        query = db.query(Card)
+    else:
+        query = db.query(*projection.columns("interval", *(("examples",) if cloze_only else ())))
+    if join_deck:
+        query = query.join(Deck)
+    cards = query.filter(*criterion).all()
     
-    return selected
+    if cloze_only:
+        cards = [card for card in cards if has_cloze_marker(card)]
+    return cards
+
+
+def study_cards_response(cards: list, projection: Optional[Projection]):
+    if projection is None:
+        return cards
+    return JSONResponse(content=projection.serialize(cards))
+
+
+@router.get("/study/folder/{folder_id}", response_model=List[CardResponse])
+async def get_folder_study_cards(
+    folder_id: int,
+    mode: str = "due",
+    limit: int = 15,
+    cloze_only: bool = False,
+    with_examples_only: bool = False,
+    familiarity_bucket: Optional[str] = None,
+    starred_only: bool = False,
+    view: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
+):
+    """Get cards for studying every deck under a folder, including nested folders.
+    Takes the same filters as /study/{deck_id}; descendant decks are resolved in the same query."""
+    projection = get_projection(view, fields)
+    subtree = folder_subtree_cte(current_user.id, folder_id)
+    cards = query_study_cards(
+        db, projection, cloze_only,
+        Deck.user_id == current_user.id,
+        Deck.folder_id.in_(select(subtree.c.id)),
+        *study_card_conditions(mode, cloze_only, with_examples_only, familiarity_bucket, starred_only),
+        join_deck=True
+    )
+
+    if not cards and not db.query(Folder.id).filter(
+        Folder.id == folder_id,
+        Folder.user_id == current_user.id
+    ).first():
+        raise HTTPException(status_code=404, detail="Folder not found")
+
+    return study_cards_response(sample_study_cards(cards, limit), projection)
 
 
 @router.get("/study/{deck_id}", response_model=List[CardResponse])
@@ -69,12 +171,16 @@ async def get_study_cards(
     with_examples_only: bool = False,
     familiarity_bucket: Optional[str] = None,
     starred_only: bool = False,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    view: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
     """Get cards for study. Mode: 'due' (default) or 'all'. Limit: number of cards (0 for all).
     cloze_only: if True, only return cards that have examples with *word* cloze markers.
-    with_examples_only: if True, only return cards that have at least one example."""
+    with_examples_only: if True, only return cards that have at least one example.
+    view: 'flashcard', 'cloze' (one example per card) or 'full' (default); fields: comma-separated card fields."""
+    projection = get_projection(view, fields)
     deck = db.query(Deck).filter(
         Deck.id == deck_id,
         Deck.user_id == current_user.id
@@ -83,48 +189,13 @@ async def get_study_cards(
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    if mode == "all":
-        # Get all cards for practice
-        cards = db.query(Card).filter(Card.deck_id == deck_id).all()
-    else:
-        # Get cards where next_review_date <= NOW
-        now = datetime.utcnow()
-        cards = db.query(Card).filter(
-            Card.deck_id == deck_id,
-            Card.next_review_date <= now
-        ).all()
-    
-    # Filter for cloze-only mode BEFORE sampling (requires cloze markers)
-    if cloze_only:
-        cards = [card for card in cards if card.examples and any(
-            ex.get('sentence', '').find('*') != -1 for ex in card.examples
-        )]
-    # Filter for cards with examples (for cloze mode without requiring markers)
-    elif with_examples_only:
-        cards = [card for card in cards if card.examples and len(card.examples) > 0]
-    
-    # Filter by familiarity bucket (based on interval in days)
-    if familiarity_bucket:
-        if familiarity_bucket == "low":
-            cards = [card for card in cards if 0 <= (card.interval or 0) <= 1]
-        elif familiarity_bucket == "medium":
-            cards = [card for card in cards if 2 <= (card.interval or 0) <= 3]
-        elif familiarity_bucket == "high":
-            cards = [card for card in cards if (card.interval or 0) >= 4]
-    
-    # Filter by starred-only
-    if starred_only:
-        cards = [card for card in cards if getattr(card, "is_starred", False)]
-    
-    # Apply weighted sampling if limit > 0
-    if limit > 0 and len(cards) > limit:
-        cards = weighted_sample(cards, limit)
-    else:
-        # Even if not sampling, shuffle the cards for variety
-        cards = list(cards)
-        random.shuffle(cards)
+    cards = query_study_cards(
+        db, projection, cloze_only,
+        Card.deck_id == deck_id,
+        *study_card_conditions(mode, cloze_only, with_examples_only, familiarity_bucket, starred_only)
+    )
     
-    return cards
+    return study_cards_response(sample_study_cards(cards, limit), projection)
 
 
 @router.post("/study/{deck_id}/reset")
@@ -148,50 +219,93 @@ async def reset_deck_progress(
         "interval": 0,
         "repetition": 0,
         "ease_factor": 2.5,
-        "next_review_date": now
-    })
+        "next_review_date": now,
+        "version": Card.version + 1
+    }, synchronize_session=False)
     
     db.commit()
     
     return {"message": "Deck progress reset", "deck_id": deck_id}
 
 
-@router.post("/study/{card_id}/review", response_model=ReviewResponse)
-async def review_card(
-    card_id: int,
-    review_data: ReviewRequest,
+@router.post("/study/reschedule", response_model=RescheduleResponse)
+async def reschedule_backlog(
+    reschedule_data: RescheduleRequest,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Submit a review for a card and update SM-2 values."""
+    """Spread every overdue card over the next N days in one UPDATE."""
+    now = datetime.utcnow()
+    due_cards = select(Card.id).join(Deck).where(
+        Deck.user_id == current_user.id,
+        Card.next_review_date <= now
+    )
+    if reschedule_data.deck_id is not None:
+        deck = db.query(Deck.id).filter(
+            Deck.id == reschedule_data.deck_id,
+            Deck.user_id == current_user.id
+        ).first()
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        due_cards = due_cards.where(Card.deck_id == reschedule_data.deck_id)
+    
+    rescheduled = spread_due_cards(db, Card.id.in_(due_cards), reschedule_data.days, now=now)
+    db.commit()
+    
+    return RescheduleResponse(rescheduled=rescheduled, days=reschedule_data.days)
+
+
+def submit_review(db: Session, user: User, card_id: int, review_data: ReviewRequest) -> ReviewResponse:
+    """Apply and log one review; the caller commits."""
     card = db.query(Card).join(Deck).filter(
         Card.id == card_id,
-        Deck.user_id == current_user.id
+        Deck.user_id == user.id
     ).first()
     
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
     
-    # Calculate new SM-2 values
-    sm2_result = calculate_sm2(review_data.quality, card)
-    
-    # Update card
-    card.interval = sm2_result["interval"]
-    card.repetition = sm2_result["repetition"]
-    card.ease_factor = sm2_result["ease_factor"]
-    card.next_review_date = sm2_result["next_review_date"]
-    
-    db.commit()
-    db.refresh(card)
+    # One conditional UPDATE; a concurrent review either recomputes or 409s
+    try:
+        previous = apply_review(
+            db, card, review_data.quality,
+            expected_version=review_data.expected_version,
+            user_id=user.id
+        )
+    except ReviewConflict:
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Card was reviewed on another device; reload it and try again"
+        )
     
+    record_reviews(db, [build_log_entry(
+        card, user.id, review_data.quality, previous,
+        response_time_ms=review_data.response_time_ms
+    )])
     return ReviewResponse(
         card_id=card.id,
         new_interval=card.interval,
         new_ease_factor=card.ease_factor,
-        next_review_date=card.next_review_date
+        next_review_date=card.next_review_date,
+        version=card.version
     )
 
 
+@router.post("/study/{card_id}/review", response_model=ReviewResponse)
+async def review_card(
+    card_id: int,
+    review_data: ReviewRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Submit a review for a card and update SM-2 values."""
+    response = submit_review(db, current_user, card_id, review_data)
+    db.commit()
+    
+    return response
+
+
 @router.post("/import", response_model=ImportResponse)
 async def import_cards(
     import_data: ImportRequest,
@@ -207,56 +321,190 @@ async def import_cards(
     if not deck:
         raise HTTPException(status_code=404, detail="Deck not found")
     
-    # Create cards in batch
-    cards_to_add = []
-    for card_data in import_data.cards:
-        # Convert examples to dict format for JSON storage
-        examples_data = None
-        if card_data.examples:
-            examples_data = [ex.model_dump() for ex in card_data.examples]
-        
-        card = Card(
-            deck_id=import_data.deck_id,
-            word=card_data.word,
-            definition=card_data.definition,
-            synonyms=card_data.synonyms,
-            examples=examples_data
-        )
-        cards_to_add.append(card)
-    
-    db.add_all(cards_to_add)
+    # Cards go straight to COPY / executemany without building ORM objects
+    cards = (
+        {
+            "word": card_data.word,
+            "definition": card_data.definition,
+            "synonyms": card_data.synonyms,
+            # Convert examples to dict format for JSON storage
+            "examples": [ex.model_dump() for ex in card_data.examples] if card_data.examples else None,
+        }
+        for card_data in import_data.cards
+    )
+    imported_count = insert_cards(db, import_data.deck_id, cards)
     db.commit()
     
     return ImportResponse(
-        imported_count=len(cards_to_add),
+        imported_count=imported_count,
         deck_id=import_data.deck_id
     )
 
 
+IMPORT_ID_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"
+
+
+@router.put("/import/stream/{import_id}/{seq}", response_model=ImportChunkResponse)
+async def import_cards_chunk(
+    request: Request,
+    deck_id: int,
+    import_id: str = Path(..., pattern=IMPORT_ID_PATTERN),
+    seq: int = Path(..., ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Import one chunk of an NDJSON upload (one card per line, same fields as /import).
+
+    Chunks are idempotent: resending a committed chunk inserts nothing and
+    returns the original count. Every chunk of an import must target the same deck.
+    """
+    deck = db.query(Deck.id).filter(
+        Deck.id == deck_id,
+        Deck.user_id == current_user.id
+    ).first()
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+
+    existing_deck_id = import_deck_id(db, current_user.id, import_id)
+    if existing_deck_id is not None and existing_deck_id != deck_id:
+        raise HTTPException(status_code=409, detail="Import already targets another deck")
+
+    imported_count, duplicate = await import_chunk(
+        db, current_user.id, deck_id, import_id, seq, request.stream()
+    )
+    _, total_imported = import_progress(db, current_user.id, import_id)
+
+    return ImportChunkResponse(
+        import_id=import_id,
+        seq=seq,
+        deck_id=deck_id,
+        imported_count=imported_count,
+        total_imported=total_imported,
+        duplicate=duplicate
+    )
+
+
+@router.get("/import/stream/{import_id}", response_model=ImportStatusResponse)
+async def get_import_status(
+    import_id: str = Path(..., pattern=IMPORT_ID_PATTERN),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Committed chunks of an import, so an interrupted upload can send only the rest."""
+    deck_id = import_deck_id(db, current_user.id, import_id)
+    if deck_id is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    committed_chunks, total_imported = import_progress(db, current_user.id, import_id)
+    return ImportStatusResponse(
+        import_id=import_id,
+        deck_id=deck_id,
+        committed_chunks=committed_chunks,
+        total_imported=total_imported
+    )
+
+
+@router.post("/import/anki")
+async def import_anki_package(
+    file: UploadFile = File(...),
+    deck_id: int = Form(...),
+    import_id: Optional[str] = Form(None, pattern=IMPORT_ID_PATTERN),
+    include_scheduling: bool = Form(False),
+    word_field: Optional[str] = Form(None),
+    definition_field: Optional[str] = Form(None),
+    example_field: Optional[str] = Form(None),
+    translation_field: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Import an Anki .apkg/.colpkg into a deck, streaming NDJSON progress lines.
+
+    Notes are committed in batches under import_id (generated if omitted);
+    posting the same file with the same import_id resumes an interrupted
+    import, and GET /import/stream/{import_id} reports its progress.
+    """
+    deck = db.query(Deck.id).filter(
+        Deck.id == deck_id,
+        Deck.user_id == current_user.id
+    ).first()
+    if not deck:
+        raise HTTPException(status_code=404, detail="Deck not found")
+
+    import_id = import_id or uuid.uuid4().hex
+    existing_deck_id = import_deck_id(db, current_user.id, import_id)
+    if existing_deck_id is not None and existing_deck_id != deck_id:
+        raise HTTPException(status_code=409, detail="Import already targets another deck")
+
+    try:
+        collection, workdir = await asyncio.to_thread(open_package, file.file)
+    except AnkiImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    mapping = FieldMapping(
+        word=word_field, definition=definition_field, example=example_field, translation=translation_field
+    )
+    return StreamingResponse(
+        stream_anki_import(collection, workdir, current_user.id, deck_id, import_id, mapping, include_scheduling),
+        media_type="application/x-ndjson",
+    )
+
+
 import csv
 from io import StringIO
 
 
+# A backslash before one of these makes it literal text instead of syntax (see exporters.escape_field)
+_ESCAPABLE = "\\()|"
+_ESCAPE_RE = re.compile(r"\\([\\()|])")
+_EXAMPLE_RE = re.compile(r"\(((?:\\[\\()|]|[^)])+)\)")
+
+
+def unescape_field(value: str) -> str:
+    return _ESCAPE_RE.sub(r"\1", value)
+
+
+def split_unescaped(value: str, separator: str) -> List[str]:
+    """Split on separator wherever it is not backslash-escaped; parts keep their escapes."""
+    parts = []
+    start = i = 0
+    while i < len(value):
+        if value[i] == "\\" and i + 1 < len(value) and value[i + 1] in _ESCAPABLE:
+            i += 2
+        elif value.startswith(separator, i):
+            parts.append(value[start:i])
+            i += len(separator)
+            start = i
+        else:
+            i += 1
+    parts.append(value[start:])
+    return parts
+
+
+def parse_synonyms(synonyms_str: str) -> Optional[list]:
+    synonyms = [unescape_field(s.strip()) for s in split_unescaped(synonyms_str, '|') if s.strip()]
+    return synonyms or None
+
+
 def parse_examples(examples_str: str) -> list:
     """Parse examples in format: (sentence | trans); (sentence2 | trans2)...
     
     Examples are separated by semicolons, each in parentheses with | separating sentence and translation.
+    Backslash-escaped parentheses and pipes are part of the text.
     """
     examples = []
     if not examples_str:
         return examples
     
     # Find all (...) groups using regex
-    pair_matches = re.findall(r'\(([^)]+)\)', examples_str)
+    pair_matches = _EXAMPLE_RE.findall(examples_str)
     for pair in pair_matches:
-        if '|' in pair:
-            pair_parts = pair.split('|', 1)
-            sentence = pair_parts[0].strip()
-            translation = pair_parts[1].strip() if len(pair_parts) > 1 else None
+        pair_parts = split_unescaped(pair, '|')
+        if len(pair_parts) > 1:
+            sentence = unescape_field(pair_parts[0].strip())
+            translation = unescape_field('|'.join(pair_parts[1:]).strip())
             if sentence:
                 examples.append({"sentence": sentence, "translation": translation})
         elif pair.strip():
-            examples.append({"sentence": pair.strip(), "translation": None})
+            examples.append({"sentence": unescape_field(pair.strip()), "translation": None})
     
     return examples
 
@@ -278,10 +526,7 @@ def parse_csv_line(row: list) -> dict:
     # Synonyms (pipe-separated within the cell)
     synonyms = None
     if len(row) > 2 and row[2]:
-        synonyms_str = row[2].strip()
-        synonyms = [s.strip() for s in synonyms_str.split('|') if s.strip()]
-        if not synonyms:
-            synonyms = None
+        synonyms = parse_synonyms(row[2].strip())
     
     # Examples: (sentence | trans); (sentence2 | trans2)...
     examples = []
@@ -301,19 +546,19 @@ def parse_pipe_line(line: str) -> dict:
     
     Format: word || meaning || syn1 | syn2 || (example1 | trans1); (example2 | trans2)
     """
-    parts = line.split('||')
+    parts = split_unescaped(line, '||')
     if len(parts) < 2:
         return None
     
-    word = parts[0].strip() if len(parts) > 0 else ""
-    definition = parts[1].strip() if len(parts) > 1 else ""
+    word = unescape_field(parts[0].strip()) if len(parts) > 0 else ""
+    definition = unescape_field(parts[1].strip()) if len(parts) > 1 else ""
     
     if not word or not definition:
         return None
     
     # Synonyms (single pipe-separated)
     synonyms_str = parts[2].strip() if len(parts) > 2 else ""
-    synonyms = [s.strip() for s in synonyms_str.split('|') if s.strip()] if synonyms_str else None
+    synonyms = parse_synonyms(synonyms_str) if synonyms_str else None
     
     # Examples: (sentence | trans); (sentence2 | trans2)...
     examples = []
@@ -363,14 +608,7 @@ async def import_cards_csv(
                 continue
             card_data = parse_pipe_line(line)
             if card_data:
-                card = Card(
-                    deck_id=import_data.deck_id,
-                    word=card_data["word"],
-                    definition=card_data["definition"],
-                    synonyms=card_data["synonyms"],
-                    examples=card_data["examples"]
-                )
-                cards_to_add.append(card)
+                cards_to_add.append(card_data)
     else:
         # CSV format
         try:
@@ -383,21 +621,14 @@ async def import_cards_csv(
                     continue
                 card_data = parse_csv_line(row)
                 if card_data:
-                    card = Card(
-                        deck_id=import_data.deck_id,
-                        word=card_data["word"],
-                        definition=card_data["definition"],
-                        synonyms=card_data["synonyms"],
-                        examples=card_data["examples"]
-                    )
-                    cards_to_add.append(card)
+                    cards_to_add.append(card_data)
         except csv.Error as e:
             raise HTTPException(status_code=400, detail=f"Invalid CSV format: {str(e)}")
     
     if not cards_to_add:
         raise HTTPException(status_code=400, detail="No valid cards found in data")
     
-    db.add_all(cards_to_add)
+    insert_cards(db, import_data.deck_id, cards_to_add)
     db.commit()
     
     return ImportResponse(
@@ -409,10 +640,11 @@ async def import_cards_csv(
 @router.post("/study/multi", response_model=List[CardResponse])
 async def get_multi_deck_study_cards(
     request: MultiDeckStudyRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
 ):
     """Get cards from multiple decks for study. Cards are weighted by due status."""
+    projection = get_projection(request.view, request.fields)
     # Verify all decks belong to user
     decks = db.query(Deck).filter(
         Deck.id.in_(request.deck_ids),
@@ -422,48 +654,22 @@ async def get_multi_deck_study_cards(
     if len(decks) != len(request.deck_ids):
         raise HTTPException(status_code=404, detail="One or more decks not found")
     
-    # Collect cards from all decks
-    all_cards = []
-    now = datetime.utcnow()
-    
-    for deck in decks:
-        if request.mode == "all":
-            cards = db.query(Card).filter(Card.deck_id == deck.id).all()
-        else:
-            # Get due cards
-            cards = db.query(Card).filter(
-                Card.deck_id == deck.id,
-                Card.next_review_date <= now
-            ).all()
-        all_cards.extend(cards)
-    
-    # Filter for cards with examples (for cloze mode)
-    if request.with_examples_only:
-        all_cards = [card for card in all_cards if card.examples and len(card.examples) > 0]
-    
-    # Filter by familiarity bucket
-    if request.familiarity_bucket:
-        if request.familiarity_bucket == "low":
-            all_cards = [card for card in all_cards if 0 <= (card.interval or 0) <= 1]
-        elif request.familiarity_bucket == "medium":
-            all_cards = [card for card in all_cards if 2 <= (card.interval or 0) <= 3]
-        elif request.familiarity_bucket == "high":
-            all_cards = [card for card in all_cards if (card.interval or 0) >= 4]
-    
-    # Filter by starred-only
-    if request.starred_only:
-        all_cards = [card for card in all_cards if getattr(card, "is_starred", False)]
+    # Collect matching cards from all decks in one query
+    all_cards = query_study_cards(
+        db, projection, False,
+        Card.deck_id.in_([deck.id for deck in decks]),
+        *study_card_conditions(
+            request.mode,
+            with_examples_only=request.with_examples_only,
+            familiarity_bucket=request.familiarity_bucket,
+            starred_only=request.starred_only,
+        )
+    )
     
     if not all_cards:
         return []
     
-    # Apply weighted sampling if limit > 0
-    if request.limit > 0 and len(all_cards) > request.limit:
-        all_cards = weighted_sample(all_cards, request.limit)
-    else:
-        random.shuffle(all_cards)
-    
-    return all_cards
+    return study_cards_response(sample_study_cards(all_cards, request.limit), projection)
 
 
 # AI Example Generation
@@ -661,9 +867,10 @@ async def generate_ai_examples_batch(
     prompt = AI_BATCH_EXAMPLE_PROMPT.format(words_list=words_list, count=len(request.cards))
     
     try:
-        response = model.generate_content(prompt)
-        response_text = _clean_json_response(response.text)
-        result = json.loads(response_text)
+        with track_ai_call("examples_batch"):
+            response = model.generate_content(prompt)
+            response_text = _clean_json_response(response.text)
+            result = json.loads(response_text)
         cards_by_id = {card.get("card_id"): card for card in request.cards}
         normalized_results = []
         for item in result.get("results", []):
@@ -731,9 +938,10 @@ async def generate_ai_synonyms(
     prompt = AI_SYNONYMS_PROMPT.format(word=request.word, definition=request.definition)
     
     try:
-        response = model.generate_content(prompt)
-        response_text = _clean_json_response(response.text)
-        result = json.loads(response_text)
+        with track_ai_call("synonyms"):
+            response = model.generate_content(prompt)
+            response_text = _clean_json_response(response.text)
+            result = json.loads(response_text)
         return result
         
     except json.JSONDecodeError as e:
@@ -762,9 +970,10 @@ async def generate_ai_definition(
     prompt = AI_DEFINITION_PROMPT.format(word=request.word)
     
     try:
-        response = model.generate_content(prompt)
-        response_text = _clean_json_response(response.text)
-        result = json.loads(response_text)
+        with track_ai_call("definition"):
+            response = model.generate_content(prompt)
+            response_text = _clean_json_response(response.text)
+            result = json.loads(response_text)
         return result
         
     except json.JSONDecodeError as e:
@@ -793,9 +1002,10 @@ async def generate_ai_examples(
     prompt = AI_EXAMPLE_PROMPT.format(word=request.word, definition=request.definition)
     
     try:
-        response = model.generate_content(prompt)
-        response_text = _clean_json_response(response.text)
-        result = json.loads(response_text)
+        with track_ai_call("examples"):
+            response = model.generate_content(prompt)
+            response_text = _clean_json_response(response.text)
+            result = json.loads(response_text)
         examples = result.get("examples", [])
         result["examples"] = _normalize_examples_payload(examples, request.word)
         return result
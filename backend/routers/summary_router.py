@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from database import get_read_db
+from models import User
+from schemas import SummaryResponse
+from auth import get_current_reader
+from summary import get_summary
+
+router = APIRouter(prefix="/summary", tags=["Summary"])
+
+
+@router.get("", response_model=SummaryResponse)
+async def get_due_summary(
+    current_user: User = Depends(get_current_reader),
+    db: Session = Depends(get_read_db)
+):
+    """
+    What is due right now: totals, per-deck due counts and the next due time.
+    Cached briefly per user; the user's own writes clear the cache.
+    """
+    return get_summary(db, current_user)
@@ -0,0 +1,114 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from database import get_db
+from models import User, Folder, Deck, Card, Tombstone
+from schemas import (
+    SyncResponse, SyncFolder, SyncDeck, SyncCard, SyncDeletions,
+    SyncPushRequest, SyncPushResponse, ReviewResponse
+)
+from auth import get_current_user
+from srs_logic import apply_review, ReviewConflict
+from sync_logic import parse_cursor, next_cursor
+from review_log import build_log_entry, record_reviews
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("", response_model=SyncResponse)
+async def pull_changes(
+    since: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Return folders, decks and cards changed since the cursor, plus deletions.
+
+    Without a cursor the whole library is returned (initial sync). Each entity
+    type is one range scan on its updated_at index, so an empty delta is cheap.
+    """
+    try:
+        since_dt = parse_cursor(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+
+    started_at = datetime.utcnow()
+
+    folders_query = db.query(Folder).filter(Folder.user_id == current_user.id)
+    decks_query = db.query(Deck).filter(Deck.user_id == current_user.id)
+    cards_query = db.query(Card).join(Deck).filter(Deck.user_id == current_user.id)
+
+    deleted = SyncDeletions()
+    if since_dt is not None:
+        folders_query = folders_query.filter(Folder.updated_at > since_dt)
+        decks_query = decks_query.filter(Deck.updated_at > since_dt)
+        cards_query = cards_query.filter(Card.updated_at > since_dt)
+
+        tombstones = db.query(Tombstone.entity_type, Tombstone.entity_id).filter(
+            Tombstone.user_id == current_user.id,
+            Tombstone.deleted_at > since_dt
+        ).all()
+        for entity_type, entity_id in tombstones:
+            getattr(deleted, f"{entity_type}s").append(entity_id)
+
+    return SyncResponse(
+        cursor=next_cursor(since_dt, started_at),
+        folders=[SyncFolder.model_validate(folder) for folder in folders_query.all()],
+        decks=[SyncDeck.model_validate(deck) for deck in decks_query.all()],
+        cards=[SyncCard.model_validate(card) for card in cards_query.all()],
+        deleted=deleted,
+    )
+
+
+@router.post("/reviews", response_model=SyncPushResponse)
+async def push_reviews(
+    push_data: SyncPushRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Apply reviews recorded offline, oldest first, scheduling from each review's own timestamp."""
+    card_ids = {review.card_id for review in push_data.reviews}
+    cards = {
+        card.id: card
+        for card in db.query(Card).join(Deck).filter(
+            Card.id.in_(card_ids),
+            Deck.user_id == current_user.id
+        ).all()
+    } if card_ids else {}
+
+    applied = []
+    log_entries = []
+    rejected = set()
+    for review in sorted(push_data.reviews, key=lambda item: item.reviewed_at):
+        card = cards.get(review.card_id)
+        if card is None:
+            rejected.add(review.card_id)
+            continue
+
+        try:
+            previous = apply_review(
+                db, card, review.quality,
+                reviewed_at=review.reviewed_at,
+                user_id=current_user.id
+            )
+        except ReviewConflict:
+            rejected.add(review.card_id)
+            continue
+        log_entries.append(build_log_entry(
+            card, current_user.id, review.quality, previous,
+            reviewed_at=review.reviewed_at,
+            response_time_ms=review.response_time_ms
+        ))
+        applied.append(ReviewResponse(
+            card_id=card.id,
+            new_interval=card.interval,
+            new_ease_factor=card.ease_factor,
+            next_review_date=card.next_review_date,
+            version=card.version
+        ))
+
+    record_reviews(db, log_entries)
+    db.commit()
+
+    return SyncPushResponse(applied=applied, rejected_card_ids=sorted(rejected))
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+from typing import Literal, Optional, List
+from datetime import date, datetime, timezone
 
 
 # User Schemas
@@ -12,8 +12,13 @@ class UserCreate(UserBase):
     password: str
 
 
+class UserUpdate(BaseModel):
+    utc_offset_minutes: int = Field(..., ge=-12 * 60, le=14 * 60)  # Local time minus UTC
+
+
 class UserResponse(UserBase):
     id: int
+    utc_offset_minutes: int = 0
     created_at: datetime
 
     class Config:
@@ -82,6 +87,32 @@ class DeckResponse(DeckBase):
         from_attributes = True
 
 
+class DeckDuplicateRequest(BaseModel):
+    name: Optional[str] = None  # Defaults to "<source name> (copy)"
+    folder_id: Optional[int] = None  # Defaults to the source deck's folder
+    keep_schedule: bool = False
+
+
+class DeckMergeRequest(BaseModel):
+    source_deck_id: int  # Merged into the path deck, then deleted
+    keep_schedule: bool = True
+    skip_duplicates: bool = True
+
+
+class DeckSplitRequest(BaseModel):
+    name: str
+    card_ids: Optional[List[int]] = None
+    familiarity_bucket: Optional[Literal["low", "medium", "high"]] = None
+    starred_only: bool = False
+    keep_schedule: bool = True
+
+
+class DeckOperationResponse(BaseModel):
+    deck: DeckResponse
+    cards_affected: int
+    cards_skipped: int = 0
+
+
 # Example Schema for structured examples
 class ExampleItem(BaseModel):
     sentence: str
@@ -117,6 +148,7 @@ class CardResponse(CardBase):
     ease_factor: float
     next_review_date: datetime
     created_at: datetime
+    version: int = 0
 
     class Config:
         from_attributes = True
@@ -125,6 +157,10 @@ class CardResponse(CardBase):
 # Study Schemas
 class ReviewRequest(BaseModel):
     quality: int = Field(..., ge=0, le=5, description="Quality score: 0=Forgot, 3=Hard, 4=Good, 5=Easy")
+    response_time_ms: Optional[int] = Field(None, ge=0, description="Time taken to answer, for analytics")
+    expected_version: Optional[int] = Field(
+        None, description="Card version the client reviewed; 409 if the card changed since. Omit to let the server recompute."
+    )
 
 
 class ReviewResponse(BaseModel):
@@ -132,6 +168,34 @@ class ReviewResponse(BaseModel):
     new_interval: int
     new_ease_factor: float
     next_review_date: datetime
+    version: Optional[int] = None
+
+
+class RescheduleRequest(BaseModel):
+    days: int = Field(7, ge=1, le=365, description="Spread the backlog over this many days, starting today")
+    deck_id: Optional[int] = None  # Whole library when omitted
+
+
+class RescheduleResponse(BaseModel):
+    rescheduled: int
+    days: int
+
+
+# Summary Schemas
+class DeckDueSummary(BaseModel):
+    deck_id: int
+    due: int
+    overdue: int  # Due before today (UTC)
+    new_cards: int  # Due and never reviewed
+
+
+class SummaryResponse(BaseModel):
+    total_due: int
+    overdue: int
+    new_cards: int
+    next_due_at: Optional[datetime] = None  # Earliest card not yet due
+    decks: List[DeckDueSummary]  # Only decks with cards due
+    generated_at: datetime
 
 
 # Import Schemas
@@ -155,6 +219,22 @@ class ImportResponse(BaseModel):
     deck_id: int
 
 
+class ImportChunkResponse(BaseModel):
+    import_id: str
+    seq: int
+    deck_id: int
+    imported_count: int  # Cards in this chunk
+    total_imported: int  # Cards in every committed chunk of the import
+    duplicate: bool  # The chunk was already committed; nothing was inserted
+
+
+class ImportStatusResponse(BaseModel):
+    import_id: str
+    deck_id: int
+    committed_chunks: List[int]
+    total_imported: int
+
+
 # Library Schemas
 class DeckInFolder(BaseModel):
     id: int
@@ -190,6 +270,36 @@ class LibraryResponse(BaseModel):
 FolderWithDecks.model_rebuild()
 
 
+class FolderPathItem(BaseModel):
+    id: int
+    name: str
+
+
+class FolderSubtreeResponse(BaseModel):
+    folder: FolderWithDecks
+    path: List[FolderPathItem]  # From the root folder down to this folder
+
+
+# Bulk Card Schemas
+class BulkCardFilter(BaseModel):
+    deck_id: Optional[int] = None
+    familiarity_bucket: Optional[Literal["low", "medium", "high"]] = None
+    starred_only: bool = False
+
+
+class BulkCardRequest(BaseModel):
+    operation: Literal["star", "unstar", "move", "delete", "reset"]
+    card_ids: Optional[List[int]] = Field(None, description="Cards to change; or use filter")
+    filter: Optional[BulkCardFilter] = None
+    target_deck_id: Optional[int] = Field(None, description="Destination deck for 'move'")
+
+
+class BulkCardResponse(BaseModel):
+    operation: str
+    affected: int
+    card_ids: List[int]
+
+
 # CSV Import Schema
 class CSVImportRequest(BaseModel):
     deck_id: int
@@ -204,6 +314,38 @@ class MultiDeckStudyRequest(BaseModel):
     with_examples_only: bool = False  # Filter for cards with examples (for cloze mode)
     familiarity_bucket: Optional[str] = None  # "low", "medium", "high"
     starred_only: bool = False
+    view: Optional[str] = None  # "flashcard", "cloze" or "full" (default)
+    fields: Optional[str] = None  # Comma-separated card fields, e.g. "word,definition"
+
+
+# Study Session Schemas
+class StudySessionCreate(BaseModel):
+    deck_ids: Optional[List[int]] = None
+    folder_id: Optional[int] = None  # Every deck under this folder, nested folders included
+    mode: str = "due"  # "due" or "all"
+    limit: int = 0  # 0 for every matching card
+    cloze_only: bool = False
+    with_examples_only: bool = False
+    familiarity_bucket: Optional[str] = None  # "low", "medium", "high"
+    starred_only: bool = False
+    chunk_size: int = Field(5, ge=1, le=100)
+
+
+class StudySessionResponse(BaseModel):
+    session_id: str
+    total: int
+    remaining: int
+    reviewed: int
+    lapses: int
+    cards: List[CardResponse]  # Next chunk on start and /next; in-flight cards on resume
+
+
+class StudySessionReviewResponse(BaseModel):
+    review: ReviewResponse
+    remaining: int
+    reviewed: int
+    lapses: int
+    requeued_at: Optional[int] = None  # Queue position of a lapsed card, if it will be shown again
 
 
 # PDF Import Schema
@@ -215,3 +357,94 @@ class PDFImportResponse(BaseModel):
     imported_count: int
     deck_id: int
     cards_preview: List[CardBase]  # Preview of imported cards
+
+
+# Sync Schemas
+class SyncFolder(FolderResponse):
+    updated_at: Optional[datetime] = None
+
+
+class SyncDeck(DeckBase):
+    id: int
+    folder_id: Optional[int]
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class SyncCard(CardResponse):
+    updated_at: Optional[datetime] = None
+
+
+class SyncDeletions(BaseModel):
+    folders: List[int] = []
+    decks: List[int] = []  # Cards of a deleted deck are implicitly deleted
+    cards: List[int] = []
+
+
+class SyncResponse(BaseModel):
+    cursor: str  # Pass back as ?since= on the next sync
+    folders: List[SyncFolder]
+    decks: List[SyncDeck]
+    cards: List[SyncCard]
+    deleted: SyncDeletions
+
+
+class SyncReview(BaseModel):
+    card_id: int
+    quality: int = Field(..., ge=0, le=5)
+    reviewed_at: datetime
+    response_time_ms: Optional[int] = Field(None, ge=0)
+
+    @field_validator("reviewed_at")
+    @classmethod
+    def naive_utc(cls, value: datetime) -> datetime:
+        # Stored times are naive UTC; clients may send offsets ("Z", "+08:00") or not
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+
+class SyncPushRequest(BaseModel):
+    reviews: List[SyncReview]
+
+
+class SyncPushResponse(BaseModel):
+    applied: List[ReviewResponse]
+    rejected_card_ids: List[int] = []
+
+
+# Statistics Schemas
+class DailyStats(BaseModel):
+    day: date
+    reviews: int
+    lapses: int
+    new_cards: int
+    average_quality: float
+
+
+class StatsResponse(BaseModel):
+    start_day: date
+    end_day: date
+    days: List[DailyStats]  # Only days with at least one review
+    total_reviews: int
+    total_lapses: int
+    total_new_cards: int
+    retention_rate: Optional[float] = None  # Share of reviews of seen cards that were not lapses
+    current_streak: int  # Streaks are over the whole history, not just start_day..end_day
+    longest_streak: int
+
+
+# Search Schemas
+class SearchHit(CardResponse):
+    deck_name: str
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+    offset: int
+    limit: int
+    has_more: bool
@@ -0,0 +1,273 @@
+"""
+Full-text search index over cards.
+
+SQLite uses an FTS5 virtual table keyed by card id; Postgres uses a side
+table with a weighted tsvector and a GIN index. Han characters and kana are
+indexed one character per token, so Chinese definitions and translations
+match by phrase without a segmenter. Cards written through the ORM are kept
+in sync by a flush hook; set-based writes must call index_card_ids /
+remove_card_ids themselves.
+
+Run `python search_index.py` to rebuild the index from the cards table.
+"""
+import re
+from typing import Iterable, List, Optional
+
+from sqlalchemy import Integer, column, delete, event, inspect as sa_inspect, select, table, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from models import Card
+
+SEARCH_TABLE = "card_search"
+INDEXED_ATTRIBUTES = ("word", "definition", "synonyms", "examples")
+REBUILD_BATCH_SIZE = 2000
+
+_CJK_CHARS = "぀-ヿ㐀-䶿一-鿿豈-﫿"
+_CJK_RE = re.compile(f"([{_CJK_CHARS}])")
+_CJK_RUN_RE = re.compile(f"[{_CJK_CHARS}]+")
+_QUERY_TOKEN_RE = re.compile(f"[{_CJK_CHARS}]+|[^\\W_]+")
+
+# Per-engine backend: "fts5", "postgres", or None when no index table exists
+_backends = {}
+
+
+def segment_cjk(value: str) -> str:
+    """Put spaces around CJK characters so each one is its own token."""
+    # One callback per run of CJK characters rather than a template expansion per character
+    return _CJK_RUN_RE.sub(lambda match: " " + " ".join(match.group()) + " ", value or "")
+
+
+def build_document(word: str, definition: str, synonyms, examples) -> dict:
+    """Searchable text for one card, split into separately weighted fields."""
+    example_parts = []
+    for example in examples or []:
+        if isinstance(example, dict):
+            example_parts.append(example.get("sentence") or "")
+            example_parts.append(example.get("translation") or "")
+    return {
+        "word": segment_cjk(word),
+        "definition": segment_cjk(definition),
+        "synonyms": segment_cjk(" ".join(synonyms or [])),
+        "examples": segment_cjk(" ".join(example_parts).replace("*", "")),
+    }
+
+
+def query_terms(query: str) -> List[str]:
+    """Split a user query into latin words and CJK runs."""
+    return _QUERY_TOKEN_RE.findall(query or "")
+
+
+def fts5_match_expression(terms: List[str]) -> str:
+    """FTS5 MATCH string: CJK runs as phrases, words as prefix matches, all ANDed."""
+    parts = []
+    for term in terms:
+        if _CJK_RE.match(term):
+            parts.append('"' + " ".join(term) + '"')
+        else:
+            parts.append(f'"{term}"*')
+    return " ".join(parts)
+
+
+def tsquery_expression(terms: List[str]) -> str:
+    """to_tsquery string with the same semantics as fts5_match_expression."""
+    parts = []
+    for term in terms:
+        if _CJK_RE.match(term):
+            parts.append("(" + " <-> ".join(term) + ")")
+        else:
+            parts.append(f"{term.lower()}:*")
+    return " & ".join(parts)
+
+
+def _detect_backend(connection: Connection) -> Optional[str]:
+    engine = connection.engine
+    if engine not in _backends:
+        if SEARCH_TABLE in sa_inspect(connection).get_table_names():
+            _backends[engine] = "postgres" if engine.dialect.name == "postgresql" else "fts5"
+        else:
+            _backends[engine] = None
+    return _backends[engine]
+
+
+def search_backend(db: Session) -> Optional[str]:
+    return _detect_backend(db.connection())
+
+
+def ensure_search_index(engine: Engine) -> Optional[str]:
+    """Create the index table if the database supports it, filling it on first creation."""
+    with engine.connect() as connection:
+        if SEARCH_TABLE in sa_inspect(connection).get_table_names():
+            _backends.pop(engine, None)
+            return _detect_backend(connection)
+
+        try:
+            if engine.dialect.name == "postgresql":
+                connection.execute(text(
+                    f"CREATE TABLE {SEARCH_TABLE} ("
+                    "card_id INTEGER PRIMARY KEY REFERENCES cards(id) ON DELETE CASCADE, "
+                    "document TSVECTOR NOT NULL)"
+                ))
+                connection.execute(text(
+                    f"CREATE INDEX ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)"
+                ))
+            elif engine.dialect.name == "sqlite":
+                connection.execute(text(
+                    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                    "word, definition, synonyms, examples, tokenize='unicode61 remove_diacritics 2')"
+                ))
+            else:
+                return None
+        except Exception as e:
+            print(f"Full-text search unavailable, falling back to LIKE: {e}")
+            connection.rollback()
+            return None
+        connection.commit()
+
+    _backends.pop(engine, None)
+    with Session(bind=engine) as db:
+        rebuild_search_index(db)
+        db.commit()
+        return search_backend(db)
+
+
+def _write_documents(connection: Connection, backend: str, rows: Iterable, replace: bool = True) -> None:
+    params = []
+    for card_id, word, definition, synonyms, examples in rows:
+        params.append({"card_id": card_id, **build_document(word, definition, synonyms, examples)})
+    if not params:
+        return
+
+    ids = [{"card_id": item["card_id"]} for item in params] if replace else []
+    if backend == "postgres":
+        if ids:
+            connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE card_id = :card_id"), ids)
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (card_id, document) VALUES (:card_id, "
+            "setweight(to_tsvector('simple', :word), 'A') || "
+            "setweight(to_tsvector('simple', :synonyms), 'B') || "
+            "setweight(to_tsvector('simple', :definition), 'B') || "
+            "setweight(to_tsvector('simple', :examples), 'C'))"
+        ), params)
+    else:
+        if ids:
+            connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :card_id"), ids)
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, word, definition, synonyms, examples) "
+            "VALUES (:card_id, :word, :definition, :synonyms, :examples)"
+        ), params)
+
+
+def _remove_documents(connection: Connection, backend: str, card_ids: List[int]) -> None:
+    if not card_ids:
+        return
+    key = "card_id" if backend == "postgres" else "rowid"
+    connection.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} = :card_id"),
+        [{"card_id": card_id} for card_id in card_ids],
+    )
+
+
+def _card_rows(db: Session, condition):
+    return db.execute(
+        select(Card.id, Card.word, Card.definition, Card.synonyms, Card.examples).where(condition)
+    )
+
+
+def index_card_ids(db: Session, card_ids: List[int], new: bool = False) -> None:
+    """(Re)index cards written with set-based statements. new=True skips clearing old documents."""
+    backend = search_backend(db)
+    if backend is None or not card_ids:
+        return
+    for start in range(0, len(card_ids), REBUILD_BATCH_SIZE):
+        batch = card_ids[start:start + REBUILD_BATCH_SIZE]
+        _write_documents(db.connection(), backend, _card_rows(db, Card.id.in_(batch)).all(), replace=not new)
+
+
+def index_new_cards(db: Session, rows: Iterable) -> None:
+    """Index just-inserted cards from (id, word, definition, synonyms, examples) rows already in hand."""
+    backend = search_backend(db)
+    if backend is not None:
+        _write_documents(db.connection(), backend, rows, replace=False)
+
+
+def index_deck(db: Session, deck_id: int) -> None:
+    """Reindex every card in a deck."""
+    backend = search_backend(db)
+    if backend is None:
+        return
+    rows = _card_rows(db, Card.deck_id == deck_id).all()
+    _remove_documents(db.connection(), backend, [row[0] for row in rows])
+    _write_documents(db.connection(), backend, rows)
+
+
+def remove_card_ids(db: Session, card_ids: List[int]) -> None:
+    """Drop cards removed with set-based statements from the index."""
+    backend = search_backend(db)
+    if backend is not None:
+        _remove_documents(db.connection(), backend, list(card_ids))
+
+
+def remove_cards_where(db: Session, condition) -> None:
+    """Drop every card matching condition from the index, before deleting those cards set-based."""
+    backend = search_backend(db)
+    if backend is None:
+        return
+    key = "card_id" if backend == "postgres" else "rowid"
+    index_table = table(SEARCH_TABLE, column(key, Integer))
+    db.execute(delete(index_table).where(index_table.c[key].in_(select(Card.id).where(condition))))
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Re-index every card. Returns the number of cards indexed."""
+    backend = search_backend(db)
+    if backend is None:
+        return 0
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    result = db.execute(
+        select(Card.id, Card.word, Card.definition, Card.synonyms, Card.examples)
+        .execution_options(yield_per=REBUILD_BATCH_SIZE)
+    )
+    count = 0
+    for batch in result.partitions():
+        _write_documents(db.connection(), backend, batch)
+        count += len(batch)
+    return count
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_flushed_cards(session: Session, flush_context) -> None:
+    """Mirror ORM inserts, text edits and deletes of cards into the index."""
+    changed = [
+        obj for obj in session.new if isinstance(obj, Card)
+    ] + [
+        obj for obj in session.dirty
+        if isinstance(obj, Card) and any(
+            sa_inspect(obj).attrs[name].history.has_changes() for name in INDEXED_ATTRIBUTES
+        )
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Card)]
+    if not changed and not deleted:
+        return
+
+    connection = session.connection()
+    backend = _detect_backend(connection)
+    if backend is None:
+        return
+    _remove_documents(connection, backend, deleted)
+    _write_documents(connection, backend, [
+        (card.id, card.word, card.definition, card.synonyms, card.examples) for card in changed
+    ])
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+
+    ensure_search_index(engine)
+    session = SessionLocal()
+    try:
+        indexed = rebuild_search_index(session)
+        session.commit()
+        print(f"Indexed {indexed} cards")
+    finally:
+        session.close()
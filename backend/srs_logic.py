@@ -1,14 +1,35 @@
-from datetime import datetime, timedelta
-from models import Card
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import Date, case, func, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from models import Card, Deck
+from review_log import snapshot_sm2_state
 
+# Attempts at recomputing a review that lost a race with another device
+REVIEW_MAX_ATTEMPTS = 3
 
-def calculate_sm2(quality: int, card: Card) -> dict:
+# Load leveling: move a review by up to LOAD_BALANCE_FUZZ of its interval
+# (capped at LOAD_BALANCE_MAX_DAYS) onto the day with the fewest cards due
+LOAD_BALANCE_ENABLED = os.getenv("REVIEW_LOAD_BALANCING", "0") == "1"
+LOAD_BALANCE_MIN_INTERVAL = 3
+LOAD_BALANCE_FUZZ = 0.1
+LOAD_BALANCE_MAX_DAYS = 7
+
+
+class ReviewConflict(Exception):
+    """The card's schedule changed between reading and writing it."""
+
+
+def calculate_sm2(quality: int, card: Card, reviewed_at: Optional[datetime] = None) -> dict:
     """
     SuperMemo-2 (SM-2) Algorithm Implementation
     
     Args:
         quality: Quality of response (0=Forgot, 3=Hard, 4=Good, 5=Easy)
         card: Card object with current SM-2 values
+        reviewed_at: When the review happened (defaults to now; set for offline reviews)
     
     Returns:
         dict with updated interval, repetition, ease_factor, and next_review_date
@@ -44,7 +65,7 @@ def calculate_sm2(quality: int, card: Card) -> dict:
     ease_factor = max(1.3, ease_factor)
     
     # Calculate next review date
-    next_review_date = datetime.utcnow() + timedelta(days=interval)
+    next_review_date = (reviewed_at or datetime.utcnow()) + timedelta(days=interval)
     
     return {
         "interval": interval,
@@ -54,6 +75,123 @@ def calculate_sm2(quality: int, card: Card) -> dict:
     }
 
 
+def due_histogram(db: Session, user_id: int, start: date, end: date) -> Dict[date, int]:
+    """Cards due per day for a user, for days in [start, end]."""
+    day = func.date(Card.next_review_date, type_=Date)
+    rows = db.query(day, func.count(Card.id)).join(Deck).filter(
+        Deck.user_id == user_id,
+        Card.next_review_date >= datetime.combine(start, datetime.min.time()),
+        Card.next_review_date < datetime.combine(end + timedelta(days=1), datetime.min.time())
+    ).group_by(day).all()
+    return {due_day: count for due_day, count in rows}
+
+
+def level_due_date(db: Session, user_id: int, sm2_result: dict, reviewed_at: Optional[datetime] = None) -> dict:
+    """Shift a scheduled review to the least-loaded day within its fuzz window.
+
+    Short intervals are left alone. Ties go to the day closest to the
+    unfuzzed interval, so an empty calendar keeps plain SM-2 behaviour.
+    """
+    interval = sm2_result["interval"]
+    if interval < LOAD_BALANCE_MIN_INTERVAL:
+        return sm2_result
+
+    fuzz = min(LOAD_BALANCE_MAX_DAYS, max(1, round(interval * LOAD_BALANCE_FUZZ)))
+    base = reviewed_at or datetime.utcnow()
+    candidates = range(max(1, interval - fuzz), interval + fuzz + 1)
+    load = due_histogram(
+        db, user_id,
+        (base + timedelta(days=candidates[0])).date(),
+        (base + timedelta(days=candidates[-1])).date()
+    )
+    best = min(
+        candidates,
+        key=lambda days: (load.get((base + timedelta(days=days)).date(), 0), abs(days - interval))
+    )
+    return {**sm2_result, "interval": best, "next_review_date": base + timedelta(days=best)}
+
+
+def spread_due_cards(db: Session, card_filter, days: int, now: Optional[datetime] = None) -> int:
+    """Spread the cards matching card_filter evenly over the next `days` days.
+
+    One UPDATE: each card lands on day (id % days), with the day's timestamp
+    bound as a parameter. Intervals are kept; the card version is bumped.
+    """
+    now = now or datetime.utcnow()
+    if days <= 1:
+        new_date = now
+    else:
+        new_date = case(
+            *[(Card.id % days == offset, now + timedelta(days=offset)) for offset in range(days)],
+            else_=now
+        )
+    result = db.execute(
+        update(Card).where(card_filter)
+        .values(next_review_date=new_date, version=Card.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def write_sm2_state(db: Session, card: Card, sm2_result: dict) -> bool:
+    """Store a review as one conditional UPDATE ... RETURNING guarded by the card version.
+
+    Returns False if another writer bumped the version first. On success the
+    in-memory card is updated without being marked dirty, so no further
+    UPDATE or refresh is needed.
+    """
+    stmt = (
+        update(Card)
+        .where(Card.id == card.id, Card.version == card.version)
+        .values(**sm2_result, version=Card.version + 1)
+        .returning(Card.version, Card.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        return False
+
+    for key, value in sm2_result.items():
+        set_committed_value(card, key, value)
+    set_committed_value(card, "version", row.version)
+    set_committed_value(card, "updated_at", row.updated_at)
+    return True
+
+
+def apply_review(
+    db: Session,
+    card: Card,
+    quality: int,
+    reviewed_at: Optional[datetime] = None,
+    expected_version: Optional[int] = None,
+    user_id: Optional[int] = None,
+) -> dict:
+    """Schedule a review with optimistic concurrency.
+
+    With expected_version the review is rejected (ReviewConflict) unless the
+    card is still at that version. Without it, a lost race re-reads the card
+    and recomputes SM-2 from the winner's state, up to REVIEW_MAX_ATTEMPTS.
+    When load balancing is enabled, user_id selects the due-date histogram.
+
+    Returns the card's SM-2 state from before the review.
+    """
+    if expected_version is not None and card.version != expected_version:
+        raise ReviewConflict()
+
+    for _ in range(REVIEW_MAX_ATTEMPTS):
+        previous = snapshot_sm2_state(card)
+        sm2_result = calculate_sm2(quality, card, reviewed_at=reviewed_at)
+        if LOAD_BALANCE_ENABLED and user_id is not None:
+            sm2_result = level_due_date(db, user_id, sm2_result, reviewed_at=reviewed_at)
+        if write_sm2_state(db, card, sm2_result):
+            return previous
+        if expected_version is not None:
+            raise ReviewConflict()
+        db.refresh(card)
+
+    raise ReviewConflict()
+
+
 def get_mastery_percentage(cards: list) -> float:
     """
     Calculate the percentage of mastered cards in a deck.
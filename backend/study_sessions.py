@@ -0,0 +1,170 @@
+"""
+Server-side study sessions.
+
+Starting a session runs the study query and sampling once and freezes the
+result as a queue of card ids. Cards are then handed out in small chunks;
+cards handed out but not yet reviewed stay "in flight" so a reloaded client
+can resume where it left off. A lapsed card (quality < 3) is put back into
+the queue a few cards later (LEARNING_STEPS), up to MAX_RELEARNS times per
+session.
+
+Sessions live in process memory (LRU with idle expiry) when a single worker
+serves the API, and in the study_sessions table when WEB_CONCURRENCY > 1 so
+any worker can continue a session. STUDY_SESSION_STORE=memory|db overrides.
+"""
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from database import WORKER_COUNT
+from models import StudySessionRecord
+from ttl_cache import TTLCache
+
+STUDY_SESSION_STORE = os.getenv("STUDY_SESSION_STORE", "db" if WORKER_COUNT > 1 else "memory")
+STUDY_SESSION_TTL = float(os.getenv("STUDY_SESSION_TTL", str(6 * 3600)))  # Idle seconds before a session expires
+STUDY_SESSION_MAX = int(os.getenv("STUDY_SESSION_MAX", "5000"))  # Sessions kept in memory per worker
+
+# A lapsed card comes back after this many other cards; later lapses use the last step
+LEARNING_STEPS = (3, 10)
+MAX_RELEARNS = 3
+
+
+@dataclass
+class StudySession:
+    id: str
+    user_id: int
+    queue: List[int]
+    chunk_size: int
+    total: int
+    in_flight: List[int] = field(default_factory=list)
+    relearns: Dict[int, int] = field(default_factory=dict)
+    reviewed: int = 0
+    lapses: int = 0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    @classmethod
+    def start(cls, user_id: int, card_ids: List[int], chunk_size: int) -> "StudySession":
+        return cls(
+            id=uuid.uuid4().hex, user_id=user_id, queue=list(card_ids),
+            chunk_size=chunk_size, total=len(card_ids),
+        )
+
+    @property
+    def remaining(self) -> int:
+        return len(self.in_flight) + len(self.queue)
+
+    def take(self, count: Optional[int] = None) -> List[int]:
+        """Move the next cards from the queue to in flight and return their ids."""
+        count = self.chunk_size if count is None else count
+        chunk, self.queue = self.queue[:count], self.queue[count:]
+        self.in_flight.extend(chunk)
+        return chunk
+
+    def record_review(self, card_id: int, quality: int) -> Optional[int]:
+        """Mark a card reviewed. Returns the queue position a lapsed card was re-inserted at."""
+        if card_id in self.in_flight:
+            self.in_flight.remove(card_id)
+        elif card_id in self.queue:
+            self.queue.remove(card_id)
+        else:
+            return None
+
+        self.reviewed += 1
+        if quality >= 3:
+            return None
+
+        self.lapses += 1
+        relearns = self.relearns.get(card_id, 0)
+        if relearns >= MAX_RELEARNS:
+            return None
+        self.relearns[card_id] = relearns + 1
+        step = LEARNING_STEPS[min(relearns, len(LEARNING_STEPS) - 1)]
+        # Cards already prefetched by the client are shown before anything in the queue
+        position = min(len(self.queue), max(0, step - len(self.in_flight)))
+        self.queue.insert(position, card_id)
+        return position
+
+    def to_state(self) -> dict:
+        return {
+            "queue": self.queue,
+            "in_flight": self.in_flight,
+            "relearns": {str(card_id): count for card_id, count in self.relearns.items()},
+            "chunk_size": self.chunk_size,
+            "total": self.total,
+            "reviewed": self.reviewed,
+            "lapses": self.lapses,
+            "created_at": self.created_at.isoformat(),
+        }
+
+    @classmethod
+    def from_state(cls, session_id: str, user_id: int, state: dict) -> "StudySession":
+        return cls(
+            id=session_id,
+            user_id=user_id,
+            queue=list(state["queue"]),
+            in_flight=list(state["in_flight"]),
+            relearns={int(card_id): count for card_id, count in state["relearns"].items()},
+            chunk_size=state["chunk_size"],
+            total=state["total"],
+            reviewed=state["reviewed"],
+            lapses=state["lapses"],
+            created_at=datetime.fromisoformat(state["created_at"]),
+        )
+
+
+class MemorySessionStore:
+    """Per-process sessions; saving refreshes the idle timer."""
+
+    def __init__(self):
+        self._cache = TTLCache("study_sessions", ttl=STUDY_SESSION_TTL, maxsize=STUDY_SESSION_MAX)
+
+    def get(self, db: Session, session_id: str) -> Optional[StudySession]:
+        return self._cache.get(session_id)
+
+    def save(self, db: Session, session: StudySession) -> None:
+        self._cache.set(session.id, session)
+
+    def delete(self, db: Session, session_id: str) -> None:
+        self._cache.invalidate(session_id)
+
+
+class DatabaseSessionStore:
+    """Sessions in the study_sessions table, written in the caller's transaction."""
+
+    def get(self, db: Session, session_id: str) -> Optional[StudySession]:
+        record = db.get(StudySessionRecord, session_id)
+        if record is None or record.expires_at <= datetime.utcnow():
+            return None
+        return StudySession.from_state(record.id, record.user_id, record.state)
+
+    def save(self, db: Session, session: StudySession) -> None:
+        expires_at = datetime.utcnow() + timedelta(seconds=STUDY_SESSION_TTL)
+        record = db.get(StudySessionRecord, session.id)
+        if record is None:
+            # New sessions are rare enough to sweep expired ones here
+            db.execute(
+                delete(StudySessionRecord)
+                .where(StudySessionRecord.expires_at <= datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.add(StudySessionRecord(
+                id=session.id, user_id=session.user_id, state=session.to_state(), expires_at=expires_at
+            ))
+        else:
+            record.state = session.to_state()
+            record.expires_at = expires_at
+
+    def delete(self, db: Session, session_id: str) -> None:
+        db.execute(
+            delete(StudySessionRecord)
+            .where(StudySessionRecord.id == session_id)
+            .execution_options(synchronize_session=False)
+        )
+
+
+session_store = DatabaseSessionStore() if STUDY_SESSION_STORE == "db" else MemorySessionStore()
@@ -0,0 +1,169 @@
+"""
+Due-card summary for the study landing page.
+
+One aggregate over the user's due cards (answered from the covering (deck_id,
+next_review_date, ...) index) plus the next upcoming due time, cached per user
+for SUMMARY_CACHE_TTL seconds. Any successful write request from the same
+user drops their entry, so the page never shows counts from before the
+user's own reviews.
+
+That invalidation only reaches the worker that handled the write, so with
+several workers (WEB_CONCURRENCY > 1) the cache is off by default. Setting
+SUMMARY_CACHE_TTL there accepts counts up to that many seconds old.
+
+On a miss the user's precomputed due queue for today (see due_queues) is
+used when it exists, so the morning rush doesn't scan whole collections;
+otherwise the counts come from the live aggregate.
+"""
+import os
+from datetime import datetime, time as dt_time
+from typing import List, Optional
+
+from sqlalchemy import Integer, case, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from auth import username_from_token
+from database import WORKER_COUNT
+from due_queues import QueuedCard, current_queue, due_now, from_timestamp
+from models import Card, Deck
+from schemas import DeckDueSummary, SummaryResponse
+from ttl_cache import TTLCache
+
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", "30" if WORKER_COUNT == 1 else "0"))
+
+summary_cache = TTLCache("summary", ttl=SUMMARY_CACHE_TTL)
+
+_READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def compute_summary(db: Session, user_id: int, now: Optional[datetime] = None) -> SummaryResponse:
+    """Due counts per deck and the next due time in a single statement."""
+    now = now or datetime.utcnow()
+    start_of_today = datetime.combine(now.date(), dt_time.min)
+    # Driving from the user's deck ids lets each deck be a range scan on the covering index
+    user_decks = select(Deck.id).where(Deck.user_id == user_id)
+
+    per_deck = (
+        select(
+            Card.deck_id.label("deck_id"),
+            func.count().label("due"),  # COUNT(*): the covering index has no id column
+            func.sum(case((Card.next_review_date < start_of_today, 1), else_=0)).label("overdue"),
+            func.sum(case(((Card.repetition == 0) & (Card.interval == 0), 1), else_=0)).label("new_cards"),
+            null().label("next_due_at"),
+        )
+        .where(Card.deck_id.in_(user_decks), Card.next_review_date <= now)
+        .group_by(Card.deck_id)
+    )
+    upcoming = (
+        select(
+            literal(None, type_=Integer).label("deck_id"),
+            literal(0).label("due"),
+            literal(0).label("overdue"),
+            literal(0).label("new_cards"),
+            func.min(Card.next_review_date).label("next_due_at"),
+        )
+        .where(Card.deck_id.in_(user_decks), Card.next_review_date > now)
+    )
+    query = union_all(per_deck, upcoming).subquery()
+    rows = db.execute(select(query).select_from(query)).all()
+
+    decks = []
+    next_due_at = None
+    for deck_id, due, overdue, new_cards, upcoming_at in rows:
+        if deck_id is None:
+            next_due_at = upcoming_at
+            continue
+        decks.append(DeckDueSummary(
+            deck_id=deck_id, due=due, overdue=int(overdue or 0), new_cards=int(new_cards or 0)
+        ))
+    decks.sort(key=lambda item: item.deck_id)
+
+    if isinstance(next_due_at, str):
+        # SQLite loses the column type through UNION
+        next_due_at = datetime.fromisoformat(next_due_at)
+
+    return SummaryResponse(
+        total_due=sum(item.due for item in decks),
+        overdue=sum(item.overdue for item in decks),
+        new_cards=sum(item.new_cards for item in decks),
+        next_due_at=next_due_at,
+        decks=decks,
+        generated_at=now,
+    )
+
+
+def summary_from_queue(cards: List[QueuedCard], next_due_after: Optional[datetime],
+                       now: Optional[datetime] = None) -> SummaryResponse:
+    """The same counts as compute_summary, from a due queue instead of the cards table."""
+    now = now or datetime.utcnow()
+    start_of_today = datetime.combine(now.date(), dt_time.min)
+    due = due_now(cards, now)
+    due_ids = {card.id for card in due}
+
+    per_deck = {}
+    for card in due:
+        counts = per_deck.setdefault(card.deck_id, [0, 0, 0])
+        counts[0] += 1
+        counts[1] += from_timestamp(card.due_at) < start_of_today
+        counts[2] += card.repetition == 0 and card.interval == 0
+    decks = [
+        DeckDueSummary(deck_id=deck_id, due=due_count, overdue=overdue, new_cards=new_cards)
+        for deck_id, (due_count, overdue, new_cards) in sorted(per_deck.items())
+    ]
+
+    upcoming = [from_timestamp(card.due_at) for card in cards if card.id not in due_ids]
+    if next_due_after is not None:
+        upcoming.append(next_due_after)
+
+    return SummaryResponse(
+        total_due=len(due),
+        overdue=sum(item.overdue for item in decks),
+        new_cards=sum(item.new_cards for item in decks),
+        next_due_at=min(upcoming, default=None),
+        decks=decks,
+        generated_at=now,
+    )
+
+
+def get_summary(db: Session, user) -> SummaryResponse:
+    summary = summary_cache.get(user.username)
+    if summary is None:
+        now = datetime.utcnow()
+        queue = current_queue(db, user, now)
+        if queue is not None:
+            summary = summary_from_queue(*queue, now=now)
+        else:
+            summary = compute_summary(db, user.id, now)
+        if SUMMARY_CACHE_TTL > 0:
+            summary_cache.set(user.username, summary)
+    return summary
+
+
+class SummaryCacheMiddleware:
+    """Pure ASGI middleware dropping the caller's cached summary after a successful write."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") in _READ_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                invalidate_for_request(scope)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def invalidate_for_request(scope) -> None:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                username = username_from_token(token)
+                if username is not None:
+                    summary_cache.invalidate(username)
+            return
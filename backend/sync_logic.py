@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models import Tombstone
+
+# New cursors trail the server clock a little so that rows written by
+# transactions that were still in flight when a sync ran are picked up by
+# the next one. Clients apply changes as upserts, so the overlap is harmless.
+SYNC_CURSOR_OVERLAP = timedelta(seconds=5)
+
+
+def record_tombstones(db: Session, user_id: int, entity_type: str, entity_ids: Iterable[int]) -> None:
+    """Remember deleted rows so the next delta sync can report them.
+
+    Deleting a deck only records the deck itself: clients drop the deck's
+    cards along with it.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "entity_type": entity_type, "entity_id": entity_id, "deleted_at": now}
+        for entity_id in entity_ids
+    ]
+    if rows:
+        db.execute(insert(Tombstone), rows)
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[datetime]:
+    """Decode a sync cursor. Returns None for a full sync; raises ValueError if malformed."""
+    if not cursor:
+        return None
+    return datetime.fromisoformat(cursor)
+
+
+def next_cursor(since: Optional[datetime], started_at: datetime) -> str:
+    """Cursor for the next sync: the request start minus the overlap, never moving backwards."""
+    cursor = started_at - SYNC_CURSOR_OVERLAP
+    if since is not None and since > cursor:
+        cursor = since
+    return cursor.isoformat()
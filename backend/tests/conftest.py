@@ -0,0 +1,55 @@
+"""
+Shared fixtures. The app runs in process against a throwaway SQLite
+database; DATABASE_URL is set here, before anything imports database.py.
+Tests marked postgres run only when TEST_POSTGRES_URL points at a scratch
+Postgres database.
+
+Run from backend/:  python -m pytest
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='tests-'), 'test.db')}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+from auth import create_access_token, get_password_hash  # noqa: E402
+from database import SessionLocal  # noqa: E402
+from models import User  # noqa: E402
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "postgres: needs TEST_POSTGRES_URL (a scratch Postgres database)")
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    # Not entered as a context manager, so the background tasks stay off
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create a user; returns (user, auth headers)."""
+    def make(username: str):
+        user = User(username=username, password_hash=get_password_hash("test"))
+        db.add(user)
+        db.commit()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+        return user, headers
+    return make
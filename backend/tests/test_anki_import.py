@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import zipfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from anki_import import (
+    CARD_TYPE_LEARNING, CARD_TYPE_NEW, CARD_TYPE_REVIEW, FieldMapping, NoteLayout, note_to_card, sm2_schedule,
+)
+from models import Card, Deck
+
+CREATED = datetime(2024, 1, 1)
+
+BASIC = {"id": 1, "fields": ["Front", "Back", "Example", "Example Translation"]}
+CLOZE = {"id": 2, "fields": ["Text", "Back Extra"]}
+UNNAMED = {"id": 3, "fields": ["Vorderseite", "Rückseite"]}
+
+
+def build_package(path, notes, schema18: bool = False) -> str:
+    """A minimal .apkg: collection.anki2 with one first card per note ((note type, fields, card) tuples)."""
+    database = str(path) + ".anki2"
+    connection = sqlite3.connect(database)
+    note_types = {note_type["id"]: note_type for note_type, _, _ in notes}
+    models = {
+        str(type_id): {"flds": [{"name": name, "ord": index} for index, name in enumerate(note_type["fields"])]}
+        for type_id, note_type in note_types.items()
+    }
+    connection.execute("CREATE TABLE col (id INTEGER PRIMARY KEY, crt INTEGER, models TEXT)")
+    connection.execute("INSERT INTO col VALUES (1, ?, ?)", (
+        int((CREATED - datetime(1970, 1, 1)).total_seconds()), "" if schema18 else json.dumps(models)
+    ))
+    if schema18:
+        connection.execute("CREATE TABLE fields (ntid INTEGER, ord INTEGER, name TEXT)")
+        for type_id, note_type in note_types.items():
+            connection.executemany("INSERT INTO fields VALUES (?, ?, ?)", [
+                (type_id, index, name) for index, name in enumerate(note_type["fields"])
+            ])
+    connection.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, mid INTEGER, flds TEXT)")
+    connection.execute(
+        "CREATE TABLE cards (id INTEGER PRIMARY KEY, nid INTEGER, ord INTEGER, type INTEGER, queue INTEGER, "
+        "due INTEGER, odue INTEGER, odid INTEGER, ivl INTEGER, factor INTEGER)"
+    )
+    for note_id, (note_type, fields, card) in enumerate(notes, start=1):
+        connection.execute("INSERT INTO notes VALUES (?, ?, ?)", (note_id, note_type["id"], "\x1f".join(fields)))
+        card = {"id": note_id, "type": 0, "queue": 0, "due": note_id, "odue": 0, "odid": 0, "ivl": 0, "factor": 0,
+                **(card or {})}
+        connection.execute(
+            "INSERT INTO cards VALUES (:id, :id, 0, :type, :queue, :due, :odue, :odid, :ivl, :factor)", card
+        )
+    connection.commit()
+    connection.close()
+
+    package = str(path) + ".apkg"
+    with zipfile.ZipFile(package, "w") as archive:
+        archive.write(database, "collection.anki2")
+        archive.writestr("media", "{}")
+    return package
+
+
+def post_package(client, headers, deck_id: int, package: str, **form):
+    with open(package, "rb") as upload:
+        response = client.post("/import/anki", headers=headers, files={"file": ("deck.apkg", upload)},
+                               data={"deck_id": str(deck_id), **form})
+    lines = [json.loads(line) for line in response.text.splitlines()] if response.status_code == 200 else []
+    return response, lines
+
+
+@pytest.fixture
+def anki_deck(db, make_user):
+    def make(username: str):
+        user, headers = make_user(username)
+        deck = Deck(name="Anki", user_id=user.id)
+        db.add(deck)
+        db.commit()
+        return deck.id, headers
+    return make
+
+
+def test_field_mapping_by_name_and_position():
+    layout = NoteLayout.for_fields(BASIC["fields"], FieldMapping())
+    assert (layout.word, layout.definition, layout.example, layout.translation) == (0, 1, 2, 3)
+    card = note_to_card(
+        ["apple&nbsp;", "<div>a fruit</div><div>round</div>", "An <b>Apple</b> a day[sound:a.mp3]", "每天一個蘋果"],
+        layout,
+    )
+    assert card == {
+        "word": "apple",
+        "definition": "a fruit\nround",
+        "synonyms": None,
+        "examples": [{"sentence": "An *Apple* a day", "translation": "每天一個蘋果"}],
+    }
+
+    # Unknown field names fall back to front and back
+    layout = NoteLayout.for_fields(UNNAMED["fields"], FieldMapping())
+    assert (layout.word, layout.definition) == (0, 1)
+    assert note_to_card(["Hund", "dog"], layout)["word"] == "Hund"
+
+    # An explicit mapping wins over the default names
+    layout = NoteLayout.for_fields(BASIC["fields"], FieldMapping(word="back", definition="FRONT"))
+    assert note_to_card(["apple", "a fruit"], layout)["word"] == "a fruit"
+
+
+def test_cloze_note_becomes_marked_example():
+    layout = NoteLayout.for_fields(CLOZE["fields"], FieldMapping())
+    card = note_to_card(["The {{c1::cat::animal}} sat on the {{c2::mat}}.", ""], layout)
+    assert card["word"] == "cat"
+    assert card["definition"] == "animal"
+    assert card["examples"] == [{"sentence": "The *cat* sat on the *mat*.", "translation": None}]
+
+    # Back Extra supplies the definition when the cloze has no hint
+    card = note_to_card(["The {{c1::cat}} sat.", "a small pet"], layout)
+    assert (card["word"], card["definition"]) == ("cat", "a small pet")
+
+
+def test_sm2_schedule():
+    assert sm2_schedule(CREATED, CARD_TYPE_NEW, 0, 5, 0, 0, 0, 0) == {}
+    assert sm2_schedule(CREATED, None, None, None, None, None, None, None) == {}
+
+    assert sm2_schedule(CREATED, CARD_TYPE_REVIEW, 2, 30, 0, 0, 12, 2300) == {
+        "interval": 12, "repetition": 3, "ease_factor": 2.3, "next_review_date": CREATED + timedelta(days=30),
+    }
+    # Filtered decks keep the real due day in odue
+    assert sm2_schedule(CREATED, CARD_TYPE_REVIEW, 2, -100000, 40, 7, 1, 1000)["next_review_date"] == (
+        CREATED + timedelta(days=40)
+    )
+    assert sm2_schedule(CREATED, CARD_TYPE_REVIEW, 2, 40, 0, 0, 1, 1000)["ease_factor"] == 1.3
+
+    # Intraday learning: due is a unix timestamp
+    learning = sm2_schedule(CREATED, CARD_TYPE_LEARNING, 1, 1704110400, 0, 0, 0, 2500)
+    assert learning == {
+        "interval": 0, "repetition": 0, "ease_factor": 2.5, "next_review_date": datetime(2024, 1, 1, 12),
+    }
+
+
+@pytest.mark.parametrize("schema18", [False, True], ids=["legacy", "schema18"])
+def test_import_package(client, db, anki_deck, tmp_path, schema18):
+    deck_id, headers = anki_deck(f"anki-import-{schema18}")
+    package = build_package(tmp_path / "deck", [
+        (BASIC, ["apple", "a fruit", "An apple a day", ""], {"type": 2, "queue": 2, "due": 10, "ivl": 5, "factor": 2500}),
+        (BASIC, ["pear", "", "", ""], None),  # No definition: skipped
+        (CLOZE, ["The {{c1::cat::animal}} sat.", ""], {"type": 1, "queue": 3, "due": 3, "factor": 2500}),
+        (UNNAMED, ["Hund", "dog"], None),
+    ], schema18=schema18)
+
+    response, lines = post_package(client, headers, deck_id, package, import_id="anki-1", include_scheduling="true")
+    assert response.status_code == 200
+    assert lines[-1] == {"import_id": "anki-1", "deck_id": deck_id, "notes": 4, "processed": 4,
+                         "imported": 3, "skipped": 1, "done": True}
+
+    cards = {card.word: card for card in db.query(Card).filter(Card.deck_id == deck_id)}
+    assert sorted(cards) == ["Hund", "apple", "cat"]
+    assert cards["apple"].examples == [{"sentence": "An *apple* a day", "translation": None}]
+    assert (cards["apple"].interval, cards["apple"].next_review_date) == (5, CREATED + timedelta(days=10))
+    assert (cards["cat"].repetition, cards["cat"].next_review_date) == (0, CREATED + timedelta(days=3))
+    assert cards["Hund"].repetition == 0
+
+    # Same import id again: every batch is already committed, nothing is inserted twice
+    response, lines = post_package(client, headers, deck_id, package, import_id="anki-1", include_scheduling="true")
+    assert lines[-1]["done"] and lines[-1]["imported"] == 3
+    assert db.query(Card).filter(Card.deck_id == deck_id).count() == 3
+
+
+def test_non_zip_upload_is_rejected(client, anki_deck, tmp_path):
+    deck_id, headers = anki_deck("anki-not-zip")
+    path = tmp_path / "notes.apkg"
+    path.write_text("word || definition\n")
+    response, _ = post_package(client, headers, deck_id, str(path))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Not an Anki package (.apkg or .colpkg)"
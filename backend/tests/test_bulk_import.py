@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from bulk_import import insert_cards, supports_copy
+from database import Base
+from models import Card, Deck, User
+from search_index import SEARCH_TABLE, ensure_search_index
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+CARDS = [
+    # Tabs, newlines and backslashes must survive COPY's text format
+    {"word": "tab\tword", "definition": "line one\nline two", "synonyms": ["back\\slash"], "examples": None},
+    {"word": "plain", "definition": "NULL-looking \\N", "synonyms": None,
+     "examples": [{"sentence": "Ünïcode *plain* 例句", "translation": "翻譯"}]},
+    {"word": "studied", "definition": "keeps its schedule", "interval": 12, "repetition": 4,
+     "ease_factor": 2.2, "next_review_date": datetime(2030, 1, 2, 3, 4, 5)},
+]
+
+
+def check_inserted(db: Session, deck_id: int) -> None:
+    assert insert_cards(db, deck_id, iter(CARDS)) == len(CARDS)
+    cards = db.query(Card).filter(Card.deck_id == deck_id).order_by(Card.id).all()
+    assert [(card.word, card.definition, card.synonyms, card.examples) for card in cards] == [
+        (card["word"], card["definition"], card.get("synonyms"), card.get("examples")) for card in CARDS
+    ]
+    assert (cards[0].interval, cards[0].repetition, cards[0].ease_factor) == (0, 0, 2.5)
+    assert (cards[2].interval, cards[2].repetition, cards[2].ease_factor, cards[2].next_review_date) == (
+        12, 4, 2.2, datetime(2030, 1, 2, 3, 4, 5)
+    )
+
+
+def test_insert_cards_executemany(db, make_user):
+    user, _ = make_user("bulk-executemany")
+    deck = Deck(name="Bulk", user_id=user.id)
+    db.add(deck)
+    db.flush()
+    assert not supports_copy(db)
+    check_inserted(db, deck.id)
+    db.rollback()
+
+
+@pytest.mark.postgres
+@pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_insert_cards_copy():
+    engine = create_engine(TEST_POSTGRES_URL)
+    Base.metadata.create_all(engine)
+    ensure_search_index(engine)
+    with Session(bind=engine) as db:
+        assert supports_copy(db)
+        user = User(username="bulk-copy", password_hash="-")
+        db.add(user)
+        db.flush()
+        deck = Deck(name="Bulk", user_id=user.id)
+        db.add(deck)
+        db.flush()
+        check_inserted(db, deck.id)
+        indexed = db.execute(text(
+            f"SELECT count(*) FROM {SEARCH_TABLE} JOIN cards ON cards.id = card_id WHERE cards.deck_id = :deck_id"
+        ), {"deck_id": deck.id}).scalar()
+        assert indexed == len(CARDS)
+        # Nothing is committed, so the scratch database is left as it was
+        db.rollback()
+    engine.dispose()
@@ -0,0 +1,48 @@
+from models import Card, Deck
+
+
+def test_duplicate_deck_indexes_copies(client, db, make_user):
+    user, headers = make_user("duplicate-deck")
+    deck = Deck(name="Fruit", user_id=user.id)
+    db.add(deck)
+    db.flush()
+    db.add_all([Card(deck_id=deck.id, word=f"kumquat{index}", definition="a small citrus") for index in range(3)])
+    db.commit()
+
+    response = client.post(f"/library/decks/{deck.id}/duplicate", headers=headers, json={"name": "Fruit copy"})
+    assert response.status_code == 200
+    assert response.json()["cards_affected"] == 3
+    copy_id = response.json()["deck"]["id"]
+
+    response = client.get("/search", headers=headers, params={"q": "citrus", "limit": 10})
+    assert response.status_code == 200
+    hits = response.json()["results"]
+    assert sorted(hit["deck_name"] for hit in hits) == ["Fruit"] * 3 + ["Fruit copy"] * 3
+    assert {hit["deck_id"] for hit in hits} == {deck.id, copy_id}
+
+
+def test_split_without_matching_cards_creates_no_deck(client, db, make_user):
+    user, headers = make_user("split-empty")
+    deck = Deck(name="Source", user_id=user.id)
+    db.add(deck)
+    db.flush()
+    db.add(Card(deck_id=deck.id, word="lonely", definition="alone", is_starred=False))
+    db.commit()
+
+    for body in ({"name": "Empty", "card_ids": []}, {"name": "Empty", "starred_only": True}):
+        response = client.post(f"/library/decks/{deck.id}/split", headers=headers, json=body)
+        assert response.status_code == 400
+    assert db.query(Deck).filter(Deck.user_id == user.id).count() == 1
+
+
+def test_update_deck_returns_stats(client, db, make_user):
+    user, headers = make_user("update-deck")
+    deck = Deck(name="Old", user_id=user.id)
+    db.add(deck)
+    db.flush()
+    db.add_all([Card(deck_id=deck.id, word=f"word{index}", definition="definition") for index in range(2)])
+    db.commit()
+
+    response = client.put(f"/library/decks/{deck.id}", headers=headers, json={"name": "New"})
+    assert response.status_code == 200
+    assert (response.json()["name"], response.json()["card_count"]) == ("New", 2)
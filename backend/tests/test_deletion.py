@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+import pytest
+
+import deletion
+from models import Card, Deck
+
+
+def test_background_delete_is_swept(db, make_user, monkeypatch):
+    monkeypatch.setattr(deletion, "BACKGROUND_DELETE_MIN_CARDS", 5)
+    monkeypatch.setattr(deletion, "DELETE_CHUNK_SIZE", 4)
+    user, _ = make_user("deletion-sweep")
+    deck = Deck(name="Large", user_id=user.id)
+    db.add(deck)
+    db.flush()
+    db.add_all([Card(deck_id=deck.id, word=f"word{index}", definition="definition") for index in range(10)])
+    db.commit()
+    deck_id = deck.id
+
+    assert deletion.delete_deck(db, user.id, deck_id) is True
+    db.commit()
+    assert db.query(Deck).filter(Deck.user_id == user.id).count() == 0
+
+    assert deletion.sweep_detached_decks(db) == 10
+    assert db.query(Card).filter(Card.deck_id == deck_id).count() == 0
+    assert db.get(Deck, deck_id) is None
+
+
+def test_sweeper_logs_failures(monkeypatch, caplog):
+    def failing_sweep():
+        raise RuntimeError("database is gone")
+
+    async def stop(_seconds):
+        raise asyncio.CancelledError
+
+    monkeypatch.setattr(deletion, "run_deletion_sweep", failing_sweep)
+    monkeypatch.setattr(deletion.asyncio, "sleep", stop)
+    with caplog.at_level(logging.ERROR, logger="deletion"), pytest.raises(asyncio.CancelledError):
+        asyncio.run(deletion.run_deletion_sweeper())
+
+    assert caplog.records[0].getMessage() == "Deletion sweep failed"
+    assert "database is gone" in caplog.text
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+
+from due_queues import DUE_QUEUE_LEAD_MINUTES, build_upcoming_queues, local_day
+from models import DailyDueQueue, User
+
+
+def test_build_upcoming_queues_drains_missing_users(db):
+    # Offsets from UTC-12 to UTC+14 every 15 minutes, so local days straddle three dates
+    offsets = list(range(-720, 841, 15))
+    db.add_all([
+        User(username=f"due-queue-{index}", password_hash="-", utc_offset_minutes=offset)
+        for index, offset in enumerate(offsets)
+    ])
+    db.commit()
+    now = datetime(2024, 3, 1, 10, 50)
+    lead = now + timedelta(minutes=DUE_QUEUE_LEAD_MINUTES)
+
+    users = db.query(User.id, User.utc_offset_minutes).all()
+    assert len({local_day(lead, offset) for _, offset in users}) == 3
+
+    built = build_upcoming_queues(db, now, batch_size=7)
+    assert built == len(users)
+    queued = set(db.query(DailyDueQueue.user_id, DailyDueQueue.day))
+    assert {(user_id, local_day(lead, offset)) for user_id, offset in users} <= queued
+
+    # Nothing is missing any more, and a later tick the same day builds nothing new
+    assert build_upcoming_queues(db, now) == 0
+    assert build_upcoming_queues(db, now + timedelta(minutes=5)) == 0
@@ -0,0 +1,55 @@
+import csv
+from io import StringIO
+
+import pytest
+
+from exporters import format_csv_line, format_pipe_line
+from routers.study_router import parse_csv_line, parse_examples, parse_pipe_line
+
+CARDS = [
+    {
+        "word": "apple",
+        "definition": "a fruit (usually red)",
+        "synonyms": ["pome", "malus | domestica"],
+        "examples": [
+            {"sentence": "I ate an *apple* (a red one).", "translation": "我吃了一個蘋果"},
+            {"sentence": "Either apples | or pears; not both.", "translation": "蘋果或梨（二選一）"},
+            {"sentence": "Path C:\\fruit\\ and a \\( stray", "translation": None},
+            {"sentence": ":) smiley || double pipe", "translation": "a | b || c"},
+        ],
+    },
+    {
+        "word": "a||b",
+        "definition": "ends with a pipe |",
+        "synonyms": ["(x)"],
+        "examples": [{"sentence": "((nested))", "translation": ")("}],
+    },
+]
+
+
+def parse_pipe(line: str) -> dict:
+    return parse_pipe_line(line.rstrip("\n"))
+
+
+def parse_csv(line: str) -> dict:
+    return parse_csv_line(next(csv.reader(StringIO(line))))
+
+
+@pytest.mark.parametrize("card", CARDS, ids=lambda card: card["word"])
+@pytest.mark.parametrize("format_line, parse", [
+    (format_pipe_line, parse_pipe),
+    (format_csv_line, parse_csv),
+], ids=["pipe", "csv"])
+def test_round_trip_keeps_punctuation(card, format_line, parse):
+    line = format_line(card["word"], card["definition"], card["synonyms"], card["examples"])
+    assert parse(line) == card
+
+
+def test_unescaped_input_parses_as_before():
+    assert parse_examples("(I ate an apple | 我吃了一個蘋果); (C:\\dir)") == [
+        {"sentence": "I ate an apple", "translation": "我吃了一個蘋果"},
+        {"sentence": "C:\\dir", "translation": None},
+    ]
+    assert parse_pipe_line("run || to move fast || sprint | dash") == {
+        "word": "run", "definition": "to move fast", "synonyms": ["sprint", "dash"], "examples": None,
+    }
@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import import_stream
+from import_stream import import_chunk, import_progress
+from models import Card, Deck
+
+
+async def ndjson_body(cards, events):
+    for card in cards:
+        events.append("read")
+        yield (json.dumps(card) + "\n").encode("utf-8")
+    events.append("body done")
+
+
+@pytest.fixture
+def deck(db, make_user):
+    def make(username: str):
+        user, _ = make_user(username)
+        deck = Deck(name="Streamed", user_id=user.id)
+        db.add(deck)
+        db.commit()
+        return user.id, deck.id
+    return make
+
+
+def test_chunk_is_written_after_the_body_is_read(db, deck, monkeypatch):
+    user_id, deck_id = deck("stream-order")
+    events = []
+    claim_chunk = import_stream.claim_chunk
+
+    def recording_claim(*args):
+        events.append("claim")
+        return claim_chunk(*args)
+
+    monkeypatch.setattr(import_stream, "claim_chunk", recording_claim)
+    cards = [{"word": f"word{index}", "def": "definition"} for index in range(3)]
+
+    assert asyncio.run(import_chunk(db, user_id, deck_id, "order", 0, ndjson_body(cards, events))) == (3, False)
+    assert events == ["read", "read", "read", "body done", "claim"]
+    # Committed: a retry returns the stored count without reading its body
+    events.clear()
+    assert asyncio.run(import_chunk(db, user_id, deck_id, "order", 0, ndjson_body(cards, events))) == (3, True)
+    assert events == []
+    assert import_progress(db, user_id, "order") == ([0], 3)
+
+
+def test_invalid_or_oversized_chunk_writes_nothing(db, deck, monkeypatch):
+    user_id, deck_id = deck("stream-invalid")
+    cards = [{"word": "ok", "def": "definition"}, {"word": "missing def"}]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(import_chunk(db, user_id, deck_id, "invalid", 0, ndjson_body(cards, [])))
+    assert error.value.status_code == 400
+
+    monkeypatch.setattr(import_stream, "IMPORT_MAX_CHUNK_CARDS", 2)
+    cards = [{"word": f"word{index}", "def": "definition"} for index in range(3)]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(import_chunk(db, user_id, deck_id, "invalid", 0, ndjson_body(cards, [])))
+    assert error.value.status_code == 413
+
+    assert import_progress(db, user_id, "invalid") == ([], 0)
+    assert db.query(Card).filter(Card.deck_id == deck_id).count() == 0
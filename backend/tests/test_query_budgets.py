@@ -0,0 +1,127 @@
+"""
+Query budgets for the hot endpoints.
+
+Each endpoint is called under a QueryRecorder and fails if it issues more
+statements than its budget or repeats one statement shape per deck/card (an
+N+1). Budgets include the user lookup done by authentication and must not
+grow with library size, so every call runs against a small and a larger
+library.
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from database import SessionLocal
+from due_queues import build_queue, local_day
+from models import Card, Deck, Folder
+from query_inspector import QueryInspectorMiddleware, QueryRecorder
+from summary import summary_cache
+
+BUDGETS = {
+    # name: (method, path template, json body, max statements)
+    "library": ("GET", "/library", None, 4),
+    "study_deck": ("GET", "/study/{deck_id}", None, 3),
+    "study_multi": ("POST", "/study/multi", {"deck_ids": "{deck_ids}"}, 3),
+    "review": ("POST", "/study/{card_id}/review", {"quality": 4}, 3),
+    "summary": ("GET", "/summary", None, 3),  # user, due queue lookup (a miss here), aggregate
+}
+
+# The same calls once the user's daily due queue is built (user, queue, changed cards, tombstones)
+QUEUED_BUDGETS = {
+    "summary_queued": ("GET", "/summary", None, 4),
+}
+
+# Same statement shape this many times in one request is reported as an N+1
+REPEAT_LIMIT = 3
+
+LIBRARY_SHAPES = {
+    # folders, decks per folder, cards per deck
+    "small": (1, 1, 5),
+    "large": (6, 4, 60),
+}
+
+
+def seed(db, user, folders: int, decks_per_folder: int, cards_per_deck: int):
+    parent_id = None
+    deck_ids = []
+    for folder_index in range(folders):
+        folder = Folder(name=f"Folder {folder_index}", user_id=user.id, parent_folder_id=parent_id)
+        db.add(folder)
+        db.flush()
+        parent_id = folder.id
+        for deck_index in range(decks_per_folder):
+            deck = Deck(name=f"Deck {folder_index}.{deck_index}", user_id=user.id, folder_id=folder.id)
+            db.add(deck)
+            db.flush()
+            deck_ids.append(deck.id)
+            db.add_all([
+                Card(
+                    deck_id=deck.id,
+                    word=f"word{card_index}",
+                    definition="definition",
+                    examples=[{"sentence": f"A *word{card_index}* here.", "translation": "翻譯"}],
+                )
+                for card_index in range(cards_per_deck)
+            ])
+    db.commit()
+
+    first_card = db.query(Card).filter(Card.deck_id == deck_ids[0]).first()
+    return deck_ids, first_card.id
+
+
+def check_budgets(client, headers: dict, deck_ids: list, card_id: int, budgets: dict) -> None:
+    for name, (method, path, body, budget) in budgets.items():
+        url = path.format(deck_id=deck_ids[0], card_id=card_id)
+        payload = None
+        if body is not None:
+            payload = {key: deck_ids if value == "{deck_ids}" else value for key, value in body.items()}
+
+        with QueryRecorder() as recorder:
+            response = client.request(method, url, json=payload, headers=headers)
+
+        assert response.status_code == 200, f"{name}: HTTP {response.status_code}"
+        recorder.assert_max_queries(budget)
+        assert not recorder.repeated_shapes(REPEAT_LIMIT), f"{name}: repeated statements. {recorder.report()}"
+
+
+@pytest.fixture(params=sorted(LIBRARY_SHAPES))
+def library(request, db, make_user):
+    user, headers = make_user(f"{request.function.__name__}-{request.param}")
+    deck_ids, card_id = seed(db, user, *LIBRARY_SHAPES[request.param])
+    return user, headers, deck_ids, card_id
+
+
+def test_query_budgets(client, library):
+    _, headers, deck_ids, card_id = library
+    check_budgets(client, headers, deck_ids, card_id, BUDGETS)
+
+
+def test_query_budgets_with_due_queue(client, db, library):
+    user, headers, deck_ids, card_id = library
+    now = datetime.utcnow()
+    build_queue(db, user.id, user.utc_offset_minutes, local_day(now, user.utc_offset_minutes), now)
+    db.commit()
+    summary_cache.invalidate(user.username)
+
+    check_budgets(client, headers, deck_ids, card_id, QUEUED_BUDGETS)
+
+
+def test_inspector_warns_about_repeated_statements(caplog):
+    app = FastAPI()
+    app.add_middleware(QueryInspectorMiddleware, threshold=3)
+
+    @app.get("/n-plus-one")
+    def n_plus_one():
+        with SessionLocal() as db:
+            for value in range(3):
+                db.execute(text("SELECT :value"), {"value": value})
+        return {}
+
+    with caplog.at_level("WARNING", logger="query_inspector"):
+        response = TestClient(app).get("/n-plus-one")
+
+    assert response.headers["x-query-count"] == "3"
+    assert caplog.records[0].getMessage() == "Possible N+1 in GET /n-plus-one:\n  3x SELECT ?"
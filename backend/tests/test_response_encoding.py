@@ -0,0 +1,43 @@
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import response_encoding
+from response_encoding import ContentNegotiationMiddleware
+
+PAYLOAD = {"cards": [{"word": f"word{index}", "definition": "definition"} for index in range(100)]}
+
+
+@pytest.fixture
+def encoding_client():
+    app = FastAPI()
+    app.add_middleware(ContentNegotiationMiddleware)
+
+    @app.get("/payload")
+    def payload():
+        return PAYLOAD
+
+    return TestClient(app)
+
+
+def test_brotli_and_msgpack(encoding_client):
+    response = encoding_client.get("/payload", headers={
+        "Accept": "application/msgpack",
+        "Accept-Encoding": "gzip, br",
+    })
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == PAYLOAD
+
+
+def test_without_optional_packages(encoding_client, monkeypatch):
+    monkeypatch.setattr(response_encoding, "brotli", None)
+    monkeypatch.setattr(response_encoding, "msgpack", None)
+    response = encoding_client.get("/payload", headers={
+        "Accept": "application/msgpack",
+        "Accept-Encoding": "gzip, br",
+    })
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == PAYLOAD
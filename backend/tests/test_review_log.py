@@ -0,0 +1,47 @@
+import asyncio
+import logging
+
+import pytest
+
+from review_log import ReviewLogBuffer
+
+
+def unused_session():
+    pytest.fail("the buffer flushed while rows were being added")
+
+
+def test_full_buffer_wakes_the_flusher_instead_of_flushing():
+    async def scenario():
+        buffer = ReviewLogBuffer(session_factory=unused_session, flush_size=2)
+        wakeup = buffer.attach(asyncio.get_running_loop())
+        buffer.add([{"card_id": 1}])
+        await asyncio.sleep(0)
+        assert not wakeup.is_set()
+
+        buffer.add([{"card_id": 2}])
+        await asyncio.wait_for(wakeup.wait(), timeout=1)
+        assert len(buffer) == 2
+
+    asyncio.run(scenario())
+
+
+class FailingSession:
+    def execute(self, *args):
+        raise RuntimeError("database is gone")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_failed_flush_is_logged_and_keeps_rows(caplog):
+    buffer = ReviewLogBuffer(session_factory=FailingSession)
+    buffer.add([{"card_id": 1}, {"card_id": 2}])
+    with caplog.at_level(logging.ERROR, logger="review_log"):
+        assert buffer.flush() == 0
+
+    assert caplog.records[0].getMessage() == "Failed to flush review log buffer"
+    assert "database is gone" in caplog.text
+    assert len(buffer) == 2
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from models import DailyReviewRollup
+
+
+def add_days(db, user_id: int, deck_id: int, first, count: int) -> None:
+    db.add_all([
+        DailyReviewRollup(user_id=user_id, deck_id=deck_id, day=first + timedelta(days=offset),
+                          reviews=2, lapses=0, quality_sum=8, new_cards=0)
+        for offset in range(count)
+    ])
+
+
+def test_streaks_ignore_the_window(client, db, make_user):
+    user, headers = make_user("stats-streaks")
+    today = datetime.utcnow().date()
+    # A 120-day streak ending 200 days ago, then the current 100-day streak through today
+    add_days(db, user.id, 1, today - timedelta(days=319), 120)
+    add_days(db, user.id, 1, today - timedelta(days=99), 100)
+    # A second deck on the same days must not lengthen anything
+    add_days(db, user.id, 2, today - timedelta(days=9), 10)
+    db.commit()
+
+    response = client.get("/stats", headers=headers, params={"days": 30})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["days"]) == 30
+    assert (body["current_streak"], body["longest_streak"]) == (100, 120)
+
+    response = client.get("/stats", headers=headers, params={"days": 30, "deck_id": 2})
+    assert (response.json()["current_streak"], response.json()["longest_streak"]) == (10, 10)
@@ -0,0 +1,32 @@
+from models import Card, Deck, ReviewLog
+from review_log import review_log_buffer
+
+
+def test_push_reviews_mixed_offsets(client, db, make_user):
+    user, headers = make_user("sync-mixed-offsets")
+    deck = Deck(name="Offline", user_id=user.id)
+    db.add(deck)
+    db.flush()
+    cards = [Card(deck_id=deck.id, word=f"word{index}", definition="definition") for index in range(3)]
+    db.add_all(cards)
+    db.commit()
+
+    response = client.post("/sync/reviews", headers=headers, json={"reviews": [
+        {"card_id": cards[0].id, "quality": 4, "reviewed_at": "2024-03-01T10:00:00Z"},
+        {"card_id": cards[1].id, "quality": 4, "reviewed_at": "2024-03-01T09:30:00"},
+        {"card_id": cards[2].id, "quality": 4, "reviewed_at": "2024-03-01T17:45:00+08:00"},
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["rejected_card_ids"] == []
+    # Applied oldest first once every timestamp is UTC: 09:30, 09:45 (+08:00), 10:00 (Z)
+    assert [item["card_id"] for item in body["applied"]] == [cards[1].id, cards[2].id, cards[0].id]
+
+    review_log_buffer.flush()
+    logged = db.query(ReviewLog).filter(ReviewLog.user_id == user.id).order_by(ReviewLog.reviewed_at).all()
+    assert [(log.card_id, log.reviewed_at.isoformat()) for log in logged] == [
+        (cards[1].id, "2024-03-01T09:30:00"),
+        (cards[2].id, "2024-03-01T09:45:00"),
+        (cards[0].id, "2024-03-01T10:00:00"),
+    ]
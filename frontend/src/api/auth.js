@@ -13,6 +13,8 @@ export const login = async (username, password) => {
   
   const { access_token } = response.data;
   localStorage.setItem('token', access_token);
+  // The server builds each day's due queue before the user's local midnight
+  updateTimezone().catch(() => {});
   
   return response.data;
 };
@@ -31,6 +33,11 @@ export const getMe = async () => {
   return response.data;
 };
 
+export const updateTimezone = async () => {
+  const response = await api.put('/me', { utc_offset_minutes: -new Date().getTimezoneOffset() });
+  return response.data;
+};
+
 export const isAuthenticated = () => {
   return !!localStorage.getItem('token');
 };
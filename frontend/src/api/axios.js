@@ -9,6 +9,9 @@ const api = axios.create({
   },
 });
 
+// Unix time until which reads should hit the primary database, set by the API after our writes
+let readPrimaryUntil = null;
+
 // Request interceptor to add JWT token
 api.interceptors.request.use(
   (config) => {
@@ -16,6 +19,9 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    if (readPrimaryUntil && Date.now() / 1000 < Number(readPrimaryUntil)) {
+      config.headers['X-Read-Primary-Until'] = readPrimaryUntil;
+    }
     return config;
   },
   (error) => {
@@ -25,7 +31,13 @@ api.interceptors.request.use(
 
 // Response interceptor to handle auth errors
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const until = response.headers['x-read-primary-until'];
+    if (until) {
+      readPrimaryUntil = until;
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
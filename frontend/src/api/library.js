@@ -43,6 +43,22 @@ export const deleteDeck = async (deckId) => {
   return response.data;
 };
 
+export const duplicateDeck = async (deckId, options = {}) => {
+  const response = await api.post(`/library/decks/${deckId}/duplicate`, options);
+  return response.data;
+};
+
+// Merges sourceDeckId into deckId and deletes the source deck
+export const mergeDecks = async (deckId, sourceDeckId, options = {}) => {
+  const response = await api.post(`/library/decks/${deckId}/merge`, { source_deck_id: sourceDeckId, ...options });
+  return response.data;
+};
+
+export const splitDeck = async (deckId, name, options = {}) => {
+  const response = await api.post(`/library/decks/${deckId}/split`, { name, ...options });
+  return response.data;
+};
+
 // Cards
 export const getCards = async (deckId) => {
   const response = await api.get(`/library/decks/${deckId}/cards`);
@@ -68,3 +84,20 @@ export const toggleCardStar = async (cardId) => {
   const response = await api.post(`/library/cards/${cardId}/star`);
   return response.data;
 };
+
+// operation: star | unstar | move | delete | reset; select by cardIds or a filter
+export const bulkUpdateCards = async (operation, { cardIds, filter, targetDeckId } = {}) => {
+  const response = await api.post('/library/cards/bulk', {
+    operation,
+    card_ids: cardIds,
+    filter,
+    target_deck_id: targetDeckId,
+  });
+  return response.data;
+};
+
+// Search
+export const searchCards = async (query, limit = 20, offset = 0) => {
+  const response = await api.get('/search', { params: { q: query, limit, offset } });
+  return response.data;
+};
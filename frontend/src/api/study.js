@@ -7,7 +7,8 @@ export const getStudyCards = async (
   clozeOnly = false,
   withExamplesOnly = false,
   familiarityBucket = null,
-  starredOnly = false
+  starredOnly = false,
+  view = null // 'flashcard' | 'cloze' | 'full': smaller payloads when the mode needs less
 ) => {
   const params = {
     mode,
@@ -19,6 +20,9 @@ export const getStudyCards = async (
   if (familiarityBucket) {
     params.familiarity_bucket = familiarityBucket;
   }
+  if (view) {
+    params.view = view;
+  }
   const response = await api.get(`/study/${deckId}`, { params });
   return response.data;
 };
@@ -28,6 +32,38 @@ export const reviewCard = async (cardId, quality) => {
   return response.data;
 };
 
+// Server-side study sessions: the card set is frozen at start and handed out in chunks
+export const startStudySession = async (options) => {
+  const response = await api.post('/study/sessions', options);
+  return response.data;
+};
+
+export const resumeStudySession = async (sessionId) => {
+  const response = await api.get(`/study/sessions/${sessionId}`);
+  return response.data;
+};
+
+export const nextSessionCards = async (sessionId, count = 0) => {
+  const response = await api.post(`/study/sessions/${sessionId}/next`, null, { params: { count } });
+  return response.data;
+};
+
+export const reviewSessionCard = async (sessionId, cardId, quality) => {
+  const response = await api.post(`/study/sessions/${sessionId}/review/${cardId}`, { quality });
+  return response.data;
+};
+
+export const endStudySession = async (sessionId) => {
+  const response = await api.delete(`/study/sessions/${sessionId}`);
+  return response.data;
+};
+
+// Due totals, per-deck due counts and next due time (cheap, cached server-side)
+export const getDueSummary = async () => {
+  const response = await api.get('/summary');
+  return response.data;
+};
+
 export const resetDeckProgress = async (deckId) => {
   const response = await api.post(`/study/${deckId}/reset`);
   return response.data;
@@ -38,6 +74,72 @@ export const importCards = async (deckId, cards) => {
   return response.data;
 };
 
+// Large imports: NDJSON chunks under one import id. A chunk that was already
+// committed is a no-op on the server, so a failed upload can be retried by
+// calling this again with the same importId; committed chunks are skipped.
+export const importCardsStream = async (
+  deckId,
+  cards,
+  { importId = crypto.randomUUID(), chunkSize = 1000, onProgress = null } = {}
+) => {
+  let committed = new Set();
+  let result = { import_id: importId, deck_id: deckId, total_imported: 0 };
+  try {
+    const status = await api.get(`/import/stream/${importId}`);
+    committed = new Set(status.data.committed_chunks);
+    result = status.data;
+  } catch (error) {
+    if (error.response?.status !== 404) throw error;
+  }
+
+  const chunks = Math.ceil(cards.length / chunkSize);
+  for (let seq = 0; seq < chunks; seq++) {
+    if (committed.has(seq)) continue;
+    const body = cards
+      .slice(seq * chunkSize, (seq + 1) * chunkSize)
+      .map((card) => JSON.stringify(card))
+      .join('\n');
+    const response = await api.put(`/import/stream/${importId}/${seq}`, body, {
+      params: { deck_id: deckId },
+      headers: { 'Content-Type': 'application/x-ndjson' },
+    });
+    result = response.data;
+    if (onProgress) onProgress(seq + 1, chunks);
+  }
+  return result;
+};
+
+// Anki .apkg/.colpkg upload. The server streams one NDJSON progress line per
+// batch of notes; onProgress gets the latest ({ notes, processed, imported, skipped }).
+// Posting again with the same importId resumes after the batches already saved.
+export const importAnkiPackage = async (
+  deckId,
+  file,
+  { importId = crypto.randomUUID().replaceAll('-', ''), includeScheduling = false, onProgress = null } = {}
+) => {
+  const form = new FormData();
+  form.append('file', file);
+  form.append('deck_id', deckId);
+  form.append('import_id', importId);
+  form.append('include_scheduling', includeScheduling);
+
+  const lastLine = (text) => {
+    const lines = text.trim().split('\n');
+    return lines.length && lines[lines.length - 1] ? JSON.parse(lines[lines.length - 1]) : null;
+  };
+  const response = await api.post('/import/anki', form, {
+    responseType: 'text',
+    onDownloadProgress: (event) => {
+      const text = event.event?.target?.responseText;
+      if (!onProgress || !text || !text.endsWith('\n')) return;
+      onProgress(lastLine(text));
+    },
+  });
+  const result = lastLine(response.data);
+  if (result?.error) throw new Error(result.error);
+  return result;
+};
+
 export const importCardsCSV = async (deckId, csvData) => {
   const response = await api.post('/import/csv', { deck_id: deckId, csv_data: csvData });
   return response.data;
@@ -49,7 +151,8 @@ export const getMultiDeckStudyCards = async (
   limit = 15,
   withExamplesOnly = false,
   familiarityBucket = null,
-  starredOnly = false
+  starredOnly = false,
+  view = null
 ) => {
   const payload = {
     deck_ids: deckIds,
@@ -61,10 +164,34 @@ export const getMultiDeckStudyCards = async (
   if (familiarityBucket) {
     payload.familiarity_bucket = familiarityBucket;
   }
+  if (view) {
+    payload.view = view;
+  }
   const response = await api.post('/study/multi', payload);
   return response.data;
 };
 
+export const getFolderStudyCards = async (
+  folderId,
+  mode = 'due',
+  limit = 15,
+  withExamplesOnly = false,
+  familiarityBucket = null,
+  starredOnly = false
+) => {
+  const params = {
+    mode,
+    limit,
+    with_examples_only: withExamplesOnly,
+    starred_only: starredOnly,
+  };
+  if (familiarityBucket) {
+    params.familiarity_bucket = familiarityBucket;
+  }
+  const response = await api.get(`/study/folder/${folderId}`, { params });
+  return response.data;
+};
+
 export const generateAIExamples = async (word, definition) => {
   const response = await api.post('/ai/generate-examples', { word, definition });
   return response.data;
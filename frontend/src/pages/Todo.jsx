@@ -1,7 +1,8 @@
 import { useState, useEffect, useMemo } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
-import { CheckCircle2, Clock, Play, Loader2, Layers, Sparkles, Eye, EyeOff } from 'lucide-react';
+import { CheckCircle2, Clock, Play, Loader2, Layers, Sparkles, Eye, EyeOff, ChevronDown } from 'lucide-react';
 import { getLibrary } from '../api/library';
+import { getDueSummary } from '../api/study';
 import BottomNav from '../components/BottomNav';
 import StudyDeckPicker from '../components/StudyDeckPicker';
 import {
@@ -14,7 +15,11 @@ import {
 
 const Todo = () => {
   const [library, setLibrary] = useState({ folders: [], root_decks: [] });
+  const [summary, setSummary] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [libraryLoading, setLibraryLoading] = useState(false);
+  const [libraryLoaded, setLibraryLoaded] = useState(false);
+  const [pickerOpen, setPickerOpen] = useState(false);
   const [selectedDecks, setSelectedDecks] = useState(new Set());
   const [showAllDecks, setShowAllDecks] = useState(false);
   const [studyMode, setStudyMode] = useState('due'); // 'due' or 'all'
@@ -26,7 +31,25 @@ const Todo = () => {
   const navigate = useNavigate();
 
   useEffect(() => {
+    // The page itself only needs the cheap summary; the library tree is loaded when the deck picker opens
+    const fetchSummary = async () => {
+      try {
+        setSummary(await getDueSummary());
+      } catch (error) {
+        console.error('Failed to fetch summary:', error);
+        // Without counts there is nothing to summarize, so go straight to the picker
+        setPickerOpen(true);
+      } finally {
+        setLoading(false);
+      }
+    };
+    fetchSummary();
+  }, []);
+
+  useEffect(() => {
+    if (!pickerOpen || libraryLoaded) return;
     const fetchDecks = async () => {
+      setLibraryLoading(true);
       try {
         const data = await getLibrary();
         setLibrary({
@@ -36,11 +59,12 @@ const Todo = () => {
       } catch (error) {
         console.error('Failed to fetch library:', error);
       } finally {
-        setLoading(false);
+        setLibraryLoaded(true);
+        setLibraryLoading(false);
       }
     };
     fetchDecks();
-  }, []);
+  }, [pickerOpen, libraryLoaded]);
 
   const { filteredRootDecks, filteredFolders, allDecksFlat } = useMemo(() => {
     const sortedRoot = sortDecks(library.root_decks || [], sortBy);
@@ -82,7 +106,10 @@ const Todo = () => {
     return ids;
   }, [filteredRootDecks, filteredFolders]);
   
-  const totalDue = pendingDecks.reduce((sum, deck) => sum + deck.due_count, 0);
+  const totalDue = summary
+    ? summary.total_due
+    : pendingDecks.reduce((sum, deck) => sum + deck.due_count, 0);
+  const pendingDeckCount = summary ? summary.decks.length : pendingDecks.length;
   const totalCards = decksWithCards.reduce((sum, deck) => sum + deck.card_count, 0);
 
   const toggleDeckSelection = (deckId) => {
@@ -148,6 +175,12 @@ const Todo = () => {
     ? selectedCardsWithExamplesCount 
     : (studyMode === 'due' ? selectedDueCount : selectedTotalCount);
 
+  const startDueStudy = () => {
+    // Deck ids straight from the summary, so the common path never loads the library
+    const deckIdsParam = summary.decks.map((deck) => deck.deck_id).join(',');
+    navigate(`/study/multi?decks=${deckIdsParam}&mode=due&cardMode=flashcard&limit=${cardLimit}`);
+  };
+
   const startMultiDeckStudy = () => {
     if (selectedDecks.size === 0) return;
     const deckIdsParam = Array.from(selectedDecks).join(',');
@@ -175,7 +208,7 @@ const Todo = () => {
           <h1 className="text-2xl font-bold text-gray-800">Study</h1>
           <p className="text-gray-500 mt-1">
             {totalDue > 0 
-              ? `${totalDue} cards due across ${pendingDecks.length} deck${pendingDecks.length !== 1 ? 's' : ''}`
+              ? `${totalDue} cards due across ${pendingDeckCount} deck${pendingDeckCount !== 1 ? 's' : ''}`
               : 'All caught up! Practice any deck below.'}
           </p>
         </div>
@@ -209,8 +242,36 @@ const Todo = () => {
           </div>
         </div>
 
+        {!pickerOpen && (
+          <div className="space-y-3 mb-6">
+            {totalDue > 0 && (
+              <button
+                onClick={startDueStudy}
+                className="w-full py-4 rounded-xl font-semibold text-lg flex items-center justify-center gap-2 bg-indigo-600 text-white hover:bg-indigo-700 shadow-lg transition-all"
+              >
+                <Play size={24} />
+                Study due cards ({cardLimit === 0 ? totalDue : Math.min(cardLimit, totalDue)} of {totalDue})
+              </button>
+            )}
+            <button
+              onClick={() => setPickerOpen(true)}
+              className="w-full py-3 rounded-xl font-medium flex items-center justify-center gap-2 bg-gray-100 text-gray-700 hover:bg-gray-200 transition-colors"
+            >
+              <Layers size={18} className="text-indigo-500" />
+              Choose decks and options
+              <ChevronDown size={18} />
+            </button>
+          </div>
+        )}
+
+        {libraryLoading && (
+          <div className="flex justify-center py-8">
+            <Loader2 className="animate-spin text-indigo-600" size={28} />
+          </div>
+        )}
+
         {/* Deck Selection Section */}
-        {decksWithCards.length > 0 && (
+        {pickerOpen && decksWithCards.length > 0 && (
           <div className="mb-6">
             {/* Section Header with Show All Toggle */}
             <div className="flex items-center justify-between mb-3">
@@ -441,7 +502,7 @@ const Todo = () => {
         )}
 
         {/* Empty state */}
-        {decksWithCards.length === 0 && (
+        {libraryLoaded && decksWithCards.length === 0 && (
           <div className="text-center py-12">
             <p className="text-gray-400 mb-4">No decks yet. Create your first deck to start learning!</p>
             <Link